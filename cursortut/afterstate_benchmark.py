@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+后继状态智能体基准测试
+在相同的训练设置下（执X，与蒙特卡洛智能体自我对弈，多个随机种子）比较
+QLearningAgent 与 AfterstateAgent：每隔一段回合记录对随机对手的得分、
+在自身贪心策略会遇到的局面中选出最优着法（按 value_iteration 的精确解）的比例，
+以及值表条目数；并统计达到目标得分所需的回合数
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+import numpy as np
+from ai_trainer import AITrainer, QLearningAgent, AfterstateAgent, evaluate_agent
+from model_export import reachable_states
+from random_streams import RandomStream
+from state_graph import load_graph
+from value_iteration import solve
+
+AGENTS = {
+    'q_learning': lambda rng: QLearningAgent("QLearning_X", rng=rng),
+    'afterstate': lambda rng: AfterstateAgent("Afterstate_X", rng=rng),
+}
+
+
+def agent_values(agent):
+    """智能体的 (NUM_STATES, 9) 值数组"""
+    return agent.to_q_array() if hasattr(agent, 'to_q_array') else agent.to_value_array()
+
+
+def table_entries(agent):
+    """值表中执X一方的条目数（Q学习为状态-动作，后继状态智能体为X落子后的棋盘）"""
+    if hasattr(agent, 'q_table'):
+        return agent.memory_report()['entries']
+    learned = np.flatnonzero(agent.visits)
+    pieces = (learned[:, None] // 3 ** np.arange(9) % 3 != 0).sum(axis=1)
+    return int(np.count_nonzero(pieces % 2 == 1))
+
+
+def optimal_move_rate(values, optimal):
+    """在贪心策略会遇到的执X决策局面中，所有并列最佳着法都是最优着法的比例"""
+    states = sorted(reachable_states(values.tolist(), 1))
+    correct = 0
+    for index in states:
+        legal = optimal[index] != -np.inf
+        row = np.where(legal, values[index], -np.inf)
+        best = optimal[index].max()
+        correct += bool(np.all(optimal[index][row == row.max()] == best))
+    return correct / len(states) if states else 0.0
+
+
+def run(kind, seed, episodes, checkpoint, eval_games, optimal):
+    """训练一个智能体，返回各检查点的记录"""
+    agent1_rng, _ = RandomStream(seed).spawn(2)
+    trainer = AITrainer(agent1=AGENTS[kind](agent1_rng), seed=seed)
+    records = []
+    train_time = 0.0
+    # 训练器每1000回合的进度打印会打乱报告表格，训练期间丢弃标准输出
+    with contextlib.redirect_stdout(io.StringIO()):
+        for episode in range(1, episodes + 1):
+            start_time = time.perf_counter()
+            trainer.run_training_episode(episode, save_interval=episodes + 1)
+            train_time += time.perf_counter() - start_time
+            if episode % checkpoint == 0:
+                agent = trainer.agent1
+                records.append({
+                    'episode': episode,
+                    'score': evaluate_agent(agent, 1, eval_games, rng=RandomStream(seed + 1))['score'],
+                    'optimal_rate': optimal_move_rate(agent_values(agent), optimal),
+                    'entries': table_entries(agent),
+                    'train_time': train_time,
+                })
+    return records
+
+
+def full_table_sizes():
+    """执X时完整值表的大小：所有 (X决策局面, 合法落子) 对的数量与X落子后可能出现的棋盘数"""
+    graph = load_graph()
+    depth, outcome, offsets = np.asarray(graph.depth), np.asarray(graph.outcome), np.asarray(graph.offsets)
+    decision = np.flatnonzero((depth % 2 == 0) & (outcome == 0))
+    return {'q_learning': int((offsets[decision + 1] - offsets[decision]).sum()),
+            'afterstate': int(np.count_nonzero(depth % 2 == 1))}
+
+
+def first_episode(records, key, target):
+    """指标首次达到目标值的回合数（未达到为 None）"""
+    return next((record['episode'] for record in records if record[key] >= target), None)
+
+
+def run_benchmark(args):
+    """对每种智能体、每个种子训练并汇总"""
+    exact, _ = solve(1, 'minimax')
+    # 非法落子标为 -inf，便于比较
+    legal = ((np.arange(exact.shape[0])[:, None] // 3 ** np.arange(9)) % 3) == 0
+    optimal = np.where(legal, exact, -np.inf)
+
+    report = {'episodes': args.episodes, 'seeds': args.seeds, 'target_score': args.target_score,
+              'target_optimal': args.target_optimal, 'full_table': full_table_sizes(), 'agents': {}}
+    for kind in AGENTS:
+        runs = [run(kind, seed, args.episodes, args.checkpoint, args.eval_games, optimal)
+                for seed in range(args.seeds)]
+        final = [records[-1] for records in runs]
+        report['agents'][kind] = {
+            'curve': [{key: float(np.mean([records[i][key] for records in runs])) for key in runs[0][i]}
+                      for i in range(len(runs[0]))],
+            'episodes_to_target_score': [first_episode(records, 'score', args.target_score) for records in runs],
+            'episodes_to_target_optimal': [first_episode(records, 'optimal_rate', args.target_optimal)
+                                           for records in runs],
+            'final_score': float(np.mean([record['score'] for record in final])),
+            'final_optimal_rate': float(np.mean([record['optimal_rate'] for record in final])),
+            'final_entries': float(np.mean([record['entries'] for record in final])),
+            'train_time': float(np.mean([record['train_time'] for record in final])),
+        }
+    return report
+
+
+def print_report(report):
+    """打印对比表"""
+    print(f"{'回合':>6}" + "".join(f" | {kind:^30}" for kind in report['agents']))
+    print(f"{'':>6}" + " | 得分    最优着法率   条目数      " * len(report['agents']))
+    curves = [agent['curve'] for agent in report['agents'].values()]
+    for points in zip(*curves):
+        print(f"{int(points[0]['episode']):>6}" + "".join(
+            f" | {point['score']:.3f}   {point['optimal_rate']:6.1%}   {point['entries']:8.0f}      " for point in points))
+    print()
+    for kind, agent in report['agents'].items():
+        print(f"{kind}: 完整值表 {report['full_table'][kind]} 个条目，"
+              f"达到得分 {report['target_score']} 的回合 {agent['episodes_to_target_score']}，"
+              f"达到最优着法率 {report['target_optimal']:.0%} 的回合 {agent['episodes_to_target_optimal']}，"
+              f"训练耗时 {agent['train_time']:.2f} 秒")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="后继状态智能体与Q学习智能体的对比基准")
+    parser.add_argument('--episodes', type=int, default=10000, help="每次训练的回合数")
+    parser.add_argument('--checkpoint', type=int, default=1000, help="评估间隔（回合）")
+    parser.add_argument('--seeds', type=int, default=3, help="随机种子数")
+    parser.add_argument('--eval-games', type=int, default=500, help="每次评估对随机对手的局数")
+    parser.add_argument('--target-score', type=float, default=0.9, help="目标得分")
+    parser.add_argument('--target-optimal', type=float, default=0.9, help="目标最优着法率")
+    parser.add_argument('--output', default=None, help="JSON报告输出路径")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"报告已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,24 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import numpy as np
 import time
 import threading
 from PIL import Image, ImageTk, ImageDraw
 from ai_trainer import TicTacToeGame, QLearningAgent, MonteCarloAgent
+from model_registry import ModelRegistry
+from model_mmap import open_model
+from game_records import GameLogWriter
+
+# 对战记录（追加写入，供离线训练和回放使用）
+BATTLE_LOG = "ai_models/battle_games.tttg"
 
 class AIBattleGUI:
-    def __init__(self):
-        """初始化AI对战界面"""
-        self.root = tk.Tk()
+    def __init__(self, master=None):
+        """初始化AI对战界面
+
+        传入 master 时作为该窗口的 Toplevel 子窗口在同一进程中打开
+        """
+        self.root = tk.Toplevel(master) if master is not None else tk.Tk()
         self.root.title("井字棋AI对战 - AI Battle Arena")
         self.root.geometry("800x900")
         self.root.resizable(False, False)
@@ -345,6 +353,11 @@ class AIBattleGUI:
         
         self.battle_stats['total_games'] += 1
         
+        # 记录完整结束的对局
+        if self.game.game_over:
+            with GameLogWriter(BATTLE_LOG) as game_log:
+                game_log.write_history(self.game.move_history, self.game.winner)
+        
         if self.battle_mode:
             self.status_label.configure(text=f"游戏结束！获胜者: {winner_name}")
     
@@ -390,19 +403,27 @@ class AIBattleGUI:
     def load_ai_models(self):
         """加载AI模型"""
         try:
-            # 尝试加载最新训练的模型
-            if self.agent1.load_model("ai_models/models_episode_10000_agent1.pkl"):
-                self.agent1.epsilon = 0.01  # 设置为低探索率
+            # 从模型注册表中查找最新训练的模型
+            registry = ModelRegistry("ai_models")
+            entry = registry.latest()
+            if entry is None:
+                messagebox.showwarning("模型加载", "没有找到已训练的模型，使用默认参数")
+                return
+            
+            # 对战只需要查表选取动作：以只读内存映射方式打开（首次打开时由 pickle 转换）
+            if 'agent1' in entry['files']:
+                self.agent1 = open_model(registry.model_path(entry, 'agent1'), name="QLearning_X")
                 print("QLearning模型加载成功")
             else:
                 print("QLearning模型加载失败，使用默认参数")
             
-            if self.agent2.load_model("ai_models/models_episode_10000_agent2.pkl"):
+            if 'agent2' in entry['files']:
+                self.agent2 = open_model(registry.model_path(entry, 'agent2'), name="MonteCarlo_O")
                 print("MonteCarlo模型加载成功")
             else:
                 print("MonteCarlo模型加载失败，使用默认参数")
             
-            messagebox.showinfo("模型加载", "AI模型加载完成！")
+            messagebox.showinfo("模型加载", f"AI模型加载完成！\n检查点: {entry['prefix']} ({entry['episodes']} 回合)")
             
         except Exception as e:
             messagebox.showerror("加载错误", f"模型加载失败: {e}")
@@ -7,11 +7,10 @@ AI训练启动器
 
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import subprocess
-import sys
 import os
-import threading
 import time
+import worker_pool
+from training_process import TrainingProcess, STATE_DONE, STATE_CANCELLED
 
 class AITrainingLauncher:
     def __init__(self):
@@ -24,11 +23,14 @@ class AITrainingLauncher:
         
         # 训练状态
         self.training_in_progress = False
-        self.training_thread = None
+        self.training_process = None
         
         # 创建界面
         self.create_widgets()
         self.center_window()
+        
+        # 预先启动常驻工作进程，快速训练和AI测试无需再冷启动解释器
+        worker_pool.prewarm()
     
     def create_widgets(self):
         """创建界面组件"""
@@ -100,6 +102,33 @@ class AITrainingLauncher:
                                 textvariable=self.save_interval_var, width=10)
         save_spinbox.pack(side='right')
         
+        # 收敛检测（默认关闭）
+        convergence_frame = tk.Frame(params_frame, bg='#1a1a2e')
+        convergence_frame.pack(fill='x', pady=5)
+        
+        self.convergence_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(convergence_frame, text="收敛后提前结束", variable=self.convergence_var,
+                      font=('Arial', 12), fg='#ecf0f1', bg='#1a1a2e', selectcolor='#2c3e50',
+                      activebackground='#1a1a2e').pack(side='left')
+        
+        self.patience_var = tk.StringVar(value="3")
+        tk.Spinbox(convergence_frame, from_=1, to=20, increment=1,
+                  textvariable=self.patience_var, width=4).pack(side='right')
+        tk.Label(convergence_frame, text="连续窗口:",
+                font=('Arial', 10), fg='#ecf0f1', bg='#1a1a2e').pack(side='right')
+        
+        self.tolerance_var = tk.StringVar(value="0.01")
+        tk.Spinbox(convergence_frame, from_=0.0, to=0.2, increment=0.005,
+                  textvariable=self.tolerance_var, width=6).pack(side='right')
+        tk.Label(convergence_frame, text="阈值:",
+                font=('Arial', 10), fg='#ecf0f1', bg='#1a1a2e').pack(side='right')
+        
+        self.window_var = tk.StringVar(value="500")
+        tk.Spinbox(convergence_frame, from_=100, to=5000, increment=100,
+                  textvariable=self.window_var, width=6).pack(side='right')
+        tk.Label(convergence_frame, text="窗口:",
+                font=('Arial', 10), fg='#ecf0f1', bg='#1a1a2e').pack(side='right')
+        
         # 训练按钮
         button_frame = tk.Frame(training_frame, bg='#1a1a2e')
         button_frame.pack(pady=15)
@@ -214,115 +243,147 @@ class AITrainingLauncher:
         
         episodes = int(self.episodes_var.get())
         save_interval = int(self.save_interval_var.get())
+        convergence = None
+        if self.convergence_var.get():
+            convergence = {
+                'window': int(self.window_var.get()),
+                'policy_tolerance': float(self.tolerance_var.get()),
+                'patience': int(self.patience_var.get()),
+            }
         
         self.training_in_progress = True
         self.start_training_btn.configure(state='disabled')
         self.stop_training_btn.configure(state='normal')
+        self.training_status.configure(text="正在启动训练...", fg='#f39c12')
         
-        # 启动训练线程
-        self.training_thread = threading.Thread(
-            target=self.run_training, 
-            args=(episodes, save_interval), 
-            daemon=True
-        )
-        self.training_thread.start()
+        try:
+            # 在独立子进程中训练，界面通过共享内存读取进度
+            self.training_process = TrainingProcess(episodes, save_interval, convergence=convergence)
+            self.training_process.start()
+        except Exception as e:
+            self.finish_training()
+            self.training_status.configure(text=f"训练出错: {e}", fg='#e74c3c')
+            messagebox.showerror("训练错误", f"无法启动训练进程: {e}")
+            return
+        
+        self.root.after(200, self.poll_training)
     
     def stop_training(self):
         """停止训练"""
+        if self.training_process is None:
+            return
+        
+        # 训练进程会在当前回合结束后保存检查点并退出
+        self.training_process.stop()
+        self.stop_training_btn.configure(state='disabled')
+        self.training_status.configure(text="正在停止训练...", fg='#e74c3c')
+    
+    def poll_training(self):
+        """定期读取训练进度"""
+        if self.training_process is None:
+            return
+        
+        progress = self.training_process.poll()
+        if not progress['finished']:
+            if progress['episode'] > 0 and not self.training_process.stop_event.is_set():
+                self.training_status.configure(
+                    text=f"训练中: {progress['episode']}/{progress['total_episodes']} 回合 "
+                         f"({progress['elapsed']:.0f} 秒)", fg='#3498db')
+            self.root.after(200, self.poll_training)
+            return
+        
+        self.finish_training()
+        
+        if progress['state'] == STATE_DONE:
+            self.training_status.configure(text="训练完成！", fg='#2ecc71')
+            converged = (f"策略已在第 {progress['converged_at']} 回合收敛，提前结束\n"
+                         if progress['converged_at'] else "")
+            messagebox.showinfo("训练完成", 
+                              f"训练完成！\n"
+                              f"{converged}"
+                              f"总回合数: {progress['episode']}\n"
+                              f"模型已保存到 ai_models/ 目录")
+        elif progress['state'] == STATE_CANCELLED:
+            self.training_status.configure(text=f"训练已停止，已保存第 {progress['episode']} 回合的检查点",
+                                           fg='#e74c3c')
+        else:
+            self.training_status.configure(text="训练出错", fg='#e74c3c')
+            messagebox.showerror("训练错误", "训练进程异常退出，请查看控制台输出")
+    
+    def finish_training(self):
+        """清理训练进程并恢复按钮状态"""
+        if self.training_process is not None:
+            self.training_process.join(timeout=5)
+            self.training_process = None
+        
         self.training_in_progress = False
         self.start_training_btn.configure(state='normal')
         self.stop_training_btn.configure(state='disabled')
-        self.training_status.configure(text="训练已停止", fg='#e74c3c')
     
-    def run_training(self, episodes, save_interval):
-        """运行训练"""
+    def wait_for_job(self, future, on_done, on_error):
+        """轮询工作进程任务，完成后在界面线程中回调"""
+        if not future.done():
+            self.root.after(100, self.wait_for_job, future, on_done, on_error)
+            return
+        
         try:
-            self.training_status.configure(text="正在启动训练...", fg='#f39c12')
-            
-            # 导入训练模块
-            from ai_trainer import AITrainer
-            
-            trainer = AITrainer()
-            
-            self.training_status.configure(text=f"开始训练 {episodes} 个回合...", fg='#3498db')
-            
-            # 开始训练
-            trainer.train(episodes, save_interval)
-            
-            if self.training_in_progress:
-                self.training_status.configure(text="训练完成！", fg='#2ecc71')
-                trainer.save_models()
-                
-                # 显示完成消息
-                messagebox.showinfo("训练完成", 
-                                  f"训练完成！\n"
-                                  f"总回合数: {episodes}\n"
-                                  f"模型已保存到 ai_models/ 目录")
-            
+            result = future.result()
         except Exception as e:
-            self.training_status.configure(text=f"训练出错: {e}", fg='#e74c3c')
-            messagebox.showerror("训练错误", f"训练过程中出现错误: {e}")
-        
-        finally:
-            self.training_in_progress = False
-            self.start_training_btn.configure(state='normal')
-            self.stop_training_btn.configure(state='disabled')
+            on_error(e)
+        else:
+            on_done(result)
     
     def quick_train(self):
         """快速训练"""
         try:
             self.training_status.configure(text="启动快速训练...", fg='#f39c12')
             
-            # 运行快速训练脚本
-            result = subprocess.run([sys.executable, 'quick_train.py'], 
-                                  capture_output=True, text=True, timeout=300)
+            # 在常驻工作进程中运行快速训练
+            future = worker_pool.submit(worker_pool.run_quick_train)
+            self.wait_for_job(future, self.on_quick_train_done, self.on_quick_train_error)
             
-            if result.returncode == 0:
-                self.training_status.configure(text="快速训练完成！", fg='#2ecc71')
-                messagebox.showinfo("快速训练完成", "快速训练已完成！\n模型已保存到 ai_models/ 目录")
-            else:
-                self.training_status.configure(text="快速训练失败", fg='#e74c3c')
-                messagebox.showerror("快速训练失败", f"快速训练失败: {result.stderr}")
-                
-        except subprocess.TimeoutExpired:
-            self.training_status.configure(text="快速训练超时", fg='#e74c3c')
-            messagebox.showerror("训练超时", "快速训练超时，请尝试手动训练")
         except Exception as e:
-            self.training_status.configure(text=f"快速训练出错: {e}", fg='#e74c3c')
-            messagebox.showerror("快速训练错误", f"快速训练出错: {e}")
+            self.on_quick_train_error(e)
+    
+    def on_quick_train_done(self, result):
+        """快速训练完成"""
+        self.training_status.configure(text="快速训练完成！", fg='#2ecc71')
+        messagebox.showinfo("快速训练完成", "快速训练已完成！\n模型已保存到 ai_models/ 目录")
+    
+    def on_quick_train_error(self, error):
+        """快速训练出错"""
+        self.training_status.configure(text=f"快速训练出错: {error}", fg='#e74c3c')
+        messagebox.showerror("快速训练错误", f"快速训练出错: {error}")
     
     def open_battle_gui(self):
         """打开AI对战界面"""
         try:
-            subprocess.Popen([sys.executable, 'ai_battle_gui.py'])
-            messagebox.showinfo("AI对战", "AI对战界面已启动！")
+            # 在当前进程中以子窗口形式打开，无需启动新的解释器
+            from ai_battle_gui import AIBattleGUI
+            
+            battle_gui = AIBattleGUI(master=self.root)
+            battle_gui.root.focus_force()
         except Exception as e:
             messagebox.showerror("启动失败", f"无法启动AI对战界面: {e}")
     
     def show_training_stats(self):
         """显示训练统计"""
         try:
-            # 检查是否有训练统计文件
-            stats_files = [f for f in os.listdir('ai_models') if f.endswith('_stats.json')]
+            # 从模型注册表中查询最新的检查点，其主要指标已记录在索引中
+            from model_registry import ModelRegistry
+            entry = ModelRegistry('ai_models').latest()
             
-            if not stats_files:
+            if entry is None:
                 messagebox.showwarning("无数据", "没有找到训练统计文件，请先进行训练")
                 return
             
-            # 显示最新的统计文件
-            latest_stats = max(stats_files, key=lambda x: os.path.getctime(f'ai_models/{x}'))
-            
-            import json
-            with open(f'ai_models/{latest_stats}', 'r') as f:
-                stats = json.load(f)
-            
             # 创建统计窗口
-            self.create_stats_window(stats)
+            self.create_stats_window(entry)
             
         except Exception as e:
             messagebox.showerror("统计错误", f"无法显示训练统计: {e}")
     
-    def create_stats_window(self, stats):
+    def create_stats_window(self, entry):
         """创建统计窗口"""
         stats_window = tk.Toplevel(self.root)
         stats_window.title("训练统计")
@@ -330,22 +391,19 @@ class AITrainingLauncher:
         stats_window.configure(bg='#1a1a2e')
         
         # 统计信息显示
-        total_episodes = len(stats['episodes'])
-        agent1_wins = stats['agent1_wins'][-1] if stats['agent1_wins'] else 0
-        agent2_wins = stats['agent2_wins'][-1] if stats['agent2_wins'] else 0
-        draws = stats['draws'][-1] if stats['draws'] else 0
+        metrics = entry['metrics']
         
         stats_text = f"""
-训练统计信息:
-总训练回合数: {total_episodes}
-QLearning Agent 胜利: {agent1_wins}
-MonteCarlo Agent 胜利: {agent2_wins}
-平局: {draws}
+训练统计信息 ({entry['prefix']}):
+总训练回合数: {entry['episodes']}
+QLearning Agent 胜利: {metrics['agent1_wins']}
+MonteCarlo Agent 胜利: {metrics['agent2_wins']}
+平局: {metrics['draws']}
 
 胜率统计:
-QLearning Agent: {agent1_wins/(agent1_wins+agent2_wins+draws)*100:.1f}%
-MonteCarlo Agent: {agent2_wins/(agent1_wins+agent2_wins+draws)*100:.1f}%
-平局率: {draws/(agent1_wins+agent2_wins+draws)*100:.1f}%
+QLearning Agent: {metrics['agent1_win_rate']*100:.1f}%
+MonteCarlo Agent: {metrics['agent2_win_rate']*100:.1f}%
+平局率: {metrics['draw_rate']*100:.1f}%
         """
         
         stats_label = tk.Label(stats_window, text=stats_text,
@@ -376,19 +434,21 @@ MonteCarlo Agent: {agent2_wins/(agent1_wins+agent2_wins+draws)*100:.1f}%
     def test_ai(self):
         """测试AI"""
         try:
-            # 运行AI测试
-            result = subprocess.run([sys.executable, '-c', 
-                                   'from ai_trainer import AITrainer; trainer = AITrainer(); trainer.load_models(); print("AI测试完成")'],
-                                  capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                messagebox.showinfo("AI测试", "AI测试完成！")
-            else:
-                messagebox.showerror("AI测试失败", f"AI测试失败: {result.stderr}")
+            # 在常驻工作进程中运行AI测试
+            future = worker_pool.submit(worker_pool.run_ai_test)
+            self.wait_for_job(future, self.on_test_ai_done,
+                              lambda e: messagebox.showerror("测试错误", f"AI测试出错: {e}"))
                 
         except Exception as e:
             messagebox.showerror("测试错误", f"AI测试出错: {e}")
     
+    def on_test_ai_done(self, loaded):
+        """AI测试完成"""
+        if loaded:
+            messagebox.showinfo("AI测试", "AI测试完成！")
+        else:
+            messagebox.showerror("AI测试失败", "AI测试失败: 未找到模型文件")
+    
     def center_window(self):
         """居中显示窗口"""
         self.root.update_idletasks()
@@ -400,7 +460,13 @@ MonteCarlo Agent: {agent2_wins/(agent1_wins+agent2_wins+draws)*100:.1f}%
     
     def run(self):
         """运行应用程序"""
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            if self.training_process is not None:
+                self.training_process.stop()
+                self.training_process.join(timeout=5)
+            worker_pool.shutdown()
 
 
 def main():
@@ -6,20 +6,80 @@
 """
 
 import numpy as np
-import random
-import pickle
 import json
+import math
 import time
-from collections import defaultdict, deque
-import matplotlib.pyplot as plt
+import threading
 from typing import List, Tuple, Dict, Optional
 import os
+import sys
+from types import MappingProxyType
+from random_streams import RandomStream, default_stream
+import game_rules
+
+# matplotlib 与 pickle 只在绘图/存取模型时才需要，推迟到首次使用时导入，
+# 避免 ai_battle_gui、quick_train 等入口在启动时支付 matplotlib 的导入开销
+
+# 状态编号：把棋盘按三进制编码（空=0, X=1, O=2），共 3^9 个编号
+NUM_STATES = 3 ** 9
+POWERS_OF_THREE = 3 ** np.arange(9)
+
+# 读取不存在的状态时使用的只读空动作表
+EMPTY_ACTIONS = MappingProxyType({})
+
+
+def state_index(state):
+    """获取棋盘状态的三进制编号"""
+    return int(np.dot(np.asarray(state).ravel() % 3, POWERS_OF_THREE))
+
+
+def decode_state_bytes(raw):
+    """把 state.tobytes() 得到的字节还原为 3x3 棋盘"""
+    dtype = np.int64 if len(raw) == 72 else np.int32
+    return np.frombuffer(raw, dtype=dtype).reshape(3, 3)
+
+
+def index_to_board(index):
+    """把状态编号还原为与 TicTacToeGame 相同类型的 3x3 棋盘（1=X, -1=O）"""
+    digits = (index // POWERS_OF_THREE) % 3
+    return np.where(digits == 2, -1, digits).astype(int).reshape(3, 3)
+
+
+def legacy_state_key(index, player=1):
+    """状态编号 -> 旧版模型文件中使用的字符串状态键（棋盘字节串_玩家）"""
+    return f"{index_to_board(index).tobytes()}_{player}"
+
+
+def parse_legacy_state_key(state_key):
+    """旧版字符串状态键 -> 状态编号"""
+    import ast
+    return state_index(decode_state_bytes(ast.literal_eval(state_key.rsplit('_', 1)[0])))
+
+
+_afterstate_table = None
+
+
+def afterstate_table():
+    """(NUM_STATES, 9) 的后继状态编号：在状态 s 的第 cell 格按轮到的一方落子后的编号，非法落子为-1
+
+    轮到哪一方由棋子数决定（X先手）；首次调用时计算
+    """
+    global _afterstate_table
+    if _afterstate_table is None:
+        digits = (np.arange(NUM_STATES)[:, None] // POWERS_OF_THREE) % 3
+        mover = np.where((digits != 0).sum(axis=1) % 2 == 0, 1, 2)
+        after = np.arange(NUM_STATES)[:, None] + mover[:, None] * POWERS_OF_THREE
+        _afterstate_table = np.where(digits == 0, after, -1)
+    return _afterstate_table
+
 
 class TicTacToeGame:
     """井字棋游戏环境"""
     
     def __init__(self):
         self.board = np.zeros((3, 3), dtype=int)
+        self.index = 0  # 三进制状态编号，随落子增量更新
+        self.zobrist_key = 0  # 64位 Zobrist 哈希键，随落子/悔棋增量更新
         self.current_player = 1  # 1 for X, -1 for O
         self.game_over = False
         self.winner = None
@@ -28,6 +88,8 @@ class TicTacToeGame:
     def reset(self):
         """重置游戏"""
         self.board = np.zeros((3, 3), dtype=int)
+        self.index = 0
+        self.zobrist_key = 0
         self.current_player = 1
         self.game_over = False
         self.winner = None
@@ -40,14 +102,18 @@ class TicTacToeGame:
     
     def get_valid_moves(self):
         """获取所有有效移动"""
-        return [(i, j) for i in range(3) for j in range(3) if self.board[i, j] == 0]
+        return [divmod(cell, 3) for cell in game_rules.legal_cells(self.index)]
     
     def make_move(self, row, col):
         """执行移动"""
         if self.board[row, col] != 0 or self.game_over:
             return False, 0
         
+        cell = row * 3 + col
+        digit = game_rules.X if self.current_player == 1 else game_rules.O
         self.board[row, col] = self.current_player
+        self.index = game_rules.place(self.index, cell, digit)
+        self.zobrist_key = game_rules.ZOBRIST.toggle(self.zobrist_key, cell, digit)
         self.move_history.append((row, col, self.current_player))
         
         # 检查游戏是否结束
@@ -59,43 +125,38 @@ class TicTacToeGame:
         return True, reward
     
     def check_game_end(self):
-        """检查游戏是否结束"""
-        # 检查行
-        for i in range(3):
-            if abs(self.board[i].sum()) == 3:
-                self.game_over = True
-                self.winner = self.current_player
-                return 1, True
-        
-        # 检查列
-        for j in range(3):
-            if abs(self.board[:, j].sum()) == 3:
-                self.game_over = True
-                self.winner = self.current_player
-                return 1, True
-        
-        # 检查对角线
-        if abs(np.trace(self.board)) == 3:
-            self.game_over = True
-            self.winner = self.current_player
-            return 1, True
-        
-        if abs(np.trace(np.fliplr(self.board))) == 3:
-            self.game_over = True
-            self.winner = self.current_player
-            return 1, True
-        
-        # 检查平局
-        if len(self.get_valid_moves()) == 0:
-            self.game_over = True
+        """检查游戏是否结束（查规则表）"""
+        outcome = game_rules.outcome(self.index)
+        if outcome == game_rules.ONGOING:
+            return 0, False
+        
+        self.game_over = True
+        if outcome == game_rules.DRAW:
             self.winner = 0
             return 0, True
         
-        return 0, False
+        self.winner = self.current_player
+        return 1, True
+    
+    def undo_move(self):
+        """撤销最后一步，返回被撤销的 (行, 列, 玩家)；没有可撤销的落子时返回 None"""
+        if not self.move_history:
+            return None
+        
+        row, col, player = self.move_history.pop()
+        cell = row * 3 + col
+        digit = game_rules.X if player == 1 else game_rules.O
+        self.board[row, col] = 0
+        self.index -= digit * game_rules.CELL_POWERS[cell]
+        self.zobrist_key = game_rules.ZOBRIST.toggle(self.zobrist_key, cell, digit)
+        self.current_player = player
+        self.game_over = False
+        self.winner = None
+        return row, col, player
     
     def get_board_hash(self):
-        """获取棋盘状态的哈希值"""
-        return str(self.board.flatten())
+        """获取棋盘状态的哈希值（64位 Zobrist 键）"""
+        return self.zobrist_key
     
     def display_board(self):
         """显示棋盘"""
@@ -108,12 +169,17 @@ class TicTacToeGame:
 class QLearningAgent:
     """Q学习智能体"""
     
-    def __init__(self, name="QLearningAgent", learning_rate=0.1, discount_factor=0.9, epsilon=0.1):
+    def __init__(self, name="QLearningAgent", learning_rate=0.1, discount_factor=0.9, epsilon=0.1, epsilon_decay=0.995,
+                 rng=None):
         self.name = name
+        self.rng = rng if rng is not None else default_stream()
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         self.epsilon = epsilon
-        self.q_table = defaultdict(lambda: defaultdict(float))
+        self.epsilon_decay = epsilon_decay
+        # 状态编号 -> {动作: Q值}；只保存真正更新过的状态-动作：读取时不插入条目，未出现的条目视为0。
+        # 模型文件中仍使用旧版字符串状态键，保存和加载时转换
+        self.q_table = {}
         self.episode_rewards = []
         self.episode_lengths = []
         self.win_count = 0
@@ -121,54 +187,111 @@ class QLearningAgent:
         self.draw_count = 0
     
     def get_state_key(self, state, player):
-        """获取状态键"""
-        return f"{state.tobytes()}_{player}"
+        """获取状态键（状态编号）"""
+        return state_index(state)
     
-    def choose_action(self, state, valid_moves, training=True):
-        """选择动作"""
-        if training and random.random() < self.epsilon:
-            return random.choice(valid_moves)
+    def choose_action(self, state, valid_moves, training=True, index=None):
+        """选择动作
+
+        index: 棋盘的状态编号（如 TicTacToeGame.index），调用方提供时不再从棋盘计算
+        """
+        if training and self.rng.random() < self.epsilon:
+            return self.rng.choice(valid_moves)
         
-        state_key = self.get_state_key(state, 1)  # 假设当前玩家是1
-        q_values = [self.q_table[state_key][move] for move in valid_moves]
+        state_key = index if index is not None else self.get_state_key(state, 1)  # 假设当前玩家是1
+        actions = self.q_table.get(state_key, EMPTY_ACTIONS)
+        q_values = [actions.get(move, 0.0) for move in valid_moves]
         
         if not q_values or all(q == 0 for q in q_values):
-            return random.choice(valid_moves)
+            return self.rng.choice(valid_moves)
         
         max_q = max(q_values)
         best_moves = [move for i, move in enumerate(valid_moves) if q_values[i] == max_q]
-        return random.choice(best_moves)
+        return self.rng.choice(best_moves)
     
-    def update_q_value(self, state, action, reward, next_state, done):
-        """更新Q值"""
-        state_key = self.get_state_key(state, 1)
-        next_state_key = self.get_state_key(next_state, 1)
+    def update_q_value(self, state, action, reward, next_state, done, index=None, next_index=None):
+        """更新Q值（index/next_index 为两个棋盘的状态编号，调用方提供时不再从棋盘计算）"""
+        state_key = index if index is not None else self.get_state_key(state, 1)
+        next_state_key = next_index if next_index is not None else self.get_state_key(next_state, 1)
         
-        current_q = self.q_table[state_key][action]
+        actions = self.q_table.get(state_key, EMPTY_ACTIONS)
+        current_q = actions.get(action, 0.0)
         
         if done:
             target_q = reward
         else:
-            next_q_values = [self.q_table[next_state_key][move] for move in self.get_valid_moves_from_state(next_state)]
+            next_actions = self.q_table.get(next_state_key, EMPTY_ACTIONS)
+            next_q_values = [next_actions.get(divmod(cell, 3), 0.0) for cell in game_rules.legal_cells(next_state_key)]
             target_q = reward + self.discount_factor * (max(next_q_values) if next_q_values else 0)
         
-        self.q_table[state_key][action] += self.learning_rate * (target_q - current_q)
+        new_q = current_q + self.learning_rate * (target_q - current_q)
+        if new_q != 0.0 or action in actions:
+            self.q_table.setdefault(state_key, {})[action] = new_q
+    
+    def to_q_array(self):
+        """导出为 (NUM_STATES, 9) 的稠密Q值数组"""
+        q_array = np.zeros((NUM_STATES, 9), dtype=np.float32)
+        for index, actions in self.q_table.items():
+            for (row, col), value in actions.items():
+                q_array[index, row * 3 + col] = value
+        return q_array
+    
+    def load_q_array(self, q_array):
+        """从 (NUM_STATES, 9) 的稠密Q值数组载入Q表（只保留非零条目）"""
+        self.q_table = {}
+        for index in np.flatnonzero(np.asarray(q_array).any(axis=1)).tolist():
+            self.q_table[index] = {divmod(cell, 3): float(q_array[index, cell])
+                                   for cell in np.flatnonzero(q_array[index]).tolist()}
+    
+    def memory_report(self):
+        """统计Q表的条目数、占用字节数和零值条目比例"""
+        num_entries = sum(len(actions) for actions in self.q_table.values())
+        zero_entries = sum(1 for actions in self.q_table.values() for value in actions.values() if value == 0.0)
+        num_bytes = sys.getsizeof(self.q_table) + sum(
+            sys.getsizeof(state_key) + sys.getsizeof(actions) + sum(sys.getsizeof(value) for value in actions.values())
+            for state_key, actions in self.q_table.items())
+        return {
+            'states': len(self.q_table),
+            'entries': num_entries,
+            'zero_entries': zero_entries,
+            'zero_fraction': zero_entries / num_entries if num_entries else 0.0,
+            'bytes': num_bytes,
+        }
+    
+    def prune(self, threshold=0.0):
+        """删除绝对值不超过 threshold 的Q值以及随之变空的状态，返回删除的条目数"""
+        removed = 0
+        for state_key in list(self.q_table):
+            actions = self.q_table[state_key]
+            for move in [move for move, value in actions.items() if abs(value) <= threshold]:
+                del actions[move]
+                removed += 1
+            if not actions:
+                del self.q_table[state_key]
+        return removed
     
     def get_valid_moves_from_state(self, state):
         """从状态获取有效移动"""
         return [(i, j) for i in range(3) for j in range(3) if state[i, j] == 0]
     
-    def decay_epsilon(self, decay_rate=0.995):
-        """衰减探索率"""
+    def decay_epsilon(self, decay_rate=None):
+        """衰减探索率（默认使用 epsilon_decay）"""
+        if decay_rate is None:
+            decay_rate = self.epsilon_decay
         self.epsilon = max(0.01, self.epsilon * decay_rate)
     
     def save_model(self, filename):
         """保存模型"""
+        import pickle
+        # 零值条目与不存在的条目等价，不写入文件；状态键转换为旧版字符串格式，保持文件兼容
+        q_table = {legacy_state_key(index): {move: value for move, value in actions.items() if value != 0.0}
+                   for index, actions in self.q_table.items()}
         model_data = {
-            'q_table': dict(self.q_table),
+            'q_table': {state_key: actions for state_key, actions in q_table.items() if actions},
             'learning_rate': self.learning_rate,
             'discount_factor': self.discount_factor,
             'epsilon': self.epsilon,
+            'epsilon_decay': self.epsilon_decay,
             'win_count': self.win_count,
             'loss_count': self.loss_count,
             'draw_count': self.draw_count
@@ -178,13 +301,18 @@ class QLearningAgent:
     
     def load_model(self, filename):
         """加载模型"""
+        import pickle
         with open(filename, 'rb') as f:
             model_data = pickle.load(f)
         
-        self.q_table = defaultdict(lambda: defaultdict(float), model_data['q_table'])
+        self.q_table = {parse_legacy_state_key(state_key): dict(actions)
+                        for state_key, actions in model_data['q_table'].items()}
+        # 旧版模型中含有大量读取时插入的零值条目
+        self.prune()
         self.learning_rate = model_data['learning_rate']
         self.discount_factor = model_data['discount_factor']
         self.epsilon = model_data['epsilon']
+        self.epsilon_decay = model_data.get('epsilon_decay', 0.995)
         self.win_count = model_data['win_count']
         self.loss_count = model_data['loss_count']
         self.draw_count = model_data['draw_count']
@@ -193,47 +321,52 @@ class QLearningAgent:
 class MonteCarloAgent:
     """蒙特卡洛树搜索智能体"""
     
-    def __init__(self, name="MonteCarloAgent", exploration_constant=1.4):
+    def __init__(self, name="MonteCarloAgent", exploration_constant=1.4, rng=None):
         self.name = name
+        self.rng = rng if rng is not None else default_stream()
         self.exploration_constant = exploration_constant
-        self.state_action_counts = defaultdict(lambda: defaultdict(int))
-        self.state_action_values = defaultdict(lambda: defaultdict(float))
+        # 按状态编号索引的 (NUM_STATES, 9) 访问次数和平均回报，内存占用固定
+        self.state_action_counts = np.zeros((NUM_STATES, 9), dtype=np.int32)
+        self.state_action_values = np.zeros((NUM_STATES, 9), dtype=np.float32)
         self.win_count = 0
         self.loss_count = 0
         self.draw_count = 0
     
     def get_state_key(self, state):
-        """获取状态键"""
-        return state.tobytes()
+        """获取状态键（状态编号）"""
+        return state_index(state)
     
-    def choose_action(self, state, valid_moves, training=True):
-        """选择动作（使用UCB1算法）"""
+    def choose_action(self, state, valid_moves, training=True, index=None):
+        """选择动作（使用UCB1算法；index 为棋盘的状态编号，调用方提供时不再从棋盘计算）"""
         if not valid_moves:
             return None
         
         if training:
-            return self.ucb1_action(state, valid_moves)
+            return self.ucb1_action(state, valid_moves, index)
         else:
-            return self.best_action(state, valid_moves)
+            return self.best_action(state, valid_moves, index)
     
-    def ucb1_action(self, state, valid_moves):
+    def ucb1_action(self, state, valid_moves, index=None):
         """使用UCB1算法选择动作"""
-        state_key = self.get_state_key(state)
-        total_visits = sum(self.state_action_counts[state_key][move] for move in valid_moves)
+        state_key = index if index is not None else self.get_state_key(state)
+        counts = self.state_action_counts[state_key].tolist()
+        total_visits = sum(counts[row * 3 + col] for row, col in valid_moves)
         
         if total_visits == 0:
-            return random.choice(valid_moves)
+            return self.rng.choice(valid_moves)
         
+        values = self.state_action_values[state_key].tolist()
+        log_total = math.log(total_visits)
         best_action = None
         best_value = float('-inf')
         
         for move in valid_moves:
-            visits = self.state_action_counts[state_key][move]
+            cell = move[0] * 3 + move[1]
+            visits = counts[cell]
             if visits == 0:
                 return move
             
-            value = self.state_action_values[state_key][move]
-            ucb_value = value + self.exploration_constant * np.sqrt(np.log(total_visits) / visits)
+            ucb_value = values[cell] + self.exploration_constant * math.sqrt(log_total / visits)
             
             if ucb_value > best_value:
                 best_value = ucb_value
@@ -241,32 +374,80 @@ class MonteCarloAgent:
         
         return best_action
     
-    def best_action(self, state, valid_moves):
+    def best_action(self, state, valid_moves, index=None):
         """选择最佳动作（不探索）"""
-        state_key = self.get_state_key(state)
+        values = self.state_action_values[index if index is not None else self.get_state_key(state)].tolist()
         best_action = None
         best_value = float('-inf')
         
         for move in valid_moves:
-            value = self.state_action_values[state_key][move]
+            value = values[move[0] * 3 + move[1]]
             if value > best_value:
                 best_value = value
                 best_action = move
         
-        return best_action if best_action else random.choice(valid_moves)
+        return best_action if best_action else self.rng.choice(valid_moves)
+    
+    def to_value_array(self):
+        """导出为 (NUM_STATES, 9) 的稠密状态-动作值数组"""
+        return self.state_action_values.copy()
+    
+    def memory_report(self):
+        """统计已访问的状态-动作条目数、数组占用字节数和零值条目比例"""
+        num_entries = self.state_action_counts.size
+        visited = int(np.count_nonzero(self.state_action_counts))
+        return {
+            'states': int(np.count_nonzero(self.state_action_counts.any(axis=1))),
+            'entries': visited,
+            'zero_entries': num_entries - visited,
+            'zero_fraction': (num_entries - visited) / num_entries,
+            'bytes': self.state_action_counts.nbytes + self.state_action_values.nbytes,
+        }
+    
+    def prune(self, min_visits=1):
+        """清除访问次数少于 min_visits 的统计，返回清除的条目数"""
+        mask = (self.state_action_counts > 0) & (self.state_action_counts < min_visits)
+        self.state_action_counts[mask] = 0
+        self.state_action_values[mask] = 0.0
+        return int(np.count_nonzero(mask))
     
     def update_values(self, episode):
-        """更新状态-动作值"""
-        for state, action, reward in episode:
-            state_key = self.get_state_key(state)
-            self.state_action_counts[state_key][action] += 1
-            self.state_action_values[state_key][action] += (reward - self.state_action_values[state_key][action]) / self.state_action_counts[state_key][action]
+        """更新状态-动作值（整局一次性向量化更新）"""
+        if not episode:
+            return
+        
+        boards = np.stack([np.asarray(state).ravel() for state, _, _ in episode])
+        indices = (boards % 3) @ POWERS_OF_THREE
+        cells = np.array([row * 3 + col for _, (row, col), _ in episode])
+        rewards = np.array([reward for _, _, reward in episode], dtype=np.float64)
+        self.update_batch(indices, cells, rewards)
+    
+    def update_batch(self, indices, cells, rewards):
+        """批量更新：把每个 (状态编号, 格子, 回报) 样本计入对应的平均回报
+
+        同一状态-动作在一批中出现多次时，结果与逐个样本增量更新相同
+        """
+        flat_counts = self.state_action_counts.reshape(-1)
+        flat_values = self.state_action_values.reshape(-1)
+        
+        flat = np.asarray(indices, dtype=np.int64) * 9 + np.asarray(cells, dtype=np.int64)
+        unique, inverse = np.unique(flat, return_inverse=True)
+        sample_counts = np.bincount(inverse)
+        reward_sums = np.bincount(inverse, weights=rewards)
+        
+        np.add.at(flat_counts, unique, sample_counts.astype(np.int32))
+        old_values = flat_values[unique]
+        flat_values[unique] = old_values + (reward_sums - sample_counts * old_values) / flat_counts[unique]
     
     def save_model(self, filename):
-        """保存模型"""
+        """保存模型（只保存访问过的状态-动作）"""
+        import pickle
+        visited = np.flatnonzero(self.state_action_counts)
         model_data = {
-            'state_action_counts': dict(self.state_action_counts),
-            'state_action_values': dict(self.state_action_values),
+            'format': 'array',
+            'visited': visited.astype(np.int32),
+            'state_action_counts': self.state_action_counts.reshape(-1)[visited],
+            'state_action_values': self.state_action_values.reshape(-1)[visited],
             'exploration_constant': self.exploration_constant,
             'win_count': self.win_count,
             'loss_count': self.loss_count,
@@ -276,25 +457,238 @@ class MonteCarloAgent:
             pickle.dump(model_data, f)
     
     def load_model(self, filename):
-        """加载模型"""
+        """加载模型（兼容旧版嵌套字典格式）"""
+        import pickle
         with open(filename, 'rb') as f:
             model_data = pickle.load(f)
         
-        self.state_action_counts = defaultdict(lambda: defaultdict(int), model_data['state_action_counts'])
-        self.state_action_values = defaultdict(lambda: defaultdict(float), model_data['state_action_values'])
+        self.state_action_counts = np.zeros((NUM_STATES, 9), dtype=np.int32)
+        self.state_action_values = np.zeros((NUM_STATES, 9), dtype=np.float32)
+        
+        if model_data.get('format') == 'array':
+            visited = model_data['visited']
+            self.state_action_counts.reshape(-1)[visited] = model_data['state_action_counts']
+            self.state_action_values.reshape(-1)[visited] = model_data['state_action_values']
+        else:
+            for table, key in ((self.state_action_counts, 'state_action_counts'),
+                               (self.state_action_values, 'state_action_values')):
+                for state_key, actions in model_data[key].items():
+                    index = state_index(decode_state_bytes(state_key))
+                    for (row, col), value in actions.items():
+                        table[index, row * 3 + col] = value
+        
         self.exploration_constant = model_data['exploration_constant']
         self.win_count = model_data['win_count']
         self.loss_count = model_data['loss_count']
         self.draw_count = model_data['draw_count']
 
 
+class AfterstateAgent:
+    """后继状态值智能体
+
+    学习"落子后的棋盘"（后继状态）的价值，而不是每个 (状态, 动作) 各自的Q值：
+    不同局面下走出同一个棋盘的动作共享同一个值。选择动作时评估每个合法落子得到的棋盘。
+    X、O 的后继状态棋子数奇偶不同，互不重叠，因此同一张表可以同时学习双方
+    （与蒙特卡洛智能体一样在对局结束后按整局数据更新，执X或执O均可）
+    """
+    
+    def __init__(self, name="AfterstateAgent", learning_rate=0.2, discount_factor=0.9, epsilon=0.1,
+                 epsilon_decay=0.995, rng=None):
+        self.name = name
+        self.rng = rng if rng is not None else default_stream()
+        self.learning_rate = learning_rate
+        self.discount_factor = discount_factor
+        self.epsilon = epsilon
+        self.epsilon_decay = epsilon_decay
+        # 按后继状态编号索引的值（落子一方视角）和更新次数
+        self.values = np.zeros(NUM_STATES, dtype=np.float32)
+        self.visits = np.zeros(NUM_STATES, dtype=np.int32)
+        self.win_count = 0
+        self.loss_count = 0
+        self.draw_count = 0
+    
+    @staticmethod
+    def afterstate(index, cell):
+        """状态编号为 index 时在 cell 格落子后的编号"""
+        return int(afterstate_table()[index, cell])
+    
+    def choose_action(self, state, valid_moves, training=True, index=None):
+        """选择动作：按后继状态的值贪心选择（训练时以 epsilon 的概率随机探索）
+
+        index: 棋盘的状态编号，调用方提供时不再从棋盘计算
+        """
+        if not valid_moves:
+            return None
+        if training and self.rng.random() < self.epsilon:
+            return self.rng.choice(valid_moves)
+        
+        after = afterstate_table()[index if index is not None else state_index(state)].tolist()
+        values = [float(self.values[after[row * 3 + col]]) for row, col in valid_moves]
+        max_value = max(values)
+        return self.rng.choice([move for move, value in zip(valid_moves, values) if value == max_value])
+    
+    def update_values(self, episode):
+        """按整局数据更新：episode 为 [(落子前状态, 动作, 即时奖励), ...]，包含双方的全部落子
+
+        每一方的后继状态序列从终局开始倒序做TD(0)更新：最后一个后继状态趋向终局奖励
+        （胜1、负-1、平0），之前的趋向下一个后继状态的折扣值
+        """
+        if not episode:
+            return
+        
+        table = afterstate_table()
+        afterstates = {0: [], 1: []}
+        for step, (state, action, _) in enumerate(episode):
+            afterstates[step % 2].append(int(table[state_index(state), action[0] * 3 + action[1]]))
+        
+        last_side = (len(episode) - 1) % 2
+        won = episode[-1][2] > 0
+        for side, sequence in afterstates.items():
+            target = (1.0 if side == last_side else -1.0) if won else 0.0
+            for index in reversed(sequence):
+                self.values[index] += self.learning_rate * (target - self.values[index])
+                self.visits[index] += 1
+                target = self.discount_factor * float(self.values[index])
+    
+    def to_value_array(self):
+        """导出为 (NUM_STATES, 9) 的状态-动作值数组（每个合法落子取其后继状态的值）"""
+        table = afterstate_table()
+        return np.where(table >= 0, self.values[np.maximum(table, 0)], 0.0).astype(np.float32)
+    
+    def memory_report(self):
+        """统计已学习的后继状态数和数组占用字节数"""
+        learned = int(np.count_nonzero(self.visits))
+        return {
+            'states': learned,
+            'entries': learned,
+            'zero_entries': NUM_STATES - learned,
+            'zero_fraction': (NUM_STATES - learned) / NUM_STATES,
+            'bytes': self.values.nbytes + self.visits.nbytes,
+        }
+    
+    def decay_epsilon(self, decay_rate=None):
+        """衰减探索率（默认使用 epsilon_decay）"""
+        if decay_rate is None:
+            decay_rate = self.epsilon_decay
+        self.epsilon = max(0.01, self.epsilon * decay_rate)
+    
+    def save_model(self, filename):
+        """保存模型（只保存学习过的后继状态）"""
+        import pickle
+        learned = np.flatnonzero(self.visits)
+        model_data = {
+            'format': 'afterstate',
+            'learned': learned.astype(np.int32),
+            'values': self.values[learned],
+            'visits': self.visits[learned],
+            'learning_rate': self.learning_rate,
+            'discount_factor': self.discount_factor,
+            'epsilon': self.epsilon,
+            'epsilon_decay': self.epsilon_decay,
+            'win_count': self.win_count,
+            'loss_count': self.loss_count,
+            'draw_count': self.draw_count
+        }
+        with open(filename, 'wb') as f:
+            pickle.dump(model_data, f)
+    
+    def load_model(self, filename):
+        """加载模型"""
+        import pickle
+        with open(filename, 'rb') as f:
+            model_data = pickle.load(f)
+        
+        self.values = np.zeros(NUM_STATES, dtype=np.float32)
+        self.visits = np.zeros(NUM_STATES, dtype=np.int32)
+        self.values[model_data['learned']] = model_data['values']
+        self.visits[model_data['learned']] = model_data['visits']
+        self.learning_rate = model_data['learning_rate']
+        self.discount_factor = model_data['discount_factor']
+        self.epsilon = model_data['epsilon']
+        self.epsilon_decay = model_data['epsilon_decay']
+        self.win_count = model_data['win_count']
+        self.loss_count = model_data['loss_count']
+        self.draw_count = model_data['draw_count']
+
+
+class FrozenAgent:
+    """冻结的智能体快照
+
+    只读地持有一张 (NUM_STATES, 9) 的值数组，按状态编号直接查表选取最佳动作，
+    不再学习，用作对手或部署时开销很小
+    """
+    
+    def __init__(self, name, values, rng=None):
+        self.name = name
+        self.values = values
+        self.rng = rng if rng is not None else default_stream()
+        self.win_count = 0
+        self.loss_count = 0
+        self.draw_count = 0
+    
+    @classmethod
+    def from_agent(cls, agent, name=None, rng=None):
+        """从Q学习或蒙特卡洛智能体生成快照"""
+        values = agent.to_q_array() if hasattr(agent, 'to_q_array') else agent.to_value_array()
+        return cls(name or f"{agent.name}_frozen", values, rng if rng is not None else agent.rng)
+    
+    def choose_action(self, state, valid_moves, training=False, index=None):
+        """选择值最大的动作（并列时随机选择；index 为棋盘的状态编号，调用方提供时不再从棋盘计算）"""
+        if not valid_moves:
+            return None
+        
+        index = index if index is not None else state_index(state)
+        cell = self.choose_cell(index, [row * 3 + col for row, col in valid_moves])
+        return divmod(cell, 3)
+    
+    def choose_cell(self, index, cells):
+        """按状态编号和空格子编号（row * 3 + col）直接选取值最大的格子（并列时随机选择）"""
+        row_values = self.values[index]
+        move_values = [row_values[cell] for cell in cells]
+        max_value = max(move_values)
+        best_cells = [cell for cell, value in zip(cells, move_values) if value == max_value]
+        return self.rng.choice(best_cells)
+
+
+class CancellationToken:
+    """协作式取消标记
+
+    训练循环在每个回合开始前检查该标记；可以包装任意带有 set()/is_set() 的
+    事件对象（如 multiprocessing.Event），以便跨线程或跨进程请求停止
+    """
+    
+    def __init__(self, event=None):
+        self._event = event if event is not None else threading.Event()
+    
+    def cancel(self):
+        """请求取消"""
+        self._event.set()
+    
+    @property
+    def cancelled(self):
+        """是否已请求取消"""
+        return self._event.is_set()
+
+
 class AITrainer:
     """AI训练器"""
     
-    def __init__(self):
+    def __init__(self, agent1=None, agent2=None, seed=None, game_log=None):
         self.game = TicTacToeGame()
-        self.agent1 = QLearningAgent("QLearning_X")
-        self.agent2 = MonteCarloAgent("MonteCarlo_O")
+        # 可选的对局日志写入器（game_records.GameLogWriter），每局训练对局结束后追加一条记录
+        self.game_log = game_log
+        # 训练器和两个智能体各自使用由同一种子派生的独立随机数流，相同种子的训练结果完全可复现。
+        # 传入的智能体若创建时未指定 rng（仍使用全局默认流），同样改用派生的流；
+        # 已指定 rng 的智能体保留自己的流
+        self.rng = RandomStream(seed)
+        agent1_rng, agent2_rng = self.rng.spawn(2)
+        self.agent1 = agent1 if agent1 is not None else QLearningAgent("QLearning_X", rng=agent1_rng)
+        self.agent2 = agent2 if agent2 is not None else MonteCarloAgent("MonteCarlo_O", rng=agent2_rng)
+        for agent, rng in ((self.agent1, agent1_rng), (self.agent2, agent2_rng)):
+            if getattr(agent, 'rng', None) is default_stream():
+                agent.rng = rng
+        # 训练批次标识，用于在模型注册表中按批次查询检查点
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
         self.training_stats = {
             'episodes': [],
             'agent1_wins': [],
@@ -306,20 +700,28 @@ class AITrainer:
     
     def train_episode(self):
         """训练一个回合"""
+        winner = self.play_training_game(self.agent1, self.agent2)
+        return self.record_result(winner)
+    
+    def play_training_game(self, x_agent, o_agent):
+        """让两个智能体下一局训练对局并更新可学习的一方，返回获胜方
+
+        实现了 update_q_value 的智能体在自己落子后逐步更新，
+        实现了 update_values 的智能体在对局结束后按整局数据更新；
+        冻结的快照对手两者都没有，只参与对弈
+        """
         state = self.game.reset()
         episode_data = []
-        agent1_reward = 0
-        agent2_reward = 0
         
         while not self.game.game_over:
             valid_moves = self.game.get_valid_moves()
             if not valid_moves:
                 break
             
-            if self.game.current_player == 1:
-                action = self.agent1.choose_action(state, valid_moves, training=True)
-            else:
-                action = self.agent2.choose_action(state, valid_moves, training=True)
+            # 智能体直接使用游戏随落子增量维护的状态编号，不必每步从棋盘重新计算
+            agent = x_agent if self.game.current_player == 1 else o_agent
+            index = self.game.index
+            action = agent.choose_action(state, valid_moves, training=True, index=index)
             
             success, reward = self.game.make_move(action[0], action[1])
             if not success:
@@ -328,24 +730,33 @@ class AITrainer:
             next_state = self.game.get_state()
             episode_data.append((state, action, reward, next_state, self.game.game_over))
             
-            # 更新Q学习智能体
-            if self.game.current_player == -1:  # 轮到O时，更新X的Q值
-                self.agent1.update_q_value(state, action, reward, next_state, self.game.game_over)
+            # 更新Q学习智能体（在自己落子后更新，包括获胜的最后一步）
+            if hasattr(agent, 'update_q_value'):
+                agent.update_q_value(state, action, reward, next_state, self.game.game_over,
+                                     index=index, next_index=self.game.index)
             
             state = next_state
         
         # 更新蒙特卡洛智能体
         if episode_data:
             mc_episode = [(s, a, r) for s, a, r, _, _ in episode_data]
-            self.agent2.update_values(mc_episode)
+            for agent in (x_agent, o_agent):
+                if hasattr(agent, 'update_values'):
+                    agent.update_values(mc_episode)
+        
+        if self.game_log is not None:
+            self.game_log.write_history(self.game.move_history, self.game.winner)
         
-        # 统计结果
-        if self.game.winner == 1:
+        return self.game.winner
+    
+    def record_result(self, winner):
+        """按执子方统计对局结果（智能体1执X，智能体2执O），返回双方奖励"""
+        if winner == 1:
             self.agent1.win_count += 1
             self.agent2.loss_count += 1
             agent1_reward = 1
             agent2_reward = -1
-        elif self.game.winner == -1:
+        elif winner == -1:
             self.agent2.win_count += 1
             self.agent1.loss_count += 1
             agent1_reward = -1
@@ -358,47 +769,114 @@ class AITrainer:
         
         return agent1_reward, agent2_reward
     
-    def train(self, num_episodes=10000, save_interval=1000):
-        """训练AI智能体"""
+    def train(self, num_episodes=10000, save_interval=1000, cancel_token=None,
+              progress_callback=None, progress_interval=100, monitor=None):
+        """训练AI智能体
+
+        cancel_token: CancellationToken，取消后在当前回合结束时停止并保存检查点
+        progress_callback: 每 progress_interval 个回合以进度快照调用一次
+        monitor: convergence.ConvergenceMonitor，判定收敛后提前结束训练
+        返回训练是否完整结束（被取消时返回False，提前收敛视为完整结束）
+        """
         print(f"开始训练 {num_episodes} 个回合...")
-        print(f"智能体1: {self.agent1.name} (Q学习)")
-        print(f"智能体2: {self.agent2.name} (蒙特卡洛)")
+        print(f"智能体1: {self.agent1.name} ({type(self.agent1).__name__})")
+        print(f"智能体2: {self.agent2.name} ({type(self.agent2).__name__})")
         print("-" * 50)
         
+        snapshot = None
+        for snapshot in self.iter_train(num_episodes, save_interval, cancel_token, progress_interval, monitor):
+            if progress_callback is not None:
+                progress_callback(snapshot)
+        
+        if snapshot is not None and snapshot['cancelled']:
+            print(f"训练已在第 {snapshot['episode']} 回合取消")
+            return False
+        
+        print("训练完成！")
+        if monitor is not None:
+            monitor.print_summary()
+        self.print_final_stats()
+        return True
+    
+    def iter_train(self, num_episodes=10000, save_interval=1000, cancel_token=None, progress_interval=100,
+                   monitor=None):
+        """以生成器方式训练，每 progress_interval 个回合产出一次进度快照
+
+        最后一个快照的 done 为True；若因取消而结束，cancelled 为True，
+        且已完成回合的模型已保存为检查点；若 monitor 判定收敛而提前结束，converged 为True
+        """
+        start_time = time.time()
+        completed = 0
+        
         for episode in range(num_episodes):
-            agent1_reward, agent2_reward = self.train_episode()
+            if cancel_token is not None and cancel_token.cancelled:
+                break
             
-            # 记录统计信息
-            self.training_stats['episodes'].append(episode + 1)
-            self.training_stats['agent1_wins'].append(self.agent1.win_count)
-            self.training_stats['agent2_wins'].append(self.agent2.win_count)
-            self.training_stats['draws'].append(self.agent1.draw_count)
-            self.training_stats['agent1_rewards'].append(agent1_reward)
-            self.training_stats['agent2_rewards'].append(agent2_reward)
+            self.run_training_episode(episode, save_interval)
+            completed = episode + 1
             
-            # 衰减探索率
-            if episode % 100 == 0:
-                self.agent1.decay_epsilon()
+            if monitor is not None and monitor.update(self, completed):
+                break
             
-            # 打印进度
-            if episode % 1000 == 0:
-                win_rate1 = self.agent1.win_count / (episode + 1) * 100
-                win_rate2 = self.agent2.win_count / (episode + 1) * 100
-                draw_rate = self.agent1.draw_count / (episode + 1) * 100
-                
-                print(f"回合 {episode + 1}:")
-                print(f"  {self.agent1.name} 胜率: {win_rate1:.1f}%")
-                print(f"  {self.agent2.name} 胜率: {win_rate2:.1f}%")
-                print(f"  平局率: {draw_rate:.1f}%")
-                print(f"  {self.agent1.name} ε: {self.agent1.epsilon:.3f}")
-                print()
+            if completed % progress_interval == 0 and completed < num_episodes:
+                yield self.progress_snapshot(completed, num_episodes, start_time)
+        
+        converged = monitor is not None and monitor.converged
+        cancelled = completed < num_episodes and not converged
+        if cancelled and completed > 0:
+            # 取消时保存一个与训练统计一致的检查点
+            self.save_models(f"models_episode_{completed}")
+        
+        yield self.progress_snapshot(completed, num_episodes, start_time, done=True, cancelled=cancelled,
+                                     converged=converged)
+    
+    def progress_snapshot(self, completed, num_episodes, start_time, done=False, cancelled=False, converged=False):
+        """生成训练进度快照"""
+        return {
+            'episode': completed,
+            'total_episodes': num_episodes,
+            'agent1_wins': self.agent1.win_count,
+            'agent2_wins': self.agent2.win_count,
+            'draws': self.agent1.draw_count,
+            'epsilon': self.agent1.epsilon,
+            'elapsed': time.time() - start_time,
+            'done': done,
+            'cancelled': cancelled,
+            'converged': converged,
+        }
+    
+    def run_training_episode(self, episode, save_interval):
+        """训练一个回合并完成统计、探索率衰减、进度打印和定期保存"""
+        agent1_reward, agent2_reward = self.train_episode()
+        
+        # 记录统计信息
+        self.training_stats['episodes'].append(episode + 1)
+        self.training_stats['agent1_wins'].append(self.agent1.win_count)
+        self.training_stats['agent2_wins'].append(self.agent2.win_count)
+        self.training_stats['draws'].append(self.agent1.draw_count)
+        self.training_stats['agent1_rewards'].append(agent1_reward)
+        self.training_stats['agent2_rewards'].append(agent2_reward)
+        
+        # 衰减探索率
+        if episode % 100 == 0:
+            self.agent1.decay_epsilon()
+        
+        # 打印进度
+        if episode % 1000 == 0:
+            win_rate1 = self.agent1.win_count / (episode + 1) * 100
+            win_rate2 = self.agent2.win_count / (episode + 1) * 100
+            draw_rate = self.agent1.draw_count / (episode + 1) * 100
             
-            # 保存模型
-            if episode % save_interval == 0 and episode > 0:
-                self.save_models(f"models_episode_{episode}")
+            print(f"回合 {episode + 1}:")
+            print(f"  {self.agent1.name} 胜率: {win_rate1:.1f}%")
+            print(f"  {self.agent2.name} 胜率: {win_rate2:.1f}%")
+            print(f"  平局率: {draw_rate:.1f}%")
+            print(f"  {self.agent1.name} ε: {self.agent1.epsilon:.3f}")
+            print()
         
-        print("训练完成！")
-        self.print_final_stats()
+        # 保存模型
+        if episode % save_interval == 0 and episode > 0:
+            self.save_models(f"models_episode_{episode}")
     
     def print_final_stats(self):
         """打印最终统计信息"""
@@ -427,6 +905,14 @@ class AITrainer:
         with open(f"ai_models/{prefix}_stats.json", 'w') as f:
             json.dump(self.training_stats, f)
         
+        # 检查点与对局日志保持一致
+        if self.game_log is not None:
+            self.game_log.flush()
+        
+        # 登记到模型注册表
+        from model_registry import ModelRegistry
+        ModelRegistry("ai_models").register(prefix, self)
+        
         print(f"模型已保存到 ai_models/{prefix}_*")
     
     def load_models(self, prefix="models"):
@@ -446,6 +932,8 @@ class AITrainer:
     
     def plot_training_stats(self):
         """绘制训练统计图表"""
+        import matplotlib.pyplot as plt
+        
         plt.figure(figsize=(15, 10))
         
         # 胜率图表
@@ -512,6 +1000,48 @@ class AITrainer:
         plt.show()
 
 
+def evaluate_agent(agent, player=1, num_games=100, opponent=None, rng=None):
+    """评估智能体：以 player 一方与对手对战 num_games 局（默认对手随机落子）
+
+    返回胜/负/平局数以及得分（胜1分，平0.5分）
+    """
+    rng = rng if rng is not None else default_stream()
+    game = TicTacToeGame()
+    wins = losses = draws = 0
+    
+    for _ in range(num_games):
+        state = game.reset()
+        
+        while not game.game_over:
+            valid_moves = game.get_valid_moves()
+            if game.current_player == player:
+                action = agent.choose_action(state, valid_moves, training=False, index=game.index)
+            elif opponent is not None:
+                action = opponent.choose_action(state, valid_moves, training=False, index=game.index)
+            else:
+                action = rng.choice(valid_moves)
+            
+            if action is None:
+                action = rng.choice(valid_moves)
+            
+            game.make_move(action[0], action[1])
+            state = game.get_state()
+        
+        if game.winner == player:
+            wins += 1
+        elif game.winner == 0:
+            draws += 1
+        else:
+            losses += 1
+    
+    return {
+        'wins': wins,
+        'losses': losses,
+        'draws': draws,
+        'score': (wins + 0.5 * draws) / num_games if num_games else 0.0,
+    }
+
+
 def main():
     """主函数"""
     trainer = AITrainer()
@@ -533,7 +1063,18 @@ def main():
             episodes = input("输入训练回合数 (默认10000): ").strip()
             episodes = int(episodes) if episodes else 10000
             
-            trainer.train(episodes)
+            # 收敛检测默认关闭：默认阈值下通常要训练一万多回合才会提前结束
+            monitor = None
+            if input("启用收敛检测、策略稳定后提前结束? (y/N): ").strip().lower() == 'y':
+                from convergence import ConvergenceMonitor
+                window = input("检查窗口回合数 (默认500): ").strip()
+                tolerance = input("策略变化比例阈值 (默认0.01): ").strip()
+                patience = input("连续稳定窗口数 (默认3): ").strip()
+                monitor = ConvergenceMonitor(window=int(window) if window else 500,
+                                             policy_tolerance=float(tolerance) if tolerance else 0.01,
+                                             patience=int(patience) if patience else 3)
+            
+            trainer.train(episodes, monitor=monitor)
             trainer.save_models()
             trainer.plot_training_stats()
         
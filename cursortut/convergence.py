@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+收敛检测
+训练时每隔一个窗口比较两个智能体的值表快照：贪心策略发生变化的状态比例、
+值的最大变化量，以及对随机对手评估得分的波动。所有指标连续若干个窗口
+都低于设定阈值时判定为收敛，AITrainer.train/iter_train 随即提前结束。
+
+每次检查要生成两张稠密值表并评估 2 * eval_games 局，默认参数下默认智能体
+一般要训练一万多回合才会判定收敛，因此只在较长的训练中显式传入 monitor 才划算
+"""
+
+import numpy as np
+import game_rules
+from ai_trainer import FrozenAgent, evaluate_agent
+from random_streams import RandomStream
+
+
+def legal_moves_table():
+    """(NUM_STATES, 9) 的布尔数组：各状态下哪些格子可以落子"""
+    _, _, legal = game_rules.numpy_tables()
+    return (legal[:, None] >> np.arange(9)) & 1 == 1
+
+
+def agent_values(agent):
+    """智能体的 (NUM_STATES, 9) 值数组"""
+    return agent.to_q_array() if hasattr(agent, 'to_q_array') else agent.to_value_array()
+
+
+def greedy_policy(values, legal):
+    """各状态下值最大的合法格子（并列取编号最小者），没有学到任何值的状态为-1"""
+    policy = np.where(legal, values, -np.inf).argmax(axis=1)
+    policy[~values.any(axis=1)] = -1
+    return policy
+
+
+class ConvergenceMonitor:
+    """按窗口跟踪训练是否收敛
+
+    window: 每隔多少回合检查一次
+    policy_tolerance: 贪心策略变化的状态比例阈值
+    value_tolerance: 值表最大变化量阈值；表格型学习中很少访问的状态每次更新的变化都很大，
+        默认为 None，只记录不参与判定
+    eval_tolerance: 相邻两次评估得分变化的阈值（eval_games 为0时不评估）
+    patience: 需要连续满足所有阈值的窗口数
+    min_episodes: 至少训练的回合数
+    """
+
+    def __init__(self, window=500, policy_tolerance=0.01, value_tolerance=None, eval_games=200,
+                 eval_tolerance=0.03, patience=3, min_episodes=0, seed=0):
+        self.window = window
+        self.policy_tolerance = policy_tolerance
+        self.value_tolerance = value_tolerance
+        self.eval_games = eval_games
+        self.eval_tolerance = eval_tolerance
+        self.patience = patience
+        self.min_episodes = min_episodes
+        self.seed = seed
+
+        self.legal = legal_moves_table()
+        self.previous = None  # 每个智能体上一窗口的 (值数组, 贪心策略)
+        self.previous_scores = None
+        self.streak = 0
+        self.history = []
+        self.converged_at = None
+
+    @property
+    def converged(self):
+        """是否已判定收敛"""
+        return self.converged_at is not None
+
+    def update(self, trainer, episode):
+        """在第 episode 个回合结束后调用；到达窗口边界时检查一次，返回是否应当停止训练"""
+        if self.converged:
+            return True
+        if episode % self.window != 0:
+            return False
+
+        snapshots = [(values, greedy_policy(values, self.legal))
+                     for values in (agent_values(trainer.agent1), agent_values(trainer.agent2))]
+        scores = self.evaluate(snapshots)
+        record = {'episode': episode, 'policy_change': [], 'value_delta': [], 'scores': scores}
+
+        if self.previous is not None:
+            for (values, policy), (old_values, old_policy) in zip(snapshots, self.previous):
+                learned = (policy >= 0) | (old_policy >= 0)
+                record['policy_change'].append(float((policy != old_policy)[learned].mean()) if learned.any() else 0.0)
+                record['value_delta'].append(float(np.abs(values - old_values).max()))
+
+            stable = max(record['policy_change']) <= self.policy_tolerance
+            if self.value_tolerance is not None:
+                stable = stable and max(record['value_delta']) <= self.value_tolerance
+            if scores is not None:
+                stable = stable and max(abs(score - old_score) for score, old_score
+                                        in zip(scores, self.previous_scores)) <= self.eval_tolerance
+            self.streak = self.streak + 1 if stable else 0
+
+        record['streak'] = self.streak
+        self.history.append(record)
+        self.previous = snapshots
+        self.previous_scores = scores
+
+        if self.streak >= self.patience and episode >= self.min_episodes:
+            self.converged_at = episode
+            return True
+        return False
+
+    def evaluate(self, snapshots):
+        """冻结两个智能体的快照，各自对随机对手评估（固定种子，不影响训练的随机数流）"""
+        if not self.eval_games:
+            return None
+        rng = RandomStream(self.seed)
+        x_rng, o_rng, opponent_rng = rng.spawn(3)
+        x_agent = FrozenAgent("x", snapshots[0][0], x_rng)
+        o_agent = FrozenAgent("o", snapshots[1][0], o_rng)
+        return (evaluate_agent(x_agent, 1, self.eval_games, rng=opponent_rng)['score'],
+                evaluate_agent(o_agent, -1, self.eval_games, rng=opponent_rng)['score'])
+
+    def summary(self):
+        """收敛情况摘要"""
+        last = self.history[-1] if self.history else None
+        return {
+            'converged': self.converged,
+            'converged_at': self.converged_at,
+            'checks': len(self.history),
+            'policy_change': last['policy_change'] if last else None,
+            'value_delta': last['value_delta'] if last else None,
+            'scores': last['scores'] if last else None,
+        }
+
+    def print_summary(self):
+        """打印收敛情况摘要"""
+        summary = self.summary()
+        if summary['converged']:
+            stable_since = summary['converged_at'] - self.patience * self.window
+            print(f"训练在第 {summary['converged_at']} 回合判定收敛"
+                  f"（自第 {stable_since} 回合起连续 {self.patience} 个窗口稳定）")
+        else:
+            print(f"训练未收敛（已检查 {summary['checks']} 次，当前连续稳定 {self.streak} 个窗口）")
+        if summary['policy_change']:
+            print(f"  策略变化率: {', '.join(f'{rate:.2%}' for rate in summary['policy_change'])}")
+            print(f"  最大值变化: {', '.join(f'{delta:.4f}' for delta in summary['value_delta'])}")
+        if summary['scores'] is not None:
+            print(f"  对随机对手得分: X {summary['scores'][0]:.3f} / O {summary['scores'][1]:.3f}")
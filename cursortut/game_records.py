@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对局记录
+紧凑的二进制对局日志：16字节文件头之后每局固定5个字节，
+依次是9个落子格子编号（各占4位，不足9步用0xF填充）和1个结果码（4位）。
+写入端只追加、带缓冲；读取端用 numpy.memmap 映射文件，按块向量化解码
+"""
+
+import os
+import struct
+import numpy as np
+
+LOG_MAGIC = b'TTTG'
+LOG_VERSION = 1
+HEADER_FORMAT = '<4sHH8x'
+HEADER_SIZE = 16
+RECORD_SIZE = 5
+
+PADDING = 0xF
+
+# 结果码
+RESULT_DRAW = 0
+RESULT_X_WINS = 1
+RESULT_O_WINS = 2
+RESULT_UNFINISHED = 0xF
+
+# 获胜方（1=X, -1=O, 0=平局, None=未结束）与结果码互相转换
+WINNER_TO_RESULT = {1: RESULT_X_WINS, -1: RESULT_O_WINS, 0: RESULT_DRAW, None: RESULT_UNFINISHED}
+RESULT_TO_WINNER = {result: winner for winner, result in WINNER_TO_RESULT.items()}
+
+
+def encode_game(cells, result):
+    """把一局（落子格子编号序列 + 结果码）打包为5个字节"""
+    if len(cells) > 9:
+        raise ValueError(f"落子数超过9步: {len(cells)}")
+    nibbles = list(cells) + [PADDING] * (9 - len(cells)) + [result]
+    return bytes((nibbles[i] << 4) | nibbles[i + 1] for i in range(0, 10, 2))
+
+
+def decode_records(raw):
+    """向量化解码 (n, 5) 的原始字节，返回 (落子 (n, 9) int8，未落子为-1；结果码 (n,) uint8)"""
+    raw = np.asarray(raw, dtype=np.uint8)
+    nibbles = np.empty((len(raw), 10), dtype=np.int8)
+    nibbles[:, 0::2] = raw >> 4
+    nibbles[:, 1::2] = raw & 0xF
+    moves = nibbles[:, :9]
+    moves[moves == PADDING] = -1
+    return moves, nibbles[:, 9].astype(np.uint8)
+
+
+def check_header(data):
+    """校验文件头"""
+    if len(data) < HEADER_SIZE:
+        raise ValueError("对局日志过短，缺少文件头")
+    magic, version, record_size = struct.unpack_from(HEADER_FORMAT, data)
+    if magic != LOG_MAGIC:
+        raise ValueError(f"不是对局日志文件: 魔数 {magic!r}")
+    if version != LOG_VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"不支持的对局日志版本: {version}（记录长度 {record_size}）")
+
+
+class GameLogWriter:
+    """只追加的对局日志写入器
+
+    文件已存在时校验文件头后在末尾追加；写入先进入内存缓冲，
+    满 buffer_games 局或调用 flush()/close() 时一次写出
+    """
+
+    def __init__(self, path, buffer_games=4096):
+        self.path = path
+        self.buffer_games = buffer_games
+        self.buffer = bytearray()
+        self.games_written = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                check_header(f.read(HEADER_SIZE))
+            # 丢弃上次异常退出时可能留下的不完整记录
+            excess = (os.path.getsize(path) - HEADER_SIZE) % RECORD_SIZE
+            if excess:
+                os.truncate(path, os.path.getsize(path) - excess)
+            self.file = open(path, 'ab')
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(struct.pack(HEADER_FORMAT, LOG_MAGIC, LOG_VERSION, RECORD_SIZE))
+
+    def write(self, cells, winner):
+        """追加一局：cells 为落子格子编号（row * 3 + col）序列，winner 为 1/-1/0 或 None（未结束）"""
+        self.buffer += encode_game(cells, WINNER_TO_RESULT[winner])
+        self.games_written += 1
+        if len(self.buffer) >= self.buffer_games * RECORD_SIZE:
+            self.flush()
+
+    def write_history(self, move_history, winner):
+        """追加 TicTacToeGame.move_history 形式（(行, 列, 玩家) 列表）的一局"""
+        self.write([row * 3 + col for row, col, _ in move_history], winner)
+
+    def flush(self):
+        """把缓冲写入文件"""
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        """写出缓冲并关闭文件"""
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class GameLogReader:
+    """内存映射的对局日志读取器"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            check_header(f.read(HEADER_SIZE))
+
+        # 只映射完整的记录，忽略写入中途的半条记录
+        num_games = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+        if num_games:
+            self.records = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER_SIZE,
+                                     shape=(num_games, RECORD_SIZE))
+        else:
+            self.records = np.zeros((0, RECORD_SIZE), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.records)
+
+    def read(self, start, stop):
+        """解码 [start, stop) 范围的对局"""
+        return decode_records(self.records[start:stop])
+
+    def iter_chunks(self, chunk_size=1 << 16, order=None, rng=None):
+        """按块生成 (落子, 结果码)
+
+        order 为对局编号数组时按该顺序读取；传入 numpy 随机数生成器 rng 时
+        打乱块的顺序和块内对局的顺序，内存占用只与块大小有关
+        """
+        if order is not None:
+            for start in range(0, len(order), chunk_size):
+                yield decode_records(self.records[order[start:start + chunk_size]])
+            return
+
+        starts = np.arange(0, len(self.records), chunk_size)
+        if rng is not None:
+            starts = rng.permutation(starts)
+        for start in starts.tolist():
+            moves, results = self.read(start, start + chunk_size)
+            if rng is not None:
+                perm = rng.permutation(len(results))
+                moves, results = moves[perm], results[perm]
+            yield moves, results
+
+    def __iter__(self):
+        """逐局生成 (落子格子编号列表, 获胜方)"""
+        for moves, results in self.iter_chunks():
+            for row, result in zip(moves.tolist(), results.tolist()):
+                yield [cell for cell in row if cell >= 0], RESULT_TO_WINNER[result]
+
+    def result_counts(self):
+        """统计各结果的局数"""
+        counts = {'x_wins': 0, 'o_wins': 0, 'draws': 0, 'unfinished': 0}
+        names = {RESULT_X_WINS: 'x_wins', RESULT_O_WINS: 'o_wins', RESULT_DRAW: 'draws', RESULT_UNFINISHED: 'unfinished'}
+        for _, results in self.iter_chunks():
+            for result, count in zip(*np.unique(results, return_counts=True)):
+                counts[names[int(result)]] += int(count)
+        return counts
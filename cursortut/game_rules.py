@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+井字棋规则
+所有前端（控制台、图形界面、对局服务器）和训练器共用的规则内核。
+棋盘按三进制编码为状态编号（第 i 格的数字乘以 3**i，空=0, X=1, O=2），
+首次使用时预先计算全部 3**9 = 19683 个编号的结果、获胜线和合法落子掩码，
+之后判定胜负只需一次查表。本模块只依赖标准库，numpy 形式的表按需生成。
+另提供 Zobrist 哈希，供更大的棋盘和置换表使用
+"""
+
+import random
+
+NUM_STATES = 3 ** 9
+CELL_POWERS = tuple(3 ** cell for cell in range(9))
+
+# 格子上的数字
+EMPTY = 0
+X = 1
+O = 2
+
+# 结果
+ONGOING = 0
+X_WINS = 1
+O_WINS = 2
+DRAW = 3
+
+# 三连的八条线（格子编号 row * 3 + col）
+WIN_LINES = ((0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6))
+NO_LINE = -1
+
+
+def rotate(perm):
+    """把对称变换再逆时针旋转90度（与 numpy.rot90 相同）"""
+    return tuple(perm[col * 3 + 2 - row] for row in range(3) for col in range(3))
+
+
+def symmetry_permutations():
+    """棋盘的8种对称变换（4种旋转及其镜像），变换后第 i 格取原棋盘第 perm[i] 格"""
+    perms = []
+    for base in (tuple(range(9)), tuple(col * 3 + row for row in range(3) for col in range(3))):
+        perm = base
+        for _ in range(4):
+            perms.append(perm)
+            perm = rotate(perm)
+    return tuple(perms)
+
+
+SYMMETRIES = symmetry_permutations()
+
+_tables = None
+_numpy_tables = None
+
+
+def build_tables():
+    """计算所有状态编号的 (结果, 获胜线编号, 合法落子掩码) 三张表
+
+    两方都有三连的编号在实际对局中不会出现，取第一条获胜线
+    """
+    outcomes = [ONGOING] * NUM_STATES
+    lines = [NO_LINE] * NUM_STATES
+    legal = [0] * NUM_STATES
+
+    for index in range(NUM_STATES):
+        digits = [(index // power) % 3 for power in CELL_POWERS]
+        mask = 0
+        for cell in range(9):
+            if digits[cell] == EMPTY:
+                mask |= 1 << cell
+        legal[index] = mask
+
+        for line, (a, b, c) in enumerate(WIN_LINES):
+            if digits[a] != EMPTY and digits[a] == digits[b] == digits[c]:
+                outcomes[index] = X_WINS if digits[a] == X else O_WINS
+                lines[index] = line
+                break
+        else:
+            if mask == 0:
+                outcomes[index] = DRAW
+
+    return outcomes, lines, legal
+
+
+def tables():
+    """(结果表, 获胜线表, 合法落子掩码表)，首次调用时计算"""
+    global _tables
+    if _tables is None:
+        _tables = build_tables()
+    return _tables
+
+
+def numpy_tables():
+    """numpy 形式的三张表：结果 (uint8)、获胜线编号 (int8，无为-1)、合法落子掩码 (uint16)"""
+    global _numpy_tables
+    if _numpy_tables is None:
+        import numpy as np
+        outcomes, lines, legal = tables()
+        _numpy_tables = (np.array(outcomes, dtype=np.uint8), np.array(lines, dtype=np.int8),
+                         np.array(legal, dtype=np.uint16))
+    return _numpy_tables
+
+
+def encode(cells, x_mark=X, o_mark=O):
+    """把9个格子（按 row * 3 + col 排列）编码为状态编号；x_mark/o_mark 为该棋盘表示X和O的值"""
+    index = 0
+    for cell, value in enumerate(cells):
+        if value == x_mark:
+            index += CELL_POWERS[cell]
+        elif value == o_mark:
+            index += 2 * CELL_POWERS[cell]
+    return index
+
+
+def place(index, cell, digit):
+    """在编号为 index 的棋盘的 cell 格放上 digit（X 或 O），返回新编号"""
+    return index + digit * CELL_POWERS[cell]
+
+
+def outcome(index):
+    """局面的结果：ONGOING、X_WINS、O_WINS 或 DRAW"""
+    return tables()[0][index]
+
+
+def winning_line(index):
+    """获胜的三连格子编号，没有则为 None"""
+    line = tables()[1][index]
+    return WIN_LINES[line] if line != NO_LINE else None
+
+
+def legal_mask(index):
+    """合法落子掩码：第 i 位为1表示第 i 格为空"""
+    return tables()[2][index]
+
+
+def legal_cells(index):
+    """所有空格子的编号"""
+    mask = tables()[2][index]
+    return [cell for cell in range(9) if mask >> cell & 1]
+
+
+ZOBRIST_SEED = 0x5EED
+
+
+class ZobristTable:
+    """Zobrist 哈希：为每个 (格子, 棋子) 以及"轮到O走"各分配一个64位随机键
+
+    局面的键为其中所有棋子的键与（轮到O时）行棋方键的异或。落子和悔棋都只需
+    异或同样的两个键（toggle），与棋盘大小无关、不分配内存；种子固定，不同进程的键相同
+    """
+
+    def __init__(self, num_cells=9, seed=ZOBRIST_SEED):
+        rng = random.Random(seed)
+        self.num_cells = num_cells
+        # piece_keys[cell][digit]，digit 为 X 或 O；EMPTY 的键为0
+        self.piece_keys = tuple((0, rng.getrandbits(64), rng.getrandbits(64)) for _ in range(num_cells))
+        self.side_key = rng.getrandbits(64)
+
+    def toggle(self, key, cell, digit):
+        """在 key 上放上或拿走 cell 格的 digit，并切换行棋方"""
+        return key ^ self.piece_keys[cell][digit] ^ self.side_key
+
+    def hash(self, digits):
+        """从头计算各格数字为 digits 的局面的键（行棋方由棋子数决定，X先手）"""
+        key = 0
+        pieces = 0
+        for cell, digit in enumerate(digits):
+            if digit != EMPTY:
+                key ^= self.piece_keys[cell][digit]
+                pieces += 1
+        return key ^ self.side_key if pieces % 2 else key
+
+
+ZOBRIST = ZobristTable()
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+井字棋对局服务器
+基于 asyncio 的 TCP 服务，协议为每行一个JSON请求/响应；
+同时托管大量人机对局和AI对AI对局，AI使用共享的只读值表，
+空闲超时的对局会被自动清理。附带一个简单的命令行客户端用于测试
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+import numpy as np
+from ai_trainer import NUM_STATES, FrozenAgent
+import game_rules
+from model_mmap import open_model
+from model_registry import ModelRegistry
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_IDLE_TIMEOUT = 300
+HUMAN = 'human'
+# 需要指定对局的命令
+SESSION_COMMANDS = ('move', 'step', 'play', 'state', 'close')
+
+
+class GameSession:
+    """一局对局：只保存9个格子、状态编号和双方智能体的引用"""
+
+    __slots__ = ('session_id', 'cells', 'index', 'current_player', 'winner',
+                 'x_agent', 'o_agent', 'last_active')
+
+    def __init__(self, session_id, x_agent, o_agent):
+        self.session_id = session_id
+        self.cells = [0] * 9
+        self.index = 0  # 三进制状态编号，随落子增量更新
+        self.current_player = 1
+        self.winner = None  # None 表示未结束，0 表示平局
+        self.x_agent = x_agent  # None 表示人类
+        self.o_agent = o_agent
+        self.last_active = time.monotonic()
+
+    @property
+    def over(self):
+        """对局是否已结束"""
+        return self.winner is not None
+
+    def empty_cells(self):
+        """所有空格子"""
+        return game_rules.legal_cells(self.index)
+
+    def current_agent(self):
+        """当前行棋方的智能体（人类为 None）"""
+        return self.x_agent if self.current_player == 1 else self.o_agent
+
+    def play(self, cell):
+        """在 cell 落子；非法落子返回 False"""
+        if self.over or not 0 <= cell < 9 or not game_rules.legal_mask(self.index) >> cell & 1:
+            return False
+
+        player = self.current_player
+        self.cells[cell] = player
+        self.index = game_rules.place(self.index, cell, game_rules.X if player == 1 else game_rules.O)
+
+        outcome = game_rules.outcome(self.index)
+        if outcome == game_rules.DRAW:
+            self.winner = 0
+        elif outcome != game_rules.ONGOING:
+            self.winner = player
+        else:
+            self.current_player = -player
+        return True
+
+    def play_ai(self):
+        """当前行棋方为AI时落一步，返回落子格子"""
+        cell = self.current_agent().choose_cell(self.index, self.empty_cells())
+        self.play(cell)
+        return cell
+
+    def to_dict(self):
+        """序列化为响应"""
+        return {'session': self.session_id, 'board': self.cells, 'current': self.current_player,
+                'winner': self.winner, 'over': self.over}
+
+
+class GameServer:
+    """对局服务器"""
+
+    def __init__(self, models, idle_timeout=DEFAULT_IDLE_TIMEOUT, max_sessions=100000):
+        self.models = models
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.stats = {'created': 0, 'finished': 0, 'timed_out': 0, 'moves': 0, 'requests': 0, 'errors': 0}
+        self.start_time = time.monotonic()
+        self.server = None
+        self.reaper = None
+        self.connections = {}  # 连接的写端 -> 处理该连接的任务
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """开始监听并启动空闲对局清理任务"""
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        self.reaper = asyncio.create_task(self.reap_idle_sessions())
+        return self.server
+
+    async def stop(self):
+        """停止服务"""
+        if self.reaper:
+            self.reaper.cancel()
+        if self.server:
+            self.server.close()
+            for writer in list(self.connections):
+                writer.close()
+            # 等待各连接的处理任务读到连接关闭后自行退出
+            await asyncio.gather(*self.connections.values(), return_exceptions=True)
+            await self.server.wait_closed()
+
+    @property
+    def port(self):
+        """实际监听的端口（启动时传入0则由系统分配）"""
+        return self.server.sockets[0].getsockname()[1]
+
+    async def reap_idle_sessions(self):
+        """定期清理超过 idle_timeout 秒没有请求的对局"""
+        interval = max(min(self.idle_timeout / 4, 5.0), 0.01)
+        while True:
+            await asyncio.sleep(interval)
+            self.reap(time.monotonic())
+
+    def reap(self, now):
+        """清理空闲对局，返回清理数量"""
+        deadline = now - self.idle_timeout
+        expired = [sid for sid, session in self.sessions.items() if session.last_active < deadline]
+        for sid in expired:
+            del self.sessions[sid]
+        self.stats['timed_out'] += len(expired)
+        return len(expired)
+
+    async def handle_client(self, reader, writer):
+        """处理一个连接：逐行读取请求并按顺序写回响应"""
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                writer.write(json.dumps(self.handle_line(line)).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.connections.pop(writer, None)
+            writer.close()
+
+    def handle_line(self, line):
+        """解析并处理一行请求"""
+        self.stats['requests'] += 1
+        request = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("请求必须是JSON对象")
+            response = self.handle_request(request)
+        except KeyError as e:
+            self.stats['errors'] += 1
+            response = {'ok': False, 'error': f"缺少字段: {e.args[0]}"}
+        except (ValueError, TypeError) as e:
+            self.stats['errors'] += 1
+            response = {'ok': False, 'error': str(e)}
+
+        if 'id' in request:
+            response['id'] = request['id']
+        return response
+
+    def handle_request(self, request):
+        """分派请求命令"""
+        cmd = request['cmd']
+        if cmd == 'new':
+            return self.cmd_new(request)
+        if cmd == 'stats':
+            return {'ok': True, **self.server_stats()}
+        if cmd == 'models':
+            return {'ok': True, 'models': sorted(self.models)}
+        if cmd not in SESSION_COMMANDS:
+            raise ValueError(f"未知命令: {cmd}")
+
+        session = self.get_session(request['session'])
+        if cmd == 'move':
+            return self.cmd_move(session, int(request['cell']))
+        if cmd == 'step':
+            return self.cmd_step(session, 1)
+        if cmd == 'play':
+            return self.cmd_step(session, 9)
+        if cmd == 'state':
+            return {'ok': True, **session.to_dict()}
+        # close
+        del self.sessions[session.session_id]
+        return {'ok': True, 'session': session.session_id}
+
+    def get_session(self, session_id):
+        """查找对局并刷新活跃时间"""
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise ValueError(f"对局不存在或已超时: {session_id}")
+        session.last_active = time.monotonic()
+        return session
+
+    def resolve_agent(self, spec):
+        """把请求中的 'human' 或模型ID解析为智能体"""
+        if spec == HUMAN:
+            return None
+        if spec not in self.models:
+            raise ValueError(f"未知模型: {spec}")
+        return self.models[spec]
+
+    def cmd_new(self, request):
+        """创建对局；有人类参与时AI先行的一步会立即走完"""
+        if len(self.sessions) >= self.max_sessions:
+            raise ValueError("对局数已达上限")
+
+        session = GameSession(next(self.session_ids),
+                              self.resolve_agent(request.get('x', HUMAN)),
+                              self.resolve_agent(request.get('o', 'o' if 'o' in self.models else 'random')))
+        self.sessions[session.session_id] = session
+        self.stats['created'] += 1
+
+        ai_moves = self.play_ai_turns(session) if self.has_human(session) else []
+        return {'ok': True, 'ai_moves': ai_moves, **session.to_dict()}
+
+    def cmd_move(self, session, cell):
+        """人类落子，然后由AI应对"""
+        if session.current_agent() is not None:
+            raise ValueError("当前不是人类行棋")
+        if not session.play(cell):
+            raise ValueError(f"非法落子: {cell}")
+        self.stats['moves'] += 1
+        if session.over:
+            self.stats['finished'] += 1
+
+        ai_moves = self.play_ai_turns(session)
+        return {'ok': True, 'ai_moves': ai_moves, **session.to_dict()}
+
+    def cmd_step(self, session, max_moves):
+        """AI对AI对局中推进最多 max_moves 步"""
+        ai_moves = self.play_ai_turns(session, max_moves)
+        return {'ok': True, 'ai_moves': ai_moves, **session.to_dict()}
+
+    def play_ai_turns(self, session, max_moves=9):
+        """连续执行AI落子，直到轮到人类、对局结束或达到步数上限"""
+        moves = []
+        while len(moves) < max_moves and not session.over and session.current_agent() is not None:
+            moves.append(session.play_ai())
+        self.stats['moves'] += len(moves)
+        # 对局总是在某一步落子后结束，这里只会计数一次；结束的对局保留到关闭或超时，便于查询结果
+        if moves and session.over:
+            self.stats['finished'] += 1
+        return moves
+
+    @staticmethod
+    def has_human(session):
+        """对局中是否有人类一方"""
+        return session.x_agent is None or session.o_agent is None
+
+    def server_stats(self):
+        """服务器统计信息"""
+        uptime = time.monotonic() - self.start_time
+        return {
+            'active_sessions': len(self.sessions),
+            'uptime': round(uptime, 3),
+            'moves_per_sec': round(self.stats['moves'] / uptime, 1) if uptime else 0.0,
+            **self.stats,
+        }
+
+
+def load_models(specs=(), model_dir="ai_models"):
+    """加载模型：'random' 总是可用；默认把注册表最新检查点的两个智能体分别登记为 'x' 和 'o'"""
+    models = {'random': FrozenAgent('random', np.zeros((NUM_STATES, 9), dtype=np.float32))}
+
+    if not specs:
+        registry = ModelRegistry(model_dir)
+        entry = registry.latest()
+        if entry is not None:
+            for model_id, role in (('x', 'agent1'), ('o', 'agent2')):
+                if role in entry['files']:
+                    models[model_id] = open_model(registry.model_path(entry, role), name=model_id)
+
+    for spec in specs:
+        model_id, path = spec.split('=', 1)
+        models[model_id] = open_model(path, name=model_id)
+    return models
+
+
+def format_board(cells):
+    """把棋盘格式化为文本"""
+    symbols = {1: 'X', -1: 'O'}
+    rows = [' | '.join(symbols.get(cells[row * 3 + col], str(row * 3 + col + 1)) for col in range(3))
+            for row in range(3)]
+    return '\n---------\n'.join(rows)
+
+
+async def run_client(host, port, opponent):
+    """命令行客户端：人类执X，与服务器上的AI对战"""
+    reader, writer = await asyncio.open_connection(host, port)
+    loop = asyncio.get_running_loop()
+
+    async def call(**request):
+        writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    response = await call(cmd='new', x=HUMAN, o=opponent)
+    if not response['ok']:
+        print(f"创建对局失败: {response['error']}")
+        return
+    session_id = response['session']
+
+    while not response['over']:
+        print(format_board(response['board']))
+        text = await loop.run_in_executor(None, input, "请输入位置 (1-9, q退出): ")
+        if text.strip().lower() == 'q':
+            break
+        if not text.strip().isdigit():
+            print("请输入数字")
+            continue
+
+        result = await call(cmd='move', session=session_id, cell=int(text) - 1)
+        if not result['ok']:
+            print(f"错误: {result['error']}")
+            continue
+        response = result
+        if response['ai_moves']:
+            print(f"AI落子: {response['ai_moves'][0] + 1}")
+
+    print(format_board(response['board']))
+    if response['over']:
+        print({1: "你赢了！", -1: "AI获胜！", 0: "平局！"}[response['winner']])
+    await call(cmd='close', session=session_id)
+    writer.close()
+
+
+async def serve(args):
+    """运行服务器直到被中断"""
+    server = GameServer(load_models(args.model), args.idle_timeout)
+    await server.start(args.host, args.port)
+    print(f"对局服务器已启动: {args.host}:{server.port}  模型: {', '.join(sorted(server.models))}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="井字棋对局服务器")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="监听地址")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT, help="空闲对局超时（秒）")
+    parser.add_argument('--model', action='append', default=[], metavar='ID=PATH',
+                        help="加载模型（可重复；默认使用注册表中最新的检查点）")
+    parser.add_argument('--client', action='store_true', help="以客户端模式连接服务器并对战")
+    parser.add_argument('--opponent', default='o', help="客户端模式下的AI模型ID")
+    args = parser.parse_args()
+
+    try:
+        if args.client:
+            asyncio.run(run_client(args.host, args.port, args.opponent))
+        else:
+            asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+超参数搜索
+在进程池中并行训练多组超参数，用快速评估打分，
+并通过逐次减半（successive halving）提前淘汰表现差的试验
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from random_streams import RandomStream
+
+# 默认搜索空间：列表表示候选值，(low, high) 元组表示随机搜索时的均匀分布区间
+DEFAULT_SPACE = {
+    'learning_rate': [0.05, 0.1, 0.2, 0.4],
+    'discount_factor': [0.8, 0.9, 0.95, 0.99],
+    'epsilon': [0.05, 0.1, 0.3],
+    'epsilon_decay': [0.99, 0.995, 0.999],
+    'exploration_constant': [0.5, 1.0, 1.4, 2.0],
+}
+
+# 属于Q学习智能体和蒙特卡洛智能体的超参数
+AGENT1_PARAMS = ('learning_rate', 'discount_factor', 'epsilon', 'epsilon_decay')
+AGENT2_PARAMS = ('exploration_constant',)
+
+
+def grid_configs(space):
+    """网格搜索：枚举所有候选值组合"""
+    names = list(space)
+    values = [v if isinstance(v, list) else list(v) for v in (space[name] for name in names)]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def random_configs(space, num_trials, seed=None):
+    """随机搜索：从搜索空间中采样 num_trials 组超参数"""
+    rng = RandomStream(seed)
+    configs = []
+    for _ in range(num_trials):
+        config = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                config[name] = values[0] + (values[1] - values[0]) * rng.random()
+            else:
+                config[name] = rng.choice(values)
+        configs.append(config)
+    return configs
+
+
+def run_trial(trial_id, config, episodes, eval_games, seed_sequence, checkpoint=None):
+    """在工作进程中训练并评估一组超参数
+
+    每个试验使用由总种子派生的独立随机数流，结果与工作进程数和调度顺序无关。
+    checkpoint 为上一轮返回的 (智能体1, 智能体2, 已训练回合数)，传入时在其基础上
+    只补训剩余的回合；返回 (结果, 新的 checkpoint)
+    """
+    from ai_trainer import AITrainer, QLearningAgent, MonteCarloAgent, evaluate_agent
+
+    agent1_rng, agent2_rng, eval_rng = RandomStream(seed_sequence).spawn(3)
+    if checkpoint is None:
+        agent1 = QLearningAgent("QLearning_X", rng=agent1_rng, **{k: config[k] for k in AGENT1_PARAMS if k in config})
+        agent2 = MonteCarloAgent("MonteCarlo_O", rng=agent2_rng, **{k: config[k] for k in AGENT2_PARAMS if k in config})
+        trained = 0
+    else:
+        agent1, agent2, trained = checkpoint
+    trainer = AITrainer(agent1, agent2)
+
+    start_time = time.time()
+    # 试验过程中不保存检查点，也不输出训练日志
+    remaining = episodes - trained
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer.train(remaining, save_interval=remaining + 1)
+
+    agent1_score = evaluate_agent(agent1, player=1, num_games=eval_games, rng=eval_rng)['score']
+    agent2_score = evaluate_agent(agent2, player=-1, num_games=eval_games, rng=eval_rng)['score']
+
+    result = {
+        'trial_id': trial_id,
+        'episodes': episodes,
+        **config,
+        'agent1_score': round(agent1_score, 4),
+        'agent2_score': round(agent2_score, 4),
+        'score': round((agent1_score + agent2_score) / 2, 4),
+        'elapsed': round(time.time() - start_time, 2),
+    }
+    return result, (agent1, agent2, episodes)
+
+
+def successive_halving(configs, min_episodes=500, max_episodes=8000, eta=3,
+                       eval_games=200, workers=None, seed=0):
+    """逐次减半：每一轮只保留得分最高的 1/eta 试验，并把训练回合数乘以 eta
+
+    晋级的试验带着上一轮训练好的智能体进入下一轮，只补训新增的回合
+    """
+    trials = list(enumerate(configs))
+    trial_seeds = RandomStream(seed).seed_sequence.spawn(len(configs))
+    checkpoints = {}
+    episodes = min_episodes
+    results = []
+    rung = 0
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        while trials:
+            print(f"第 {rung} 轮: {len(trials)} 组试验，每组 {episodes} 回合")
+
+            futures = [executor.submit(run_trial, trial_id, config, episodes, eval_games, trial_seeds[trial_id],
+                                       checkpoints.get(trial_id))
+                       for trial_id, config in trials]
+            rung_results = []
+            for future in futures:
+                result, checkpoint = future.result()
+                rung_results.append(result)
+                checkpoints[result['trial_id']] = checkpoint
+            rung_results.sort(key=lambda r: r['score'], reverse=True)
+
+            last_rung = len(trials) == 1 or episodes >= max_episodes
+            keep = 0 if last_rung else max(1, len(trials) // eta)
+            for position, result in enumerate(rung_results):
+                result['rung'] = rung
+                result['promoted'] = position < keep
+                results.append(result)
+
+            best = rung_results[0]
+            print(f"  最佳: 试验 {best['trial_id']} 得分 {best['score']:.3f}")
+
+            if last_rung:
+                break
+
+            promoted_ids = {r['trial_id'] for r in rung_results[:keep]}
+            trials = [(trial_id, config) for trial_id, config in trials if trial_id in promoted_ids]
+            checkpoints = {trial_id: checkpoints[trial_id] for trial_id in promoted_ids}
+            episodes = min(episodes * eta, max_episodes)
+            rung += 1
+
+    return results
+
+
+def write_results(results, path):
+    """把所有试验结果写入一张CSV表"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fieldnames = ['rung', 'trial_id', 'episodes', *DEFAULT_SPACE,
+                  'agent1_score', 'agent2_score', 'score', 'elapsed', 'promoted']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="井字棋AI超参数搜索")
+    parser.add_argument('--mode', choices=['grid', 'random'], default='random', help="搜索方式")
+    parser.add_argument('--trials', type=int, default=27, help="随机搜索的试验数")
+    parser.add_argument('--min-episodes', type=int, default=500, help="第一轮的训练回合数")
+    parser.add_argument('--max-episodes', type=int, default=8000, help="最后一轮的训练回合数上限")
+    parser.add_argument('--eta', type=int, default=3, help="每轮淘汰比例（保留 1/eta）")
+    parser.add_argument('--eval-games', type=int, default=200, help="每个智能体的评估局数")
+    parser.add_argument('--workers', type=int, default=None, help="工作进程数（默认使用全部CPU）")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--output', default='ai_models/sweep_results.csv', help="结果表路径")
+    args = parser.parse_args()
+
+    if args.mode == 'grid':
+        configs = grid_configs(DEFAULT_SPACE)
+    else:
+        configs = random_configs(DEFAULT_SPACE, args.trials, args.seed)
+
+    num_rungs = 1 + max(0, math.ceil(math.log(max(len(configs), 1), args.eta)))
+    print(f"超参数搜索: {len(configs)} 组试验，最多 {num_rungs} 轮")
+    print("=" * 50)
+
+    start_time = time.time()
+    results = successive_halving(configs, args.min_episodes, args.max_episodes, args.eta,
+                                 args.eval_games, args.workers, args.seed)
+    write_results(results, args.output)
+
+    best = max((r for r in results if r['rung'] == results[-1]['rung']), key=lambda r: r['score'])
+    print("-" * 50)
+    print(f"搜索完成！耗时: {time.time() - start_time:.1f} 秒")
+    print(f"最佳超参数 (得分 {best['score']:.3f}):")
+    for name in DEFAULT_SPACE:
+        print(f"  {name}: {best[name]}")
+    print(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+落子推理服务
+基于 asyncio 的最小 HTTP/JSON 服务：输入棋盘和模型ID，返回最佳落子及各格子的分值。
+并发请求在极短的时间窗口内合并成一次向量化查表（微批处理），
+值行与对称规范局面一致的局面共用缓存条目（LRU），并统计延迟分位数和吞吐量
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+import numpy as np
+from ai_trainer import NUM_STATES, POWERS_OF_THREE
+import game_rules
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+MAX_BODY_SIZE = 64 * 1024
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large'}
+
+
+# 棋盘的8种对称变换（见 game_rules.SYMMETRIES）
+SYMMETRIES = np.array(game_rules.SYMMETRIES, dtype=np.int64)
+INVERSE_SYMMETRIES = np.argsort(SYMMETRIES, axis=1)
+
+
+def canonical_tables():
+    """为所有状态编号计算对称规范编号（8种变换中编号最小者）及所用变换
+
+    返回 (canonical, transform)，均为长度 NUM_STATES 的数组
+    """
+    digits = (np.arange(NUM_STATES)[:, None] // POWERS_OF_THREE) % 3
+    transformed = digits[:, SYMMETRIES] @ POWERS_OF_THREE  # (NUM_STATES, 8)
+    transform = np.argmin(transformed, axis=1)
+    canonical = transformed[np.arange(NUM_STATES), transform]
+    return canonical.astype(np.int32), transform.astype(np.int8)
+
+
+CANONICAL, TRANSFORM = canonical_tables()
+
+
+def shared_rows(values):
+    """各状态编号的值行变换到规范朝向后是否与规范局面自己的值行完全相同
+
+    相同时可以用规范局面的查表结果（及缓存）代替，映射回原朝向后与直接查表一致；
+    不同时必须查该局面自己的值行，才能与 FrozenAgent、对局服务器的落子一致
+    """
+    values = np.asarray(values)
+    oriented = np.take_along_axis(values, SYMMETRIES[TRANSFORM], axis=1)
+    return np.all(oriented == values[CANONICAL], axis=1)
+
+
+class LRUCache:
+    """容量有限的最近最少使用缓存"""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """查找并标记为最近使用；不存在时返回 None"""
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """写入，超出容量时淘汰最久未使用的条目"""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+class InferenceService:
+    """微批处理推理服务"""
+
+    def __init__(self, models, max_batch=64, max_delay=0.001, cache_size=10000, latency_window=10000):
+        # models: 模型ID -> (NUM_STATES, 9) 值表，按原样查表
+        self.tables = dict(models)
+        self.shared = {model_id: shared_rows(values) for model_id, values in models.items()}
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.cache = LRUCache(cache_size)
+        self.pending = []
+        self.flush_handle = None
+        self.latencies = deque(maxlen=latency_window)
+        self.counters = {'requests': 0, 'errors': 0, 'cache_hits': 0, 'batches': 0, 'batched_requests': 0}
+        self.start_time = time.monotonic()
+
+    async def infer(self, model_id, board):
+        """推理一个棋盘（9个格子，1=X, -1=O, 0=空），返回最佳落子和各格子分值"""
+        if model_id not in self.tables:
+            raise ValueError(f"未知模型: {model_id}")
+        # JSON 中的 1.0 或 true 与 1 相等，必须按类型排除
+        if (not isinstance(board, list) or len(board) != 9
+                or any(type(cell) is not int or cell not in (-1, 0, 1) for cell in board)):
+            raise ValueError("board 必须是9个取值为 1/-1/0 的整数")
+        if 0 not in board:
+            raise ValueError("棋盘已满")
+
+        index = sum((cell % 3) * 3 ** i for i, cell in enumerate(board))
+        if self.shared[model_id][index]:
+            # 查规范局面的值行；规范朝向的第 i 格对应原棋盘的第 perm[i] 格
+            state, perm = int(CANONICAL[index]), SYMMETRIES[TRANSFORM[index]]
+        else:
+            state, perm = index, SYMMETRIES[0]
+        key = (model_id, state)
+
+        row = self.cache.get(key)
+        if row is None:
+            row = await self.lookup(model_id, state)
+            self.cache.put(key, row)
+        else:
+            self.counters['cache_hits'] += 1
+
+        scores = [None] * 9
+        for i, cell in enumerate(perm.tolist()):
+            if board[cell] == 0:
+                scores[cell] = row[i]
+
+        legal = [cell for cell in range(9) if board[cell] == 0]
+        best = max(legal, key=lambda cell: (scores[cell], -cell))  # 并列时取编号最小的格子
+        return {'model': model_id, 'move': best, 'row': best // 3, 'col': best % 3, 'scores': scores}
+
+    def lookup(self, model_id, state):
+        """把查表请求加入当前批次，返回在批次执行后完成的 future"""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((model_id, state, future))
+
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.max_delay, self.flush)
+        return future
+
+    def flush(self):
+        """执行当前批次：每个模型一次向量化查表"""
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        self.counters['batches'] += 1
+        self.counters['batched_requests'] += len(batch)
+
+        by_model = {}
+        for model_id, state, future in batch:
+            by_model.setdefault(model_id, []).append((state, future))
+
+        for model_id, requests in by_model.items():
+            indices = np.fromiter((state for state, _ in requests), dtype=np.int64, count=len(requests))
+            rows = self.tables[model_id][indices].tolist()
+            for (_, future), row in zip(requests, rows):
+                if not future.done():
+                    future.set_result(tuple(row))
+
+    def record(self, latency, ok=True):
+        """记录一个请求的延迟（秒）"""
+        self.counters['requests'] += 1
+        if not ok:
+            self.counters['errors'] += 1
+        self.latencies.append(latency)
+
+    def metrics(self):
+        """延迟分位数（毫秒）、吞吐量、缓存命中率和平均批大小"""
+        uptime = time.monotonic() - self.start_time
+        requests = self.counters['requests']
+        latencies = np.array(self.latencies) * 1000
+        percentiles = np.percentile(latencies, [50, 95, 99]).round(3).tolist() if len(latencies) else [0.0] * 3
+        return {
+            **self.counters,
+            'uptime': round(uptime, 3),
+            'throughput': round(requests / uptime, 1) if uptime else 0.0,
+            'cache_size': len(self.cache),
+            'cache_hit_rate': round(self.counters['cache_hits'] / requests, 4) if requests else 0.0,
+            'mean_batch_size': round(self.counters['batched_requests'] / self.counters['batches'], 2)
+            if self.counters['batches'] else 0.0,
+            'latency_ms': dict(zip(('p50', 'p95', 'p99'), percentiles)),
+        }
+
+
+class HTTPFrontend:
+    """最小的 HTTP/1.1 前端（支持长连接）
+
+    POST /v1/move    {"model": "x", "board": [9个格子]}
+    GET  /v1/models
+    GET  /metrics
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self.server = None
+        self.connections = {}  # 连接的写端 -> 处理该连接的任务
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """在TCP端口或Unix套接字上监听"""
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self.handle_client, unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server
+
+    async def stop(self):
+        """停止服务"""
+        self.server.close()
+        for writer in list(self.connections):
+            writer.close()
+        await asyncio.gather(*self.connections.values(), return_exceptions=True)
+        await self.server.wait_closed()
+
+    @property
+    def port(self):
+        """实际监听的端口"""
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle_client(self, reader, writer):
+        """处理一个连接上的多个请求"""
+        self.connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = headers.get('content-length', '0')
+                if not (length.isascii() and length.isdigit()):
+                    await self.respond(writer, 400, {'error': f"Content-Length 无效: {length!r}"}, keep_alive=False)
+                    break
+                length = int(length)
+                if length > MAX_BODY_SIZE:
+                    await self.respond(writer, 413, {'error': "请求体过大"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                method, _, rest = request_line.decode('latin-1').partition(' ')
+                path = rest.split(' ', 1)[0]
+                status, payload = await self.route(method, path, body)
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError:
+            # 请求行或请求头超过 StreamReader 的长度限制
+            try:
+                await self.respond(writer, 400, {'error': "请求头过长"}, keep_alive=False)
+            except ConnectionError:
+                pass
+        finally:
+            self.connections.pop(writer, None)
+            writer.close()
+
+    async def route(self, method, path, body):
+        """按路径分派请求，返回 (状态码, JSON对象)"""
+        if path == '/v1/move':
+            if method != 'POST':
+                return 405, {'error': "请使用 POST"}
+            return await self.handle_move(body)
+        if path == '/v1/models' and method == 'GET':
+            return 200, {'models': sorted(self.service.tables)}
+        if path == '/metrics' and method == 'GET':
+            return 200, self.service.metrics()
+        return 404, {'error': f"未知路径: {path}"}
+
+    async def handle_move(self, body):
+        """推理一个落子请求并记录延迟"""
+        start_time = time.perf_counter()
+        try:
+            request = json.loads(body)
+            result = await self.service.infer(request.get('model', 'x'), request['board'])
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            self.service.record(time.perf_counter() - start_time, ok=False)
+            return 400, {'error': str(e)}
+
+        self.service.record(time.perf_counter() - start_time)
+        return 200, result
+
+    @staticmethod
+    async def respond(writer, status, payload, keep_alive=True):
+        """写回JSON响应"""
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+
+async def serve(args):
+    """运行服务直到被中断"""
+    from game_server import load_models
+
+    models = {model_id: agent.values for model_id, agent in load_models(args.model).items()}
+    service = InferenceService(models, args.max_batch, args.max_delay / 1000, args.cache_size)
+    frontend = HTTPFrontend(service)
+    await frontend.start(args.host, args.port, args.unix)
+
+    address = args.unix or f"http://{args.host}:{frontend.port}"
+    print(f"推理服务已启动: {address}  模型: {', '.join(sorted(service.tables))}")
+    try:
+        await frontend.server.serve_forever()
+    finally:
+        await frontend.stop()
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="井字棋落子推理服务")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="监听地址")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument('--unix', default=None, help="改为监听Unix套接字路径")
+    parser.add_argument('--model', action='append', default=[], metavar='ID=PATH',
+                        help="加载模型（可重复；默认使用注册表中最新的检查点）")
+    parser.add_argument('--max-batch', type=int, default=64, help="每批最多合并的请求数")
+    parser.add_argument('--max-delay', type=float, default=1.0, help="凑批最长等待时间（毫秒）")
+    parser.add_argument('--cache-size', type=int, default=10000, help="LRU缓存容量")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\n已停止")
+
+
+if __name__ == "__main__":
+    main()
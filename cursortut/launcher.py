@@ -7,6 +7,7 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
+import importlib
 import subprocess
 import sys
 import os
@@ -125,31 +126,43 @@ class GameLauncher:
         """离开悬停效果"""
         button.configure(bg=original_bg)
     
+    def open_in_process(self, module_name, class_name):
+        """在当前进程中以子窗口形式打开游戏界面"""
+        module = importlib.import_module(module_name)
+        app = getattr(module, class_name)(master=self.root)
+        
+        # 游戏窗口关闭后重新显示启动器
+        def on_destroy(event):
+            if event.widget is app.root:
+                self.root.deiconify()
+        
+        app.root.bind('<Destroy>', on_destroy, add='+')
+        self.root.withdraw()
+        app.root.focus_force()
+        return app
+    
     def launch_basic_gui(self):
         """启动基础GUI版本"""
         try:
-            if os.path.exists('tic_tac_toe_gui.py'):
-                subprocess.Popen([sys.executable, 'tic_tac_toe_gui.py'])
-                self.root.withdraw()
-            else:
-                messagebox.showerror("错误", "找不到 tic_tac_toe_gui.py 文件")
+            self.open_in_process('tic_tac_toe_gui', 'TicTacToeGUI')
+        except ImportError as e:
+            messagebox.showerror("错误", f"找不到 tic_tac_toe_gui.py 文件: {e}")
         except Exception as e:
             messagebox.showerror("错误", f"启动失败: {e}")
     
     def launch_enhanced_gui(self):
         """启动增强版GUI"""
         try:
-            if os.path.exists('tic_tac_toe_enhanced.py'):
-                subprocess.Popen([sys.executable, 'tic_tac_toe_enhanced.py'])
-                self.root.withdraw()
-            else:
-                messagebox.showerror("错误", "找不到 tic_tac_toe_enhanced.py 文件")
+            self.open_in_process('tic_tac_toe_enhanced', 'EnhancedTicTacToeGUI')
+        except ImportError as e:
+            messagebox.showerror("错误", f"找不到 tic_tac_toe_enhanced.py 文件: {e}")
         except Exception as e:
             messagebox.showerror("错误", f"启动失败: {e}")
     
     def launch_console(self):
         """启动控制台版本"""
         try:
+            # 控制台版本需要独占终端的标准输入，仍在独立进程中运行
             if os.path.exists('tic_tac_toe.py'):
                 subprocess.Popen([sys.executable, 'tic_tac_toe.py'])
                 self.root.withdraw()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快照联赛自我对弈训练
+定期把两个智能体冻结为快照放入对手池，训练时按胜率优先级从池中抽取对手，
+避免两个智能体只针对彼此过拟合
+"""
+
+import argparse
+import time
+from ai_trainer import AITrainer, FrozenAgent
+from game_records import GameLogWriter
+
+
+class OpponentPool:
+    """对手池：保存冻结快照及学习方对其的战绩"""
+
+    def __init__(self, max_size=20, priority_power=2.0):
+        self.max_size = max_size
+        self.priority_power = priority_power
+        self.snapshots = []
+        self.records = []  # 每个快照对应 [胜, 负, 平]（学习方视角）
+        self.totals = [0, 0, 0]  # 学习方对池中所有快照（含已移除的）的总战绩
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def add(self, snapshot):
+        """加入快照，超出容量时移除最旧的快照"""
+        self.snapshots.append(snapshot)
+        self.records.append([0, 0, 0])
+        if len(self.snapshots) > self.max_size:
+            self.snapshots.pop(0)
+            self.records.pop(0)
+
+    def win_rate(self, index):
+        """学习方对该快照的得分率（加入先验，未对战过的快照为0.5）"""
+        wins, losses, draws = self.records[index]
+        return (wins + 0.5 * draws + 1) / (wins + losses + draws + 2)
+
+    def priorities(self):
+        """按胜率计算抽样优先级：学习方越难赢的快照越容易被抽中"""
+        return [(1 - self.win_rate(i)) ** self.priority_power for i in range(len(self.snapshots))]
+
+    def sample(self, rng):
+        """按优先级抽取一个快照，返回其位置"""
+        return rng.weighted_index(self.priorities())
+
+    def record(self, index, result):
+        """记录学习方对该快照的结果（1胜 / -1负 / 0平）"""
+        column = 0 if result > 0 else 1 if result < 0 else 2
+        self.records[index][column] += 1
+        self.totals[column] += 1
+
+
+class LeagueTrainer(AITrainer):
+    """联赛模式训练器
+
+    每局以 live_ratio 的概率让两个在训智能体直接对弈，否则轮流让其中一方
+    对阵从对方快照池中抽取的冻结对手；每 snapshot_interval 局把双方各冻结一次。
+    智能体的胜负计数（以及训练统计和注册表中的Elo）只来自两者的直接对弈，
+    对快照的战绩记在对手池中
+    """
+
+    def __init__(self, agent1=None, agent2=None, snapshot_interval=500, pool_size=20,
+                 live_ratio=0.2, priority_power=2.0, seed=None, game_log=None):
+        super().__init__(agent1, agent2, seed, game_log)
+        self.snapshot_interval = snapshot_interval
+        self.live_ratio = live_ratio
+        # X方快照作为智能体2的对手，O方快照作为智能体1的对手
+        self.x_pool = OpponentPool(pool_size, priority_power)
+        self.o_pool = OpponentPool(pool_size, priority_power)
+        self.episode_count = 0
+
+    def take_snapshots(self):
+        """冻结当前的两个智能体并加入对手池"""
+        self.x_pool.add(FrozenAgent.from_agent(self.agent1, f"{self.agent1.name}@{self.episode_count}"))
+        self.o_pool.add(FrozenAgent.from_agent(self.agent2, f"{self.agent2.name}@{self.episode_count}"))
+
+    def train_episode(self):
+        """训练一个回合"""
+        if self.episode_count % self.snapshot_interval == 0:
+            self.take_snapshots()
+        self.episode_count += 1
+
+        if self.rng.random() < self.live_ratio:
+            winner = self.play_training_game(self.agent1, self.agent2)
+            return self.record_result(winner)
+
+        # 对阵快照时另一方没有参赛，其奖励记为0
+        if self.episode_count % 2 == 0:
+            # 智能体1（X）对阵O方快照
+            index = self.o_pool.sample(self.rng)
+            winner = self.play_training_game(self.agent1, self.o_pool.snapshots[index])
+            self.o_pool.record(index, winner)
+            return winner, 0
+
+        # 智能体2（O）对阵X方快照
+        index = self.x_pool.sample(self.rng)
+        winner = self.play_training_game(self.x_pool.snapshots[index], self.agent2)
+        self.x_pool.record(index, -winner)
+        return 0, -winner
+
+    def print_final_stats(self):
+        """打印最终统计：直接对弈的战绩，以及双方对快照的总战绩"""
+        if self.agent1.win_count + self.agent2.win_count + self.agent1.draw_count:
+            super().print_final_stats()
+        else:
+            print("\n两个在训智能体没有直接对弈")
+        for agent, pool in ((self.agent1, self.o_pool), (self.agent2, self.x_pool)):
+            wins, losses, draws = pool.totals
+            print(f"{agent.name} 对快照: 胜 {wins} / 负 {losses} / 平 {draws}")
+
+    def print_pool_stats(self):
+        """打印对手池战绩"""
+        for title, pool in (("O方快照池（智能体1的对手）", self.o_pool), ("X方快照池（智能体2的对手）", self.x_pool)):
+            print(f"\n{title}: {len(pool)} 个快照")
+            for i, snapshot in enumerate(pool.snapshots):
+                wins, losses, draws = pool.records[i]
+                print(f"  {snapshot.name}: 胜 {wins} / 负 {losses} / 平 {draws}  得分率 {pool.win_rate(i):.2f}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="快照联赛自我对弈训练")
+    parser.add_argument('--episodes', type=int, default=10000, help="训练回合数")
+    parser.add_argument('--save-interval', type=int, default=1000, help="保存间隔")
+    parser.add_argument('--snapshot-interval', type=int, default=500, help="快照间隔")
+    parser.add_argument('--pool-size', type=int, default=20, help="对手池容量")
+    parser.add_argument('--live-ratio', type=float, default=0.2, help="在训智能体直接对弈的比例")
+    parser.add_argument('--game-log', default=None, help="把所有训练对局追加写入该对局日志（.tttg）")
+    args = parser.parse_args()
+
+    game_log = GameLogWriter(args.game_log) if args.game_log else None
+    trainer = LeagueTrainer(snapshot_interval=args.snapshot_interval, pool_size=args.pool_size,
+                            live_ratio=args.live_ratio, game_log=game_log)
+
+    start_time = time.time()
+    try:
+        trainer.train(args.episodes, args.save_interval)
+        trainer.save_models("league")
+    finally:
+        if game_log is not None:
+            game_log.close()
+
+    print(f"\n训练完成！耗时: {time.time() - start_time:.1f} 秒")
+    trainer.print_pool_stats()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+负载测试
+模拟大量并发玩家访问本地对局服务器（game_server）或推理服务（inference_service），
+支持闭环（固定并发玩家数）和开环（泊松到达）两种模型，落子序列按 TicTacToeGame 规则随机生成；
+以JSON报告吞吐量、p50/p95/p99延迟和错误率
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+from ai_trainer import TicTacToeGame
+from random_streams import RandomStream
+
+TARGETS = ('game', 'inference')
+ARRIVALS = ('closed', 'open')
+DEFAULT_PORTS = {'game': 8765, 'inference': 8766}
+# 对局服务器中AI执O；推理服务为X方的每一步请求落子
+DEFAULT_MODELS = {'game': 'o', 'inference': 'x'}
+
+
+class Recorder:
+    """记录每个请求的延迟和错误"""
+
+    def __init__(self):
+        self.latencies = {}  # 操作名 -> 延迟列表（秒）
+        self.requests = {}
+        self.errors = {}
+        self.games = 0
+
+    def record(self, op, latency=None, ok=True):
+        """记录一次请求；连接失败等没有响应的请求不计入延迟"""
+        self.requests[op] = self.requests.get(op, 0) + 1
+        if latency is not None:
+            self.latencies.setdefault(op, []).append(latency)
+        if not ok:
+            self.errors[op] = self.errors.get(op, 0) + 1
+
+    def summary(self, requests, latencies, errors, duration):
+        """汇总一组请求"""
+        result = {
+            'requests': requests,
+            'errors': errors,
+            'error_rate': round(errors / requests, 6) if requests else 0.0,
+            'throughput': round(requests / duration, 1) if duration else 0.0,
+        }
+        if latencies:
+            values = np.array(latencies) * 1000
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result['latency_ms'] = {'p50': round(p50, 3), 'p95': round(p95, 3), 'p99': round(p99, 3),
+                                    'mean': round(float(values.mean()), 3), 'max': round(float(values.max()), 3)}
+        return result
+
+    def report(self, duration, config):
+        """生成完整报告"""
+        all_latencies = [latency for values in self.latencies.values() for latency in values]
+        return {
+            **config,
+            'duration': round(duration, 3),
+            'games': self.games,
+            'games_per_sec': round(self.games / duration, 1) if duration else 0.0,
+            **self.summary(sum(self.requests.values()), all_latencies, sum(self.errors.values()), duration),
+            'operations': {op: self.summary(requests, self.latencies.get(op, []), self.errors.get(op, 0), duration)
+                           for op, requests in sorted(self.requests.items())},
+        }
+
+
+class GameClient:
+    """对局服务器客户端（每行一个JSON）"""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def call(self, op, **request):
+        """发送请求并记录延迟"""
+        start_time = time.perf_counter()
+        self.writer.write(json.dumps({'cmd': op, **request}).encode() + b'\n')
+        await self.writer.drain()
+        response = json.loads(await self.reader.readline())
+        self.recorder.record(op, time.perf_counter() - start_time, response.get('ok', False))
+        return response
+
+    async def play_game(self, rng, model):
+        """以人类身份执X随机落子，直到对局结束"""
+        game = TicTacToeGame()
+        response = await self.call('new', x='human', o=model)
+        if not response['ok']:
+            return
+        session = response['session']
+
+        while not response['over']:
+            row, col = rng.choice(game.get_valid_moves())
+            game.make_move(row, col)
+            response = await self.call('move', session=session, cell=row * 3 + col)
+            if not response['ok']:
+                break
+            # 在本地棋盘上同步AI的应对
+            for cell in response['ai_moves']:
+                game.make_move(cell // 3, cell % 3)
+
+        await self.call('close', session=session)
+        self.recorder.games += 1
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+class InferenceClient:
+    """推理服务客户端（HTTP/1.1 长连接）"""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.reader = None
+        self.writer = None
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def request_move(self, model, board):
+        """请求一次落子推理并记录延迟"""
+        body = json.dumps({'model': model, 'board': board}).encode()
+        start_time = time.perf_counter()
+        self.writer.write(f"POST /v1/move HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        response = json.loads(await self.reader.readexactly(length))
+        self.recorder.record('move', time.perf_counter() - start_time, status == 200)
+        return response if status == 200 else None
+
+    async def play_game(self, rng, model):
+        """X方每步都向服务请求落子，O方随机落子，直到对局结束"""
+        game = TicTacToeGame()
+        while not game.game_over:
+            if game.current_player == 1:
+                response = await self.request_move(model, game.board.ravel().tolist())
+                if response is None:
+                    break
+                row, col = response['row'], response['col']
+            else:
+                row, col = rng.choice(game.get_valid_moves())
+            game.make_move(row, col)
+        self.recorder.games += 1
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+
+
+CLIENTS = {'game': GameClient, 'inference': InferenceClient}
+
+
+async def closed_loop(args, recorder, deadline, rng):
+    """闭环：固定数量的玩家各自连续对局，每局之间等待思考时间"""
+
+    async def player(player_rng):
+        client = CLIENTS[args.target](recorder)
+        try:
+            await client.connect(args.host, args.port)
+            while time.monotonic() < deadline:
+                await client.play_game(player_rng, args.model)
+                if args.think_time:
+                    await asyncio.sleep(player_rng.random() * 2 * args.think_time)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            recorder.record('connection', ok=False)
+        finally:
+            client.close()
+
+    await asyncio.gather(*[player(player_rng) for player_rng in rng.spawn(args.concurrency)])
+
+
+async def open_loop(args, recorder, deadline, rng):
+    """开环：新玩家按泊松过程到达（每秒 rate 个），每个玩家连接后下一局即离开；
+    同时在线的玩家数超过 concurrency 时新到达的玩家计为错误"""
+    active = set()
+
+    async def player(player_rng):
+        client = CLIENTS[args.target](recorder)
+        try:
+            await client.connect(args.host, args.port)
+            await client.play_game(player_rng, args.model)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            recorder.record('connection', ok=False)
+        finally:
+            client.close()
+
+    next_arrival = time.monotonic() + rng.generator.exponential(1.0 / args.rate)
+    while next_arrival < deadline:
+        await asyncio.sleep(max(0.0, next_arrival - time.monotonic()))
+        next_arrival += rng.generator.exponential(1.0 / args.rate)
+        player_rng = rng.spawn(1)[0]
+
+        if len(active) >= args.concurrency:
+            recorder.record('rejected', ok=False)
+            continue
+        task = asyncio.create_task(player(player_rng))
+        active.add(task)
+        task.add_done_callback(active.discard)
+
+    if active:
+        await asyncio.gather(*active)
+
+
+async def start_local_server(args):
+    """在本进程中启动被测服务（便于快速试验；与负载生成器共享同一个CPU）"""
+    from game_server import GameServer, load_models
+
+    models = load_models()
+    if args.target == 'game':
+        server = GameServer(models)
+        await server.start(args.host, 0)
+    else:
+        from inference_service import InferenceService, HTTPFrontend
+        server = HTTPFrontend(InferenceService({model_id: agent.values for model_id, agent in models.items()}))
+        await server.start(args.host, 0)
+    args.port = server.port
+    return server
+
+
+async def run_load_test(args):
+    """运行负载测试，返回报告"""
+    server = await start_local_server(args) if args.local else None
+    recorder = Recorder()
+    rng = RandomStream(args.seed)
+
+    start_time = time.monotonic()
+    deadline = start_time + args.duration
+    try:
+        if args.arrival == 'closed':
+            await closed_loop(args, recorder, deadline, rng)
+        else:
+            await open_loop(args, recorder, deadline, rng)
+    finally:
+        if server is not None:
+            await server.stop()
+
+    config = {'target': args.target, 'arrival': args.arrival, 'concurrency': args.concurrency,
+              'rate': args.rate if args.arrival == 'open' else None, 'model': args.model}
+    return recorder.report(time.monotonic() - start_time, config)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="对局服务器/推理服务负载测试")
+    parser.add_argument('--target', choices=TARGETS, default='game', help="被测服务")
+    parser.add_argument('--host', default='127.0.0.1', help="服务地址")
+    parser.add_argument('--port', type=int, default=None, help="服务端口（默认按被测服务选择）")
+    parser.add_argument('--local', action='store_true', help="在本进程中启动被测服务")
+    parser.add_argument('--arrival', choices=ARRIVALS, default='closed', help="到达模型")
+    parser.add_argument('--concurrency', type=int, default=100, help="闭环玩家数 / 开环同时在线上限")
+    parser.add_argument('--rate', type=float, default=200.0, help="开环模式下每秒到达的玩家数")
+    parser.add_argument('--think-time', type=float, default=0.0, help="闭环模式下每局之间的平均思考时间（秒）")
+    parser.add_argument('--duration', type=float, default=10.0, help="测试时长（秒）")
+    parser.add_argument('--model', default=None, help="使用的模型ID（默认按被测服务选择）")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--output', default=None, help="报告输出路径（默认打印到标准输出）")
+    args = parser.parse_args()
+
+    if args.port is None:
+        args.port = DEFAULT_PORTS[args.target]
+    if args.model is None:
+        args.model = DEFAULT_MODELS[args.target]
+
+    report = asyncio.run(run_load_test(args))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print(f"报告已保存到 {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型导出
+把训练好的Q学习/蒙特卡洛模型量化为 float16 或 int8（附缩放因子），
+只保留贪心策略下可能到达的状态，保存为小巧的 .npz 文件，
+并记录压缩比和导出前后的评估得分
+"""
+
+import argparse
+import json
+import os
+import pickle
+import numpy as np
+from ai_trainer import (NUM_STATES, QLearningAgent, MonteCarloAgent, AfterstateAgent, FrozenAgent,
+                        evaluate_agent)
+from game_rules import CELL_POWERS, ONGOING, outcome, legal_cells, numpy_tables
+from random_streams import RandomStream
+
+EXPORT_VERSION = 1
+EXPORT_DTYPES = ('float16', 'int8')
+
+
+def reachable_states(values, player=1):
+    """深度优先遍历：智能体（player 一方）按 values 贪心落子、对手任意落子时，
+    智能体需要决策的所有状态编号
+
+    贪心动作并列时所有并列动作都会被展开，因为 FrozenAgent 会在其中随机选择
+    """
+    decision_states = set()
+    seen = set()
+    stack = [(0, 1)]
+
+    while stack:
+        index, to_move = stack.pop()
+        if index in seen:
+            continue
+        seen.add(index)
+
+        if outcome(index) != ONGOING:
+            continue
+        empty = legal_cells(index)
+
+        if to_move == player:
+            decision_states.add(index)
+            row_values = values[index]
+            best_value = max(row_values[cell] for cell in empty)
+            moves = [cell for cell in empty if row_values[cell] == best_value]
+        else:
+            moves = empty
+
+        digit = 1 if to_move == 1 else 2
+        for cell in moves:
+            stack.append((index + digit * CELL_POWERS[cell], -to_move))
+
+    return decision_states
+
+
+def quantize(values, dtype):
+    """量化值数组，返回 (量化后的数组, 缩放因子)；反量化为 quantized * scale"""
+    if dtype == 'float16':
+        return values.astype(np.float16), 1.0
+    if dtype == 'int8':
+        max_abs = float(np.abs(values).max()) if values.size else 0.0
+        scale = max_abs / 127 if max_abs > 0 else 1.0
+        return np.round(values / scale).astype(np.int8), scale
+    raise ValueError(f"不支持的导出类型: {dtype}")
+
+
+def dequantize(quantized, scale):
+    """反量化为 float32"""
+    return quantized.astype(np.float32) * np.float32(scale)
+
+
+def load_agent(path):
+    """根据模型文件内容加载对应类型的智能体"""
+    with open(path, 'rb') as f:
+        model_data = pickle.load(f)
+    if 'q_table' in model_data:
+        agent = QLearningAgent()
+    elif model_data.get('format') == 'afterstate':
+        agent = AfterstateAgent()
+    else:
+        agent = MonteCarloAgent()
+    agent.load_model(path)
+    return agent
+
+
+def export_model(agent, path, player=1, dtype='int8', eval_games=1000, seed=0, source_size=None):
+    """量化并裁剪智能体的值表，写入 .npz 文件，返回导出报告"""
+    values = agent.to_q_array() if hasattr(agent, 'to_q_array') else agent.to_value_array()
+
+    # 先量化，再按量化后的贪心策略计算可到达状态，保证保留的正是部署时会用到的状态
+    visited = np.flatnonzero(values.any(axis=1))
+    quantized, scale = quantize(values[visited], dtype)
+    deployed = np.zeros_like(values)
+    deployed[visited] = dequantize(quantized, scale)
+
+    reachable = reachable_states(deployed.tolist(), player)
+    keep = np.array(sorted(reachable.intersection(visited.tolist())), dtype=np.int32)
+    kept_values = quantized[np.searchsorted(visited, keep)]
+
+    original_agent = FrozenAgent(agent.name, values, RandomStream(seed))
+    exported_agent = FrozenAgent(agent.name, expand(keep, kept_values, scale), RandomStream(seed))
+
+    report = {
+        'version': EXPORT_VERSION,
+        'name': agent.name,
+        'algorithm': type(agent).__name__,
+        'player': player,
+        'dtype': dtype,
+        'scale': scale,
+        'visited_states': int(len(visited)),
+        'kept_states': int(len(keep)),
+        'policy_agreement': policy_agreement(values, deployed, keep),
+    }
+
+    np.savez_compressed(path, indices=keep, values=kept_values, scale=np.float32(scale),
+                        report=np.array(json.dumps(report)))
+
+    export_size = os.path.getsize(path)
+    report['export_size'] = export_size
+    if source_size:
+        report['source_size'] = source_size
+        report['compression_ratio'] = round(source_size / export_size, 2)
+
+    if eval_games:
+        before = evaluate_agent(original_agent, player, eval_games, rng=RandomStream(seed))['score']
+        after = evaluate_agent(exported_agent, player, eval_games, rng=RandomStream(seed))['score']
+        report['score_before'] = before
+        report['score_after'] = after
+        report['score_change'] = round(after - before, 4)
+
+    return report
+
+
+def best_moves(values, states):
+    """各状态下值最大的合法格子：(len(states), 9) 的布尔数组，并列的格子都为 True"""
+    _, _, legal = numpy_tables()
+    states = np.asarray(states, dtype=np.int64)
+    mask = (legal[states, None] >> np.arange(9)) & 1 == 1
+    masked = np.where(mask, values[states], -np.inf)
+    return mask & (masked == masked.max(axis=1, keepdims=True))
+
+
+def policy_agreement(values, deployed, states):
+    """在给定状态上，量化前后最佳合法动作的集合完全相同的比例
+
+    FrozenAgent 在并列的最佳动作中随机选择，量化造成的新并列也算作不一致
+    """
+    if len(states) == 0:
+        return 1.0
+    same = (best_moves(values, states) == best_moves(deployed, states)).all(axis=1)
+    return round(float(same.mean()), 4)
+
+
+def expand(indices, quantized, scale):
+    """把裁剪后的稀疏行还原成 (NUM_STATES, 9) 的 float32 值数组"""
+    values = np.zeros((NUM_STATES, 9), dtype=np.float32)
+    values[indices] = dequantize(quantized, scale)
+    return values
+
+
+def load_exported(path, name=None, rng=None):
+    """加载导出的 .npz 模型为 FrozenAgent"""
+    with np.load(path) as data:
+        report = json.loads(str(data['report']))
+        values = expand(data['indices'], data['values'], float(data['scale']))
+    agent = FrozenAgent(name or report['name'], values, rng)
+    agent.export_report = report
+    return agent
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="量化并裁剪导出AI模型")
+    parser.add_argument('model', help="模型文件路径（.pkl）")
+    parser.add_argument('--player', type=int, choices=[1, -1], default=None,
+                        help="智能体执棋方（1=X, -1=O；默认按文件名 agent1/agent2 推断）")
+    parser.add_argument('--dtype', choices=EXPORT_DTYPES, default='int8', help="量化类型")
+    parser.add_argument('--output', default=None, help="输出路径（默认与模型同名，扩展名 .npz）")
+    parser.add_argument('--eval-games', type=int, default=1000, help="评估局数（0 表示不评估）")
+    args = parser.parse_args()
+
+    player = args.player if args.player is not None else (-1 if 'agent2' in os.path.basename(args.model) else 1)
+    output = args.output or f"{os.path.splitext(args.model)[0]}_{args.dtype}.npz"
+
+    agent = load_agent(args.model)
+    report = export_model(agent, output, player, args.dtype, args.eval_games,
+                          source_size=os.path.getsize(args.model))
+
+    print(f"已导出: {output}")
+    print(f"保留状态: {report['kept_states']} / {report['visited_states']}")
+    print(f"文件大小: {report['source_size']} -> {report['export_size']} 字节 (压缩比 {report['compression_ratio']}x)")
+    print(f"贪心动作一致率: {report['policy_agreement']:.2%}")
+    if 'score_change' in report:
+        print(f"评估得分: {report['score_before']:.3f} -> {report['score_after']:.3f} ({report['score_change']:+.3f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存映射模型
+把模型的值表保存为固定布局的二进制文件（64字节文件头 + 稠密 float32 (NUM_STATES, 9) 数组），
+用 numpy.memmap 只读打开：打开耗时与模型大小无关，多个进程打开同一文件时
+由操作系统页缓存共享同一份物理内存
+"""
+
+import argparse
+import os
+import struct
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from ai_trainer import NUM_STATES, FrozenAgent, evaluate_agent
+from random_streams import RandomStream
+
+MMAP_MAGIC = b'TTTM'
+MMAP_VERSION = 1
+MMAP_EXTENSION = '.tttm'
+
+# 文件头：魔数、版本、值类型、状态数、动作数、执棋方、名称（UTF-8，补零到32字节），补齐到64字节
+HEADER_FORMAT = '<4sHHIIi32s'
+HEADER_SIZE = 64
+DTYPE_FLOAT32 = 1
+
+
+class ModelHeader:
+    """二进制模型文件头"""
+
+    def __init__(self, name="", player=0, num_states=NUM_STATES, num_actions=9,
+                 version=MMAP_VERSION, dtype_code=DTYPE_FLOAT32):
+        self.name = name
+        self.player = player
+        self.num_states = num_states
+        self.num_actions = num_actions
+        self.version = version
+        self.dtype_code = dtype_code
+
+    def pack(self):
+        """打包为 HEADER_SIZE 字节"""
+        name = self.name.encode('utf-8')[:32]
+        header = struct.pack(HEADER_FORMAT, MMAP_MAGIC, self.version, self.dtype_code,
+                             self.num_states, self.num_actions, self.player, name)
+        return header.ljust(HEADER_SIZE, b'\0')
+
+    @classmethod
+    def unpack(cls, data):
+        """从文件开头的字节解析文件头"""
+        if len(data) < HEADER_SIZE:
+            raise ValueError("模型文件过短，缺少文件头")
+
+        magic, version, dtype_code, num_states, num_actions, player, name = struct.unpack_from(HEADER_FORMAT, data)
+        if magic != MMAP_MAGIC:
+            raise ValueError(f"不是内存映射模型文件: 魔数 {magic!r}")
+        if version != MMAP_VERSION:
+            raise ValueError(f"不支持的模型文件版本: {version}")
+        if dtype_code != DTYPE_FLOAT32:
+            raise ValueError(f"不支持的值类型: {dtype_code}")
+
+        return cls(name.rstrip(b'\0').decode('utf-8', errors='replace'), player,
+                   num_states, num_actions, version, dtype_code)
+
+
+def write_model(values, path, name="", player=0):
+    """把 (NUM_STATES, 9) 值数组写成内存映射模型文件（先写临时文件再替换，读者不会看到半个文件）"""
+    values = np.ascontiguousarray(values, dtype='<f4')
+    header = ModelHeader(name, player, values.shape[0], values.shape[1])
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header.pack())
+        f.write(values.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_header(path):
+    """读取模型文件头"""
+    with open(path, 'rb') as f:
+        return ModelHeader.unpack(f.read(HEADER_SIZE))
+
+
+def open_values(path):
+    """只读映射模型文件中的值数组（不读取数据，按需缺页加载）"""
+    header = read_header(path)
+    expected_size = HEADER_SIZE + header.num_states * header.num_actions * 4
+    if os.path.getsize(path) != expected_size:
+        raise ValueError(f"模型文件大小不符: 应为 {expected_size} 字节")
+
+    values = np.memmap(path, dtype='<f4', mode='r', offset=HEADER_SIZE,
+                       shape=(header.num_states, header.num_actions))
+    return header, values
+
+
+def mmap_path_for(model_path):
+    """pickle 模型对应的内存映射文件路径"""
+    return os.path.splitext(model_path)[0] + MMAP_EXTENSION
+
+
+def convert_pickle(model_path, player=0):
+    """把 pickle 模型转换为内存映射文件"""
+    from model_export import load_agent
+
+    agent = load_agent(model_path)
+    values = agent.to_q_array() if hasattr(agent, 'to_q_array') else agent.to_value_array()
+    return write_model(values, mmap_path_for(model_path), agent.name, player)
+
+
+def ensure_mmap(model_path, player=0):
+    """按需转换：内存映射文件不存在或比 pickle 旧时重新生成，返回其路径"""
+    mmap_path = mmap_path_for(model_path)
+    if not os.path.exists(mmap_path) or os.path.getmtime(mmap_path) < os.path.getmtime(model_path):
+        convert_pickle(model_path, player)
+    return mmap_path
+
+
+def open_model(path, name=None, rng=None):
+    """打开模型为 FrozenAgent；传入 .pkl 时先按需转换为内存映射文件"""
+    if path.endswith('.pkl'):
+        path = ensure_mmap(path)
+
+    header, values = open_values(path)
+    agent = FrozenAgent(name or header.name, values, rng)
+    agent.player = header.player
+    return agent
+
+
+def evaluate_worker(path, player, num_games, seed_sequence):
+    """评估工作进程：映射同一个模型文件并与随机对手对战"""
+    agent_rng, opponent_rng = RandomStream(seed_sequence).spawn(2)
+    agent = open_model(path, rng=agent_rng)
+    return evaluate_agent(agent, player, num_games, rng=opponent_rng)
+
+
+def parallel_evaluate(path, player=1, num_games=1000, workers=None, seed=0):
+    """在多个工作进程中评估同一个模型；各进程共享页缓存中的同一份值表"""
+    if path.endswith('.pkl'):
+        path = ensure_mmap(path, player)
+
+    workers = workers or os.cpu_count()
+    games = [num_games // workers + (1 if i < num_games % workers else 0) for i in range(workers)]
+    seeds = RandomStream(seed).seed_sequence.spawn(workers)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(evaluate_worker, [path] * workers, [player] * workers, games, seeds))
+
+    total = {key: sum(r[key] for r in results) for key in ('wins', 'losses', 'draws')}
+    total['score'] = (total['wins'] + 0.5 * total['draws']) / num_games if num_games else 0.0
+    return total
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="内存映射模型转换与并行评估")
+    parser.add_argument('model', help="模型文件路径（.pkl 或 .tttm）")
+    parser.add_argument('--player', type=int, choices=[1, -1], default=None,
+                        help="智能体执棋方（1=X, -1=O；默认按文件名 agent1/agent2 推断）")
+    parser.add_argument('--evaluate', type=int, default=0, help="并行评估局数（0 表示只转换）")
+    parser.add_argument('--workers', type=int, default=None, help="评估工作进程数")
+    args = parser.parse_args()
+
+    player = args.player if args.player is not None else (-1 if 'agent2' in os.path.basename(args.model) else 1)
+    path = args.model
+    if path.endswith('.pkl'):
+        path = ensure_mmap(path, player)
+        print(f"内存映射文件: {path} ({os.path.getsize(path)} 字节)")
+
+    start_time = time.perf_counter()
+    agent = open_model(path)
+    print(f"打开模型 {agent.name}: {(time.perf_counter() - start_time) * 1e6:.0f} 微秒")
+
+    if args.evaluate:
+        start_time = time.time()
+        result = parallel_evaluate(path, player, args.evaluate, args.workers)
+        print(f"评估 {args.evaluate} 局: 胜 {result['wins']} / 负 {result['losses']} / 平 {result['draws']}"
+              f"  得分 {result['score']:.3f}  耗时 {time.time() - start_time:.1f} 秒")
+
+
+if __name__ == "__main__":
+    main()
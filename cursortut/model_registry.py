@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI模型注册表
+在 ai_models/index.json 中维护所有检查点的索引（回合数、算法、超参数、
+文件哈希与大小、主要指标），查询最新模型、最佳模型等无需扫描目录或反序列化模型文件。
+启动器的训练子进程和工作进程可能同时保存检查点，索引的读-改-写由锁文件串行化
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+LOCK_SUFFIX = ".lock"
+
+# 各智能体需要记录的超参数
+HYPERPARAMETER_NAMES = ('learning_rate', 'discount_factor', 'epsilon', 'epsilon_decay', 'exploration_constant')
+
+
+def file_info(path):
+    """计算文件的SHA-256哈希和大小"""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(block)
+    return {'file': os.path.basename(path), 'sha256': sha256.hexdigest(), 'size': os.path.getsize(path)}
+
+
+def performance_elo(wins, losses, draws, base=1500):
+    """根据对局结果计算相对于对手的表现Elo分"""
+    total = wins + losses + draws
+    if total == 0:
+        return base
+
+    # 限制得分范围，避免全胜/全负时分数发散
+    score = min(max((wins + 0.5 * draws) / total, 0.01), 0.99)
+    return round(base + 400 * math.log10(score / (1 - score)), 1)
+
+
+def compute_metrics(agent1_wins, agent2_wins, draws):
+    """根据胜负统计生成主要指标"""
+    total = agent1_wins + agent2_wins + draws
+    return {
+        'total_games': total,
+        'agent1_wins': agent1_wins,
+        'agent2_wins': agent2_wins,
+        'draws': draws,
+        'agent1_win_rate': agent1_wins / total if total else 0.0,
+        'agent2_win_rate': agent2_wins / total if total else 0.0,
+        'draw_rate': draws / total if total else 0.0,
+        'agent1_elo': performance_elo(agent1_wins, agent2_wins, draws),
+        'agent2_elo': performance_elo(agent2_wins, agent1_wins, draws),
+    }
+
+
+def describe_agent(agent):
+    """提取智能体的算法名称和超参数"""
+    return {
+        'name': agent.name,
+        'algorithm': type(agent).__name__,
+        'hyperparameters': {name: getattr(agent, name) for name in HYPERPARAMETER_NAMES if hasattr(agent, name)},
+    }
+
+
+class IndexLock:
+    """跨进程的索引锁：以独占方式创建锁文件，释放时删除
+
+    持有者异常退出时锁文件会残留，超过 stale_after 秒的锁文件视为残留并清除
+    """
+
+    def __init__(self, path, timeout=10.0, stale_after=30.0):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+
+    def __enter__(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return self
+            except FileExistsError:
+                pass
+
+            try:
+                if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                    os.remove(self.path)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"等待索引锁超时: {self.path}")
+            time.sleep(0.01)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class ModelRegistry:
+    """模型检查点索引"""
+
+    def __init__(self, model_dir="ai_models"):
+        self.model_dir = model_dir
+        self.index_path = os.path.join(model_dir, INDEX_FILE)
+        self.index = self.load_index()
+
+    def lock(self):
+        """索引的跨进程锁"""
+        os.makedirs(self.model_dir, exist_ok=True)
+        return IndexLock(self.index_path + LOCK_SUFFIX)
+
+    def empty_index(self):
+        """创建空索引"""
+        return {'version': INDEX_VERSION, 'checkpoints': {}, 'runs': {},
+                'latest': None, 'best_by_elo': {'agent1': None, 'agent2': None}}
+
+    def read_index(self):
+        """读取索引文件；不存在或版本不符时返回 None"""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                return index
+        return None
+
+    def load_index(self):
+        """加载索引；目录中已有模型但没有索引时，扫描一次建立索引"""
+        index = self.read_index()
+        if index is not None or not os.path.isdir(self.model_dir):
+            return index if index is not None else self.empty_index()
+
+        with self.lock():
+            # 等锁期间其他进程可能已经建好索引
+            index = self.read_index()
+            return index if index is not None else self.scan()
+
+    def save_index(self):
+        """原子地写入索引文件"""
+        os.makedirs(self.model_dir, exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def model_path(self, entry, role):
+        """获取检查点中某个文件的完整路径（role: agent1/agent2/stats）"""
+        return os.path.join(self.model_dir, entry['files'][role]['file'])
+
+    def register(self, prefix, trainer, run_id=None):
+        """登记训练器刚保存的检查点"""
+        stats = trainer.training_stats
+        entry = {
+            'prefix': prefix,
+            'run': run_id or getattr(trainer, 'run_id', 'default'),
+            'episodes': len(stats['episodes']),
+            'created': time.time(),
+            'agents': {'agent1': describe_agent(trainer.agent1), 'agent2': describe_agent(trainer.agent2)},
+            'files': self.collect_files(prefix),
+            'metrics': compute_metrics(trainer.agent1.win_count, trainer.agent2.win_count, trainer.agent1.draw_count),
+        }
+        with self.lock():
+            # 在锁内重新读取，保留其他进程在此期间登记的检查点
+            index = self.read_index()
+            self.index = index if index is not None else self.scan()
+            self.add_entry(entry)
+            self.save_index()
+        return entry
+
+    def collect_files(self, prefix):
+        """收集检查点的文件信息"""
+        files = {}
+        for role, suffix in (('agent1', '_agent1.pkl'), ('agent2', '_agent2.pkl'), ('stats', '_stats.json')):
+            path = os.path.join(self.model_dir, prefix + suffix)
+            if os.path.exists(path):
+                files[role] = file_info(path)
+        return files
+
+    def add_entry(self, entry):
+        """加入索引并更新各查询指针"""
+        prefix = entry['prefix']
+        old_entry = self.index['checkpoints'].get(prefix)
+        if old_entry is not None and prefix in self.index['runs'].get(old_entry['run'], []):
+            self.index['runs'][old_entry['run']].remove(prefix)
+
+        self.index['checkpoints'][prefix] = entry
+        self.index['runs'].setdefault(entry['run'], []).append(prefix)
+
+        latest = self.latest()
+        if latest is None or latest['prefix'] == prefix or entry['created'] >= latest['created']:
+            self.index['latest'] = prefix
+
+        for role in ('agent1', 'agent2'):
+            key = f'{role}_elo'
+            best = self.best_by_elo(role)
+            if best is not None and best['prefix'] == prefix:
+                # 覆盖了当前的最佳检查点，新的Elo可能更低，在所有检查点中重新选出最佳
+                best = max(self.index['checkpoints'].values(), key=lambda checkpoint: checkpoint['metrics'][key])
+                self.index['best_by_elo'][role] = best['prefix']
+            elif best is None or entry['metrics'][key] > best['metrics'][key]:
+                self.index['best_by_elo'][role] = prefix
+
+    def rebuild(self):
+        """扫描模型目录重建索引（用于没有索引的旧模型目录）"""
+        with self.lock():
+            return self.scan()
+
+    def scan(self):
+        """扫描模型目录建立索引并保存（调用方需持有索引锁）"""
+        self.index = self.empty_index()
+        stats_files = sorted(f for f in os.listdir(self.model_dir) if f.endswith('_stats.json'))
+
+        for stats_file in stats_files:
+            prefix = stats_file[:-len('_stats.json')]
+            stats_path = os.path.join(self.model_dir, stats_file)
+            with open(stats_path, 'r') as f:
+                stats = json.load(f)
+
+            last = lambda key: stats[key][-1] if stats.get(key) else 0
+            entry = {
+                'prefix': prefix,
+                'run': 'legacy',
+                'episodes': len(stats.get('episodes', [])),
+                'created': os.path.getmtime(stats_path),
+                'agents': {},
+                'files': self.collect_files(prefix),
+                'metrics': compute_metrics(last('agent1_wins'), last('agent2_wins'), last('draws')),
+            }
+            self.add_entry(entry)
+
+        self.save_index()
+        return self.index
+
+    def get(self, prefix):
+        """按前缀获取检查点"""
+        return self.index['checkpoints'].get(prefix)
+
+    def latest(self):
+        """最新的检查点"""
+        return self.get(self.index['latest']) if self.index['latest'] else None
+
+    def best_by_elo(self, role='agent1'):
+        """指定智能体Elo分最高的检查点"""
+        prefix = self.index['best_by_elo'].get(role)
+        return self.get(prefix) if prefix else None
+
+    def by_run(self, run_id):
+        """某次训练产生的所有检查点（按保存顺序）"""
+        return [self.index['checkpoints'][prefix] for prefix in self.index['runs'].get(run_id, [])]
+
+    def entries(self):
+        """所有检查点"""
+        return list(self.index['checkpoints'].values())
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+离线批量训练
+从对局日志（game_records）按块流式读取对局，用 NumPy 向量化地展开为
+(状态编号, 格子, 奖励, 后继状态编号, 是否结束) 样本，批量更新Q学习或蒙特卡洛智能体。
+内存占用只与块大小有关，支持多遍训练和打乱对局顺序，
+可以直接复用联赛、对战界面和线上对局留下的日志而不必重新生成对局
+"""
+
+import argparse
+import os
+import time
+import numpy as np
+from ai_trainer import QLearningAgent, MonteCarloAgent, evaluate_agent, POWERS_OF_THREE
+from game_records import GameLogReader, RESULT_DRAW, RESULT_UNFINISHED
+from random_streams import RandomStream
+
+ALGORITHMS = ('q', 'mc')
+SIDES = {'x': 1, 'o': -1}
+
+
+def expand_chunk(moves, results):
+    """把一块对局展开为逐步样本（跳过未结束的对局）
+
+    与在线训练一致：奖励只在获胜的最后一步为1，其余为0。
+    返回字典：before/after 为落子前后的状态编号，cell 为格子编号，
+    player 为落子方（1=X, -1=O），reward 为即时奖励，done 为是否是最后一步
+    """
+    finished = results != RESULT_UNFINISHED
+    moves, results = moves[finished], results[finished]
+
+    valid = moves >= 0
+    steps = np.arange(9)
+    digits = np.where(steps % 2 == 0, 1, 2)
+    cells = np.where(valid, moves, 0).astype(np.int64)
+    increments = np.where(valid, digits * POWERS_OF_THREE[cells], 0)
+    after = np.cumsum(increments, axis=1)
+    before = after - increments
+
+    lengths = valid.sum(axis=1)
+    done = steps == (lengths - 1)[:, None]
+    reward = (done & (results != RESULT_DRAW)[:, None]).astype(np.float64)
+
+    return {
+        'before': before[valid],
+        'after': after[valid],
+        'cell': cells[valid],
+        'player': np.broadcast_to(np.where(steps % 2 == 0, 1, -1), moves.shape)[valid],
+        'reward': reward[valid],
+        'done': done[valid],
+    }
+
+
+def q_learning_batch(q_array, samples, learning_rate, discount_factor):
+    """对稠密Q值数组做一次批量TD更新（原地修改）
+
+    目标值与 QLearningAgent.update_q_value 相同：结束时为奖励，否则为
+    奖励 + 折扣 * 后继状态合法动作的最大Q值。同一状态-动作在一批中出现 n 次时，
+    按目标均值一次完成相当于 n 次学习率为 learning_rate 的更新
+    """
+    if not len(samples['cell']):
+        return
+
+    after = samples['after']
+    legal = (after[:, None] // POWERS_OF_THREE) % 3 == 0
+    next_q = np.where(legal, q_array[after], -np.inf).max(axis=1)
+    next_q[~legal.any(axis=1)] = 0.0
+    targets = np.where(samples['done'], samples['reward'], samples['reward'] + discount_factor * next_q)
+
+    flat_q = q_array.reshape(-1)
+    flat = samples['before'] * 9 + samples['cell']
+    unique, inverse = np.unique(flat, return_inverse=True)
+    sample_counts = np.bincount(inverse)
+    mean_targets = np.bincount(inverse, weights=targets) / sample_counts
+    step = 1.0 - (1.0 - learning_rate) ** sample_counts
+    flat_q[unique] += step * (mean_targets - flat_q[unique])
+
+
+class OfflineTrainer:
+    """离线训练器
+
+    agent 为 QLearningAgent 时只学习 side 一方（1=X, -1=O）的落子；
+    为 MonteCarloAgent 时与在线训练相同，双方的每一步都计入平均回报
+    """
+
+    def __init__(self, agent, side=1, chunk_size=1 << 16, seed=None):
+        self.agent = agent
+        self.side = side
+        self.chunk_size = chunk_size
+        self.rng = RandomStream(seed)
+
+    def train(self, paths, passes=1, shuffle=True):
+        """对日志文件 paths 训练 passes 遍，返回统计信息"""
+        if isinstance(paths, str):
+            paths = [paths]
+        readers = [GameLogReader(path) for path in paths]
+        is_q = hasattr(self.agent, 'to_q_array')
+        q_array = self.agent.to_q_array() if is_q else None
+
+        start_time = time.time()
+        games = samples = 0
+        for _ in range(passes):
+            order = self.rng.generator.permutation(len(readers)) if shuffle else range(len(readers))
+            for reader_index in order:
+                rng = self.rng.generator if shuffle else None
+                for moves, results in readers[reader_index].iter_chunks(self.chunk_size, rng=rng):
+                    batch = expand_chunk(moves, results)
+                    games += int((results != RESULT_UNFINISHED).sum())
+                    if is_q:
+                        mine = batch['player'] == self.side
+                        batch = {key: values[mine] for key, values in batch.items()}
+                        q_learning_batch(q_array, batch, self.agent.learning_rate, self.agent.discount_factor)
+                    else:
+                        self.agent.update_batch(batch['before'], batch['cell'], batch['reward'])
+                    samples += len(batch['cell'])
+
+        if is_q:
+            self.agent.load_q_array(q_array)
+
+        return {
+            'games': games,
+            'samples': samples,
+            'passes': passes,
+            'elapsed': time.time() - start_time,
+        }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="从对局日志离线训练智能体")
+    parser.add_argument('logs', nargs='+', help="对局日志文件（.tttg）")
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='q', help="q=Q学习, mc=蒙特卡洛")
+    parser.add_argument('--side', choices=sorted(SIDES), default='x', help="Q学习智能体执棋方")
+    parser.add_argument('--passes', type=int, default=1, help="训练遍数")
+    parser.add_argument('--chunk-size', type=int, default=1 << 16, help="每块对局数")
+    parser.add_argument('--no-shuffle', action='store_true', help="按日志中的顺序训练")
+    parser.add_argument('--init', default=None, help="从已有模型继续训练")
+    parser.add_argument('--output', default=None, help="模型保存路径")
+    parser.add_argument('--eval-games', type=int, default=1000, help="训练后对随机对手的评估局数")
+    parser.add_argument('--seed', type=int, default=None, help="随机种子")
+    args = parser.parse_args()
+
+    side = SIDES[args.side] if args.algorithm == 'q' else 1
+    agent = QLearningAgent("QLearning_offline") if args.algorithm == 'q' else MonteCarloAgent("MonteCarlo_offline")
+    if args.init:
+        agent.load_model(args.init)
+
+    trainer = OfflineTrainer(agent, side, args.chunk_size, args.seed)
+    stats = trainer.train(args.logs, args.passes, shuffle=not args.no_shuffle)
+    print(f"训练 {stats['passes']} 遍: {stats['games']} 局, {stats['samples']} 个样本, "
+          f"耗时 {stats['elapsed']:.2f} 秒 ({stats['samples'] / max(stats['elapsed'], 1e-9):.0f} 样本/秒)")
+
+    if args.eval_games:
+        for player, label in ((1, 'X'), (-1, 'O')):
+            if args.algorithm == 'q' and player != side:
+                continue
+            result = evaluate_agent(agent, player, args.eval_games, rng=RandomStream(args.seed))
+            print(f"执{label}对随机对手: 胜 {result['wins']} / 负 {result['losses']} / 平 {result['draws']}"
+                  f"  得分 {result['score']:.3f}")
+
+    output = args.output or os.path.join("ai_models", f"offline_{args.algorithm}_agent.pkl")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    agent.save_model(output)
+    print(f"模型已保存到 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,8 @@
 简化版AI智能体训练，适合快速测试
 """
 
-import numpy as np
-import random
 import time
-from collections import defaultdict
-from ai_trainer import TicTacToeGame, QLearningAgent, MonteCarloAgent, AITrainer
+from ai_trainer import AITrainer
 
 def quick_train():
     """快速训练AI智能体"""
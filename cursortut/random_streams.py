@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可复现的随机数流
+基于 numpy.random.Generator，按块预先生成随机数供探索判断和并列打破使用；
+通过 SeedSequence 为每个工作进程/智能体派生相互独立的随机数流
+"""
+
+import itertools
+import numpy as np
+
+# 每次预先生成的随机数个数
+DEFAULT_BLOCK_SIZE = 4096
+
+
+class RandomStream:
+    """按块预取的随机数流"""
+
+    def __init__(self, seed=None, block_size=DEFAULT_BLOCK_SIZE):
+        # seed 可以是整数、SeedSequence 或 None（使用系统熵）
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.generator = np.random.default_rng(self.seed_sequence)
+        self.block_size = block_size
+        # random() 直接绑定到预取序列的 __next__，每次调用都不经过Python层函数。
+        # 每次约 45 纳秒，比逐次调用 Generator.random()（约 480 纳秒）便宜一个数量级，
+        # 但仍略慢于C实现的 random.random（约 30 纳秒）；换来的是可复现、相互独立的流。
+        # 默认训练每回合约抽取 8 次，多出的约 0.1 微秒相对每回合约 110 微秒的训练可以忽略。
+        # 按块预先比较出布尔型探索判断也只能省掉一次浮点比较，且 epsilon 每回合衰减，块内判断会过期，因此不采用
+        self.random = itertools.chain.from_iterable(self._blocks()).__next__
+
+    def _blocks(self):
+        """逐块预先生成 [0, 1) 均匀随机数"""
+        while True:
+            yield self.generator.random(self.block_size).tolist()
+
+    def __getstate__(self):
+        """序列化时只保存生成器状态，当前块中尚未使用的随机数被丢弃，恢复后从下一块继续"""
+        return {'seed_sequence': self.seed_sequence, 'block_size': self.block_size,
+                'bit_generator': self.generator.bit_generator.state}
+
+    def __setstate__(self, state):
+        self.__init__(state['seed_sequence'], state['block_size'])
+        self.generator.bit_generator.state = state['bit_generator']
+
+    def choice(self, seq):
+        """从序列中等概率选取一个元素"""
+        return seq[int(self.random() * len(seq))]
+
+    def weighted_index(self, weights):
+        """按权重抽取一个位置"""
+        threshold = self.random() * sum(weights)
+        cumulative = 0.0
+        for index, weight in enumerate(weights):
+            cumulative += weight
+            if threshold < cumulative:
+                return index
+        return len(weights) - 1
+
+    def spawn(self, count):
+        """派生 count 个相互独立的子随机数流"""
+        return [RandomStream(child, self.block_size) for child in self.seed_sequence.spawn(count)]
+
+
+def spawn_streams(seed, count):
+    """为 count 个工作进程派生独立的随机数流（相同种子和数量时结果完全可复现）"""
+    return RandomStream(seed).spawn(count)
+
+
+# 未指定随机数流时使用的全局默认流
+_default_stream = None
+
+
+def default_stream():
+    """获取全局默认随机数流"""
+    global _default_stream
+    if _default_stream is None:
+        _default_stream = RandomStream()
+    return _default_stream
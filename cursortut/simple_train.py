@@ -5,11 +5,8 @@
 去除emoji，避免编码问题
 """
 
-import numpy as np
-import random
 import time
-from collections import defaultdict
-from ai_trainer import TicTacToeGame, QLearningAgent, MonteCarloAgent, AITrainer
+from ai_trainer import AITrainer
 
 def quick_train():
     """快速训练AI智能体"""
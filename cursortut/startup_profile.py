@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析与基准测试
+为每个入口生成导入耗时报告，并按时间预算检查各GUI和脚本的启动速度
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# 脚本所在目录，所有入口都从这里启动
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 入口模块 -> GUI主类（脚本类入口为None）
+ENTRY_POINTS = {
+    'launcher': 'GameLauncher',
+    'ai_launcher': 'AITrainingLauncher',
+    'ai_battle_gui': 'AIBattleGUI',
+    'tic_tac_toe_gui': 'TicTacToeGUI',
+    'tic_tac_toe_enhanced': 'EnhancedTicTacToeGUI',
+    'tic_tac_toe': None,
+    'ai_trainer': None,
+    'quick_train': None,
+    'simple_train': None,
+}
+
+# 启动时间预算（毫秒），包含解释器自身的启动时间
+STARTUP_BUDGETS_MS = {
+    'launcher': 400,
+    'ai_launcher': 400,
+    'ai_battle_gui': 900,
+    'tic_tac_toe_gui': 600,
+    'tic_tac_toe_enhanced': 600,
+    'tic_tac_toe': 150,
+    'ai_trainer': 500,
+    'quick_train': 500,
+    'simple_train': 500,
+}
+
+
+def has_display():
+    """检查当前环境是否可以创建窗口"""
+    if os.name == 'nt' or sys.platform == 'darwin':
+        return True
+    return bool(os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+
+def build_startup_code(module, launch_window):
+    """生成在子进程中执行的启动代码"""
+    code = f"import {module}"
+    gui_class = ENTRY_POINTS.get(module)
+    if launch_window and gui_class:
+        # 创建主窗口并完成首帧绘制后立即销毁
+        code += (f"\napp = {module}.{gui_class}()"
+                 f"\napp.root.update()"
+                 f"\napp.root.destroy()")
+    return code
+
+
+def profile_imports(module, top=15):
+    """使用 -X importtime 统计入口模块的导入耗时"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+                            cwd=BASE_DIR, capture_output=True, text=True)
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+
+        self_us, cumulative_us, name = parts
+        entries.append({
+            'module': name.strip(),
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+
+    entries.sort(key=lambda e: e['cumulative_ms'], reverse=True)
+    total_ms = next((e['cumulative_ms'] for e in entries if e['module'] == module), 0.0)
+    return {
+        'entry_point': module,
+        'ok': result.returncode == 0,
+        'error': result.stderr.strip().splitlines()[-1] if result.returncode != 0 else None,
+        'total_ms': total_ms,
+        'top_imports': entries[:top],
+    }
+
+
+def measure_startup(module, repeat=5, launch_window=None):
+    """测量启动一个入口所需的时间（取中位数，单位毫秒）"""
+    if launch_window is None:
+        launch_window = has_display()
+
+    code = build_startup_code(module, launch_window)
+    samples = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code],
+                                cwd=BASE_DIR, capture_output=True, text=True)
+        elapsed = (time.perf_counter() - start_time) * 1000
+
+        if result.returncode != 0:
+            return {
+                'entry_point': module,
+                'ok': False,
+                'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else '未知错误',
+            }
+        samples.append(elapsed)
+
+    samples.sort()
+    median_ms = samples[len(samples) // 2]
+    budget_ms = STARTUP_BUDGETS_MS.get(module)
+    return {
+        'entry_point': module,
+        'ok': True,
+        'window': bool(launch_window and ENTRY_POINTS.get(module)),
+        'median_ms': round(median_ms, 1),
+        'min_ms': round(samples[0], 1),
+        'budget_ms': budget_ms,
+        'within_budget': budget_ms is None or median_ms <= budget_ms,
+    }
+
+
+def print_import_report(report):
+    """打印导入耗时报告"""
+    print(f"\n[{report['entry_point']}] 导入总耗时: {report['total_ms']:.1f} ms")
+    if not report['ok']:
+        print(f"  导入失败: {report['error']}")
+        return
+
+    print(f"  {'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    for entry in report['top_imports']:
+        print(f"  {entry['cumulative_ms']:>10.1f} {entry['self_ms']:>10.1f}  {entry['module']}")
+
+
+def print_benchmark(results):
+    """打印启动基准测试结果"""
+    print(f"\n{'入口':<22}{'中位数(ms)':>12}{'预算(ms)':>10}  结果")
+    print("-" * 56)
+    for result in results:
+        if not result['ok']:
+            print(f"{result['entry_point']:<22}{'-':>12}{'-':>10}  启动失败: {result['error']}")
+            continue
+
+        status = "通过" if result['within_budget'] else "超出预算"
+        budget = result['budget_ms'] if result['budget_ms'] is not None else '-'
+        print(f"{result['entry_point']:<22}{result['median_ms']:>12.1f}{budget:>10}  {status}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="入口启动耗时分析与基准测试")
+    parser.add_argument('entry_points', nargs='*', help="要检查的入口模块（默认全部）")
+    parser.add_argument('--report', action='store_true', help="输出导入耗时报告")
+    parser.add_argument('--repeat', type=int, default=5, help="每个入口的启动次数")
+    parser.add_argument('--no-window', action='store_true', help="只测量导入，不创建窗口")
+    parser.add_argument('--json', action='store_true', help="以JSON格式输出结果")
+    args = parser.parse_args()
+
+    modules = args.entry_points or list(ENTRY_POINTS)
+    launch_window = False if args.no_window else None
+
+    reports = [profile_imports(module) for module in modules] if args.report else []
+    results = [measure_startup(module, args.repeat, launch_window) for module in modules]
+
+    if args.json:
+        print(json.dumps({'imports': reports, 'startup': results}, ensure_ascii=False, indent=2))
+    else:
+        for report in reports:
+            print_import_report(report)
+        print_benchmark(results)
+
+    # 任何入口启动失败或超出预算都返回非零退出码，便于在CI中使用
+    if not all(r['ok'] and r['within_budget'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+状态图缓存
+一次性枚举 m×n 棋盘、k 子连线（井字棋为 3,3,3）的全部可达局面，
+保存局面编号、CSR 形式的后继数组、终局结果和对称规范编号，
+写成带版本号的二进制文件，之后用 numpy.memmap 只读打开，不必再通过对局重新发现局面。
+
+局面编号沿用三进制编码（第 i 格的数字乘以 3**i，空=0, X=1, O=2），井字棋中与
+ai_trainer.state_index 相同；文件中的局面按编号升序排列，局面序号可用二分查找得到。
+枚举按落子数逐层进行，每层整体向量化地判定胜负并展开后继
+"""
+
+import argparse
+import os
+import struct
+import time
+import numpy as np
+from game_rules import ONGOING, X_WINS, O_WINS, DRAW
+
+GRAPH_MAGIC = b'TTTS'
+GRAPH_VERSION = 1
+GRAPH_EXTENSION = '.ttts'
+
+# 文件头：魔数、版本、行数、列数、连子数、局面数、边数，补齐到64字节
+HEADER_FORMAT = '<4sHBBBxQQ'
+HEADER_SIZE = 64
+
+# 三进制编号用 int64 保存，格子数不能超过39
+MAX_CELLS = 39
+# 每次向量化处理的局面数，限制枚举大棋盘时的内存占用
+CHUNK_SIZE = 1 << 18
+
+
+def win_lines(rows, cols, k):
+    """所有长度为 k 的横、竖、斜连线（格子编号 row * cols + col），形状 (线数, k)"""
+    lines = []
+    for row in range(rows):
+        for col in range(cols):
+            for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_row, end_col = row + d_row * (k - 1), col + d_col * (k - 1)
+                if 0 <= end_row < rows and 0 <= end_col < cols:
+                    lines.append([(row + d_row * i) * cols + col + d_col * i for i in range(k)])
+    return np.array(lines, dtype=np.int64).reshape(-1, k)
+
+
+def board_symmetries(rows, cols):
+    """棋盘的对称变换（正方形8种，长方形4种），变换后第 i 格取原棋盘第 perm[i] 格"""
+    grid = np.arange(rows * cols).reshape(rows, cols)
+    if rows == cols:
+        perms = [np.rot90(grid, turns) for turns in range(4)] + [np.rot90(grid.T, turns) for turns in range(4)]
+    else:
+        perms = [grid, grid[::-1], grid[:, ::-1], grid[::-1, ::-1]]
+    return np.array([perm.ravel() for perm in perms], dtype=np.int64)
+
+
+class GraphBuilder:
+    """逐层枚举状态图"""
+
+    def __init__(self, rows=3, cols=3, k=3):
+        if rows * cols > MAX_CELLS:
+            raise ValueError(f"棋盘过大: {rows}x{cols} 超过 {MAX_CELLS} 格")
+        if k > max(rows, cols):
+            raise ValueError(f"连子数 {k} 超过棋盘边长")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = rows * cols
+        self.powers = 3 ** np.arange(self.cells, dtype=np.int64)
+        self.lines = win_lines(rows, cols, k)
+        self.symmetries = board_symmetries(rows, cols)
+
+    def digits(self, states):
+        """(局面数, 格子数) 的各格数字"""
+        return ((states[:, None] // self.powers) % 3).astype(np.int8)
+
+    def outcomes(self, digits):
+        """各局面的结果（ONGOING/X_WINS/O_WINS/DRAW）"""
+        on_lines = digits[:, self.lines]
+        x_wins = (on_lines == 1).all(axis=2).any(axis=1)
+        o_wins = (on_lines == 2).all(axis=2).any(axis=1)
+        full = (digits != 0).all(axis=1)
+        return np.select([x_wins, o_wins, full], [X_WINS, O_WINS, DRAW], ONGOING).astype(np.uint8)
+
+    def canonical(self, digits):
+        """各局面在所有对称变换下的最小编号"""
+        return (digits[:, self.symmetries] @ self.powers).min(axis=1)
+
+    def build(self):
+        """枚举全部可达局面，返回各数组组成的字典（局面按编号升序）"""
+        levels = []
+        level = np.zeros(1, dtype=np.int64)
+        depth = 0
+        while len(level):
+            digit = 1 if depth % 2 == 0 else 2
+            outcome_parts, canonical_parts, children_parts = [], [], []
+            for start in range(0, len(level), CHUNK_SIZE):
+                states = level[start:start + CHUNK_SIZE]
+                digits = self.digits(states)
+                outcome = self.outcomes(digits)
+                outcome_parts.append(outcome)
+                canonical_parts.append(self.canonical(digits))
+                # 只有未结束的局面有后继
+                empty = (digits == 0) & (outcome == ONGOING)[:, None]
+                rows, cells = np.nonzero(empty)
+                children_parts.append(states[rows] + digit * self.powers[cells])
+            levels.append((level, np.concatenate(outcome_parts), np.concatenate(canonical_parts)))
+            level = np.unique(np.concatenate(children_parts))
+            depth += 1
+
+        states = np.concatenate([level_states for level_states, _, _ in levels])
+        order = np.argsort(states, kind='stable')
+        states = states[order]
+        outcome = np.concatenate([outcome for _, outcome, _ in levels])[order]
+        canonical = np.concatenate([canonical for _, _, canonical in levels])[order]
+        depth = np.concatenate([np.full(len(level_states), d, dtype=np.uint8)
+                                for d, (level_states, _, _) in enumerate(levels)])[order]
+
+        # CSR 后继：按局面顺序、格子编号升序
+        offsets = np.zeros(len(states) + 1, dtype=np.int64)
+        successor_parts, cell_parts = [], []
+        for start in range(0, len(states), CHUNK_SIZE):
+            chunk = slice(start, start + CHUNK_SIZE)
+            digits = self.digits(states[chunk])
+            empty = (digits == 0) & (outcome[chunk] == ONGOING)[:, None]
+            rows, cells = np.nonzero(empty)
+            mover = np.where(depth[chunk] % 2 == 0, 1, 2)
+            children = states[chunk][rows] + mover[rows] * self.powers[cells]
+            successor_parts.append(np.searchsorted(states, children).astype(np.int32))
+            cell_parts.append(cells.astype(np.uint8))
+            offsets[start + 1:start + 1 + len(digits)] = empty.sum(axis=1)
+        np.cumsum(offsets, out=offsets)
+
+        return {
+            'states': states,
+            'outcome': outcome,
+            'depth': depth,
+            'canonical': np.searchsorted(states, canonical).astype(np.int32),
+            'offsets': offsets,
+            'successors': np.concatenate(successor_parts),
+            'successor_cells': np.concatenate(cell_parts),
+        }
+
+
+def sections(num_states, num_edges):
+    """文件中各数组的 (名称, 类型, 长度)，按此顺序依次存放，每段按8字节对齐"""
+    return (
+        ('states', '<i8', num_states),
+        ('offsets', '<i8', num_states + 1),
+        ('successors', '<i4', num_edges),
+        ('canonical', '<i4', num_states),
+        ('outcome', 'u1', num_states),
+        ('depth', 'u1', num_states),
+        ('successor_cells', 'u1', num_edges),
+    )
+
+
+def section_offsets(num_states, num_edges):
+    """各数组在文件中的起始位置，以及文件总长度"""
+    positions = {}
+    position = HEADER_SIZE
+    for name, dtype, length in sections(num_states, num_edges):
+        positions[name] = position
+        position += -(-np.dtype(dtype).itemsize * length // 8) * 8
+    return positions, position
+
+
+def write_graph(arrays, path, rows, cols, k):
+    """把状态图写成二进制文件（先写临时文件再替换）"""
+    num_states, num_edges = len(arrays['states']), len(arrays['successors'])
+    positions, total_size = section_offsets(num_states, num_edges)
+    header = struct.pack(HEADER_FORMAT, GRAPH_MAGIC, GRAPH_VERSION, rows, cols, k, num_states, num_edges)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b'\0'))
+        for name, dtype, _ in sections(num_states, num_edges):
+            f.seek(positions[name])
+            f.write(np.ascontiguousarray(arrays[name], dtype=dtype).tobytes())
+        f.truncate(total_size)
+    os.replace(tmp_path, path)
+    return path
+
+
+class StateGraph:
+    """只读映射的状态图
+
+    states: 局面编号（升序）；outcome: 结果；depth: 已落子数；canonical: 对称规范局面的序号；
+    offsets/successors/successor_cells: CSR 后继，局面 i 的后继序号为
+    successors[offsets[i]:offsets[i + 1]]，对应落子格子为 successor_cells 的同一范围
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            data = f.read(HEADER_SIZE)
+        if len(data) < HEADER_SIZE:
+            raise ValueError("状态图文件过短，缺少文件头")
+        magic, version, self.rows, self.cols, self.k, num_states, num_edges = struct.unpack_from(HEADER_FORMAT, data)
+        if magic != GRAPH_MAGIC:
+            raise ValueError(f"不是状态图文件: 魔数 {magic!r}")
+        if version != GRAPH_VERSION:
+            raise ValueError(f"不支持的状态图版本: {version}")
+
+        positions, total_size = section_offsets(num_states, num_edges)
+        if os.path.getsize(path) != total_size:
+            raise ValueError(f"状态图文件大小不符: 应为 {total_size} 字节")
+        for name, dtype, length in sections(num_states, num_edges):
+            array = (np.memmap(path, dtype=dtype, mode='r', offset=positions[name], shape=(length,))
+                     if length else np.zeros(0, dtype=dtype))
+            setattr(self, name, array)
+
+    def __len__(self):
+        return len(self.states)
+
+    @property
+    def num_edges(self):
+        return len(self.successors)
+
+    def index_of(self, states):
+        """局面编号 -> 局面序号（二分查找；编号必须是可达局面）"""
+        return np.searchsorted(self.states, states)
+
+    def successors_of(self, ids):
+        """展开一组局面的全部后继，返回 (所属局面在 ids 中的位置, 后继序号, 落子格子)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        starts = self.offsets[ids]
+        counts = self.offsets[ids + 1] - starts
+        owner = np.repeat(np.arange(len(ids)), counts)
+        edges = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        return owner, self.successors[edges].astype(np.int64), self.successor_cells[edges]
+
+
+def graph_path_for(rows, cols, k, directory="ai_models"):
+    """状态图缓存文件的默认路径"""
+    return os.path.join(directory, f"state_graph_{rows}x{cols}_k{k}{GRAPH_EXTENSION}")
+
+
+def build_graph(rows=3, cols=3, k=3, path=None):
+    """枚举状态图并写入文件，返回文件路径"""
+    path = path or graph_path_for(rows, cols, k)
+    return write_graph(GraphBuilder(rows, cols, k).build(), path, rows, cols, k)
+
+
+def load_graph(rows=3, cols=3, k=3, path=None):
+    """打开状态图缓存；文件不存在或版本不符时先重新枚举"""
+    path = path or graph_path_for(rows, cols, k)
+    try:
+        return StateGraph(path)
+    except (OSError, ValueError):
+        build_graph(rows, cols, k, path)
+        return StateGraph(path)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="枚举并缓存 m,n,k 棋盘的状态图")
+    parser.add_argument('--rows', type=int, default=3, help="行数")
+    parser.add_argument('--cols', type=int, default=3, help="列数")
+    parser.add_argument('-k', type=int, default=3, help="获胜所需连子数")
+    parser.add_argument('--output', default=None, help="输出路径（默认 ai_models/state_graph_<m>x<n>_k<k>.ttts）")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    path = build_graph(args.rows, args.cols, args.k, args.output)
+    build_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    graph = StateGraph(path)
+    open_time = time.perf_counter() - start_time
+
+    terminal = np.bincount(graph.outcome, minlength=4)
+    print(f"{graph.rows}x{graph.cols} 棋盘 {graph.k} 子连线: {len(graph)} 个局面, {graph.num_edges} 条边, "
+          f"{len(np.unique(graph.canonical))} 个对称类")
+    print(f"终局: X胜 {terminal[X_WINS]} / O胜 {terminal[O_WINS]} / 平局 {terminal[DRAW]}")
+    print(f"枚举 {build_time:.2f} 秒, 打开 {open_time * 1e6:.0f} 微秒, 文件 {os.path.getsize(path)} 字节 -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+终端渲染器
+用ANSI光标控制只重绘与上一帧不同的部分，每帧合并为一次写入；
+输出不是终端（如被重定向或在测试中被捕获）时退化为直接输出整帧文本，
+不再为清屏启动子进程
+"""
+
+import os
+import sys
+import unicodedata
+
+CSI = '\x1b['
+CLEAR_SCREEN = CSI + 'H' + CSI + '2J'
+CLEAR_TO_END_OF_LINE = CSI + 'K'
+CLEAR_TO_END_OF_SCREEN = CSI + 'J'
+
+
+def display_width(text):
+    """文本在终端中占用的列数（中文等全角字符占两列）"""
+    return sum(2 if unicodedata.east_asian_width(char) in ('W', 'F') else 1 for char in text)
+
+
+def enable_windows_ansi(stream):
+    """在Windows控制台中开启ANSI转义序列支持，成功返回 True"""
+    try:
+        import ctypes
+        import msvcrt
+        kernel32 = ctypes.windll.kernel32
+        handle = msvcrt.get_osfhandle(stream.fileno())
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except (AttributeError, OSError, ValueError, ImportError):
+        return False
+
+
+def supports_ansi(stream):
+    """输出流是否是支持ANSI转义序列的终端"""
+    try:
+        if not stream.isatty():
+            return False
+    except (AttributeError, ValueError):
+        return False
+    if os.environ.get('TERM') == 'dumb':
+        return False
+    if os.name == 'nt':
+        return enable_windows_ansi(stream)
+    return True
+
+
+class TerminalRenderer:
+    """按行差异重绘的帧渲染器
+
+    一帧是若干行文本。支持ANSI时，第一帧（或清屏后）从屏幕左上角完整绘制，
+    之后每帧只把光标移到变化处改写该行变化的部分；帧下方的提示文字在下一帧时被清除
+    """
+
+    def __init__(self, stream=None, ansi=None):
+        self.stream = stream if stream is not None else sys.stdout
+        self.ansi = supports_ansi(self.stream) if ansi is None else ansi
+        self.previous = None  # 屏幕上当前显示的帧；None 表示需要完整重绘
+
+    def clear(self):
+        """清屏（非终端时不做任何事）"""
+        if self.ansi:
+            self.write(CLEAR_SCREEN)
+        self.previous = None
+
+    def invalidate(self):
+        """屏幕内容已被其他输出破坏，下一帧完整重绘"""
+        self.previous = None
+
+    def render(self, lines):
+        """绘制一帧"""
+        lines = list(lines)
+        if not self.ansi:
+            self.write('\n'.join(lines) + '\n')
+            return
+
+        if self.previous is None or len(self.previous) != len(lines):
+            frame = CLEAR_SCREEN + (CLEAR_TO_END_OF_LINE + '\n').join(lines) + CLEAR_TO_END_OF_LINE
+        else:
+            frame = ''.join(self.diff_line(row, old, new)
+                            for row, (old, new) in enumerate(zip(self.previous, lines)) if old != new)
+
+        # 光标停在帧下方，并清除上一帧之后输出的提示文字
+        frame += f"{CSI}{len(lines) + 1};1H" + CLEAR_TO_END_OF_SCREEN
+        self.write(frame)
+        self.previous = lines
+
+    @staticmethod
+    def diff_line(row, old, new):
+        """改写一行中从第一个不同字符开始的部分"""
+        prefix = 0
+        for old_char, new_char in zip(old, new):
+            if old_char != new_char:
+                break
+            prefix += 1
+        column = display_width(new[:prefix]) + 1
+        return f"{CSI}{row + 1};{column}H" + new[prefix:] + CLEAR_TO_END_OF_LINE
+
+    def write(self, text):
+        """一次写入并刷新"""
+        self.stream.write(text)
+        self.stream.flush()
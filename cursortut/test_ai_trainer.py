@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+AI训练系统测试脚本
+验证训练器的取消、进度回调等功能，模型文件写入临时目录
+"""
+
+import os
+import pickle
+import tempfile
+import threading
+import numpy as np
+from ai_trainer import (AITrainer, AfterstateAgent, CancellationToken, FrozenAgent, QLearningAgent, MonteCarloAgent,
+                        evaluate_agent, state_index)
+from convergence import ConvergenceMonitor
+from league import LeagueTrainer
+from model_export import load_agent
+from model_registry import ModelRegistry
+from random_streams import RandomStream
+
+
+def run_in_temp_dir(func):
+    """在临时目录中运行测试，避免覆盖 ai_models/ 中的模型"""
+    def wrapper():
+        old_cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.chdir(tmp_dir)
+            try:
+                func()
+            finally:
+                os.chdir(old_cwd)
+    wrapper.__name__ = func.__name__
+    return wrapper
+
+
+@run_in_temp_dir
+def test_progress_callback():
+    """测试进度回调"""
+    print("测试: 进度回调")
+    trainer = AITrainer()
+    snapshots = []
+    completed = trainer.train(250, save_interval=1000, progress_callback=snapshots.append, progress_interval=100)
+
+    print(f"回调次数: {len(snapshots)}")
+    assert completed
+    assert [s['episode'] for s in snapshots] == [100, 200, 250]
+    assert snapshots[-1]['done'] and not snapshots[-1]['cancelled']
+
+
+@run_in_temp_dir
+def test_cancellation():
+    """测试取消训练并保存检查点"""
+    print("测试: 取消训练")
+    trainer = AITrainer()
+    token = CancellationToken()
+
+    def on_progress(snapshot):
+        if snapshot['episode'] >= 50:
+            token.cancel()
+
+    completed = trainer.train(10000, save_interval=1000, cancel_token=token,
+                              progress_callback=on_progress, progress_interval=50)
+
+    print(f"停止于第 {len(trainer.training_stats['episodes'])} 回合")
+    assert not completed
+    assert len(trainer.training_stats['episodes']) == 50
+    assert os.path.exists("ai_models/models_episode_50_agent1.pkl")
+
+    # 检查点应已登记到模型注册表
+    entry = ModelRegistry("ai_models").latest()
+    assert entry['prefix'] == "models_episode_50"
+    assert entry['episodes'] == 50
+    assert entry['files']['agent1']['size'] == os.path.getsize("ai_models/models_episode_50_agent1.pkl")
+
+
+def test_model_registry():
+    """测试覆盖最佳检查点后重新选出最佳，以及多个写入方并发登记不丢失条目"""
+    print("测试: 模型注册表")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = ModelRegistry(tmp_dir)
+        for prefix, wins in (('a', 9), ('b', 5), ('a', 1)):
+            trainer = AITrainer()
+            trainer.agent1.win_count, trainer.agent2.win_count = wins, 10 - wins
+            registry.register(prefix, trainer)
+        assert registry.best_by_elo('agent1')['prefix'] == 'b'
+        assert registry.best_by_elo('agent2')['prefix'] == 'a'
+
+        def register_many(worker):
+            for i in range(10):
+                ModelRegistry(tmp_dir).register(f"w{worker}_{i}", AITrainer())
+
+        threads = [threading.Thread(target=register_many, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(ModelRegistry(tmp_dir).entries()) == 42
+        assert not os.path.exists(os.path.join(tmp_dir, "index.json.lock"))
+
+
+def test_iter_train():
+    """测试生成器方式训练"""
+    print("测试: 生成器方式训练")
+    trainer = AITrainer()
+    snapshots = list(trainer.iter_train(30, save_interval=1000, progress_interval=10))
+
+    assert [s['episode'] for s in snapshots] == [10, 20, 30]
+    assert snapshots[-1]['agent1_wins'] + snapshots[-1]['agent2_wins'] + snapshots[-1]['draws'] == 30
+
+
+def test_convergence_early_stop():
+    """测试收敛检测：阈值满足时提前结束，否则训练完整的回合数"""
+    print("测试: 收敛后提前结束")
+    trainer = AITrainer(seed=7)
+    monitor = ConvergenceMonitor(window=50, policy_tolerance=1.0, eval_games=20, eval_tolerance=1.0, patience=2)
+    snapshots = list(trainer.iter_train(1000, save_interval=10000, progress_interval=50, monitor=monitor))
+
+    # 第一次检查只记录快照，之后连续两个窗口稳定
+    assert monitor.converged_at == 150 and len(monitor.history) == 3
+    assert snapshots[-1]['episode'] == 150 and snapshots[-1]['converged'] and not snapshots[-1]['cancelled']
+    assert len(monitor.summary()['policy_change']) == 2
+
+    trainer = AITrainer(seed=7)
+    monitor = ConvergenceMonitor(window=50, policy_tolerance=0.0, value_tolerance=0.0, eval_games=0, patience=2)
+    snapshots = list(trainer.iter_train(200, save_interval=10000, progress_interval=50, monitor=monitor))
+    assert not monitor.converged and monitor.summary()['checks'] == 4
+    assert snapshots[-1]['episode'] == 200 and not snapshots[-1]['converged']
+    monitor.print_summary()
+
+
+def test_seed_reproducibility():
+    """测试相同种子的训练结果完全一致"""
+    print("测试: 随机种子可复现")
+    results = []
+    for _ in range(2):
+        trainer = AITrainer(seed=123)
+        list(trainer.iter_train(300, save_interval=1000, progress_interval=300))
+        results.append((trainer.training_stats['agent1_rewards'], trainer.agent1.to_q_array().tobytes()))
+
+    assert results[0] == results[1]
+
+    # 传入的未指定 rng 的智能体也使用由种子派生的流
+    values = []
+    for _ in range(2):
+        trainer = AITrainer(agent1=AfterstateAgent("Afterstate_X"), seed=123)
+        list(trainer.iter_train(300, save_interval=1000, progress_interval=300))
+        values.append(trainer.agent1.to_value_array().tobytes())
+
+    assert values[0] == values[1]
+
+    # 训练到一半序列化再恢复（超参数搜索晋级时的做法），续训结果同样可复现
+    values = []
+    for _ in range(2):
+        trainer = AITrainer(seed=123)
+        list(trainer.iter_train(150, save_interval=1000, progress_interval=150))
+        agent1, agent2 = pickle.loads(pickle.dumps((trainer.agent1, trainer.agent2)))
+        trainer = AITrainer(agent1, agent2)
+        list(trainer.iter_train(150, save_interval=1000, progress_interval=150))
+        values.append(trainer.agent1.to_q_array().tobytes())
+
+    assert values[0] == values[1]
+
+
+def test_monte_carlo_batch_update():
+    """测试蒙特卡洛智能体的批量更新与逐个样本增量更新结果一致"""
+    print("测试: 蒙特卡洛批量更新")
+    rng = np.random.default_rng(0)
+    indices = rng.integers(0, 20, 300)
+    cells = rng.integers(0, 9, 300)
+    rewards = rng.choice([-1.0, 0.0, 1.0], 300)
+
+    agent = MonteCarloAgent()
+    agent.update_batch(indices, cells, rewards)
+
+    counts = np.zeros((20, 9))
+    values = np.zeros((20, 9))
+    for index, cell, reward in zip(indices, cells, rewards):
+        counts[index, cell] += 1
+        values[index, cell] += (reward - values[index, cell]) / counts[index, cell]
+
+    assert (agent.state_action_counts[:20] == counts).all()
+    assert np.allclose(agent.state_action_values[:20], values, atol=1e-6)
+
+
+@run_in_temp_dir
+def test_monte_carlo_legacy_model():
+    """测试加载旧版嵌套字典格式的蒙特卡洛模型"""
+    print("测试: 加载旧版蒙特卡洛模型")
+    board = np.array([[1, 0, 0], [0, -1, 0], [0, 0, 0]], dtype=np.int32)
+    legacy = {
+        'state_action_counts': {board.tobytes(): {(0, 1): 3, (2, 2): 1}},
+        'state_action_values': {board.tobytes(): {(0, 1): 0.5, (2, 2): -1.0}},
+        'exploration_constant': 1.0, 'win_count': 1, 'loss_count': 2, 'draw_count': 3,
+    }
+    with open("legacy.pkl", 'wb') as f:
+        pickle.dump(legacy, f)
+
+    agent = MonteCarloAgent()
+    agent.load_model("legacy.pkl")
+    index = state_index(board)
+    assert agent.state_action_counts[index].tolist() == [0, 3, 0, 0, 0, 0, 0, 0, 1]
+    assert agent.state_action_values[index, 1] == 0.5
+    assert agent.best_action(board, [(0, 1), (2, 2)]) == (0, 1)
+
+    # 新格式保存后应能原样读回
+    agent.save_model("array.pkl")
+    reloaded = MonteCarloAgent()
+    reloaded.load_model("array.pkl")
+    assert (reloaded.state_action_counts == agent.state_action_counts).all()
+    assert (reloaded.state_action_values == agent.state_action_values).all()
+
+
+def test_q_table_reads_do_not_insert():
+    """测试Q学习智能体的读取路径不会向Q表插入零值条目"""
+    print("测试: Q表只读访问")
+    agent = QLearningAgent(epsilon=0.0)
+    board = np.zeros((3, 3), dtype=np.int32)
+    moves = agent.get_valid_moves_from_state(board)
+
+    agent.choose_action(board, moves, training=False)
+    assert agent.q_table == {}
+
+    next_board = board.copy()
+    next_board[1, 1] = 1
+    agent.update_q_value(board, (1, 1), 0.0, next_board, False)
+    assert agent.q_table == {}
+
+    agent.update_q_value(board, (1, 1), 1.0, next_board, True)
+    report = agent.memory_report()
+    assert report['states'] == 1 and report['entries'] == 1 and report['zero_entries'] == 0
+
+    agent.q_table[agent.get_state_key(board, 1)][(0, 0)] = 0.0
+    assert agent.memory_report()['zero_fraction'] == 0.5
+    assert agent.prune() == 1
+
+
+def test_q_learning_legacy_keys():
+    """测试Q表在内存中按状态编号索引，模型文件仍使用旧版字符串状态键"""
+    print("测试: Q学习模型的状态键")
+    board = np.array([[1, 0, 0], [0, -1, 0], [0, 0, 0]])
+    legacy = {
+        'q_table': {f"{board.astype(np.int32).tobytes()}_1": {(0, 1): 0.5, (2, 2): -1.0}},
+        'learning_rate': 0.1, 'discount_factor': 0.9, 'epsilon': 0.0, 'epsilon_decay': 0.995,
+        'win_count': 1, 'loss_count': 2, 'draw_count': 3,
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "legacy.pkl")
+        with open(path, 'wb') as f:
+            pickle.dump(legacy, f)
+
+        agent = QLearningAgent(epsilon=0.0)
+        agent.load_model(path)
+        index = state_index(board)
+        assert agent.q_table == {index: {(0, 1): 0.5, (2, 2): -1.0}}
+        moves = [(0, 1), (2, 2)]
+        assert agent.choose_action(board, moves, training=False) == (0, 1)
+        assert agent.choose_action(None, moves, training=False, index=index) == (0, 1)
+
+        agent.save_model(path)
+        with open(path, 'rb') as f:
+            assert list(pickle.load(f)['q_table']) == [f"{board.tobytes()}_1"]
+        reloaded = QLearningAgent()
+        reloaded.load_model(path)
+        assert reloaded.q_table == agent.q_table
+
+
+def test_afterstate_agent():
+    """测试后继状态智能体可以替换训练器中的智能体，并能保存、加载和冻结"""
+    print("测试: 后继状态智能体")
+    agent = AfterstateAgent("Afterstate_X", rng=RandomStream(3))
+    trainer = AITrainer(agent1=agent, seed=11)
+    list(trainer.iter_train(1000, save_interval=10000, progress_interval=1000))
+
+    score = evaluate_agent(agent, 1, 300, rng=RandomStream(1))['score']
+    print(f"训练1000回合后对随机对手得分: {score:.3f}, 后继状态数: {agent.memory_report()['entries']}")
+    assert score > 0.85
+
+    # 能一步获胜时，获胜后的棋盘价值最高
+    board = np.array([[1, 1, 0], [-1, -1, 0], [0, 0, 0]])
+    values = agent.to_value_array()[state_index(board)]
+    assert values[2] > max(values[cell] for cell in (5, 6, 7, 8))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "afterstate.pkl")
+        agent.save_model(path)
+        loaded = load_agent(path)
+        assert isinstance(loaded, AfterstateAgent)
+        assert np.array_equal(loaded.to_value_array(), agent.to_value_array())
+
+    frozen = FrozenAgent.from_agent(agent, rng=RandomStream(2))
+    assert evaluate_agent(frozen, 1, 300, rng=RandomStream(1))['score'] > 0.85
+
+
+def test_league_results():
+    """测试联赛模式只把直接对弈计入智能体战绩，对快照的对局记在对手池中"""
+    print("测试: 联赛战绩")
+    trainer = LeagueTrainer(snapshot_interval=50, live_ratio=0.3, seed=5)
+    list(trainer.iter_train(300, save_interval=1000, progress_interval=300))
+
+    live = trainer.agent1.win_count + trainer.agent2.win_count + trainer.agent1.draw_count
+    against_snapshots = sum(trainer.o_pool.totals) + sum(trainer.x_pool.totals)
+    print(f"直接对弈 {live} 局, 对快照 {against_snapshots} 局")
+    assert 0 < live < 300 and live + against_snapshots == 300
+    assert trainer.agent1.win_count == trainer.agent2.loss_count
+    assert trainer.agent1.loss_count == trainer.agent2.win_count
+
+
+if __name__ == "__main__":
+    test_progress_callback()
+    test_cancellation()
+    test_model_registry()
+    test_iter_train()
+    test_convergence_early_stop()
+    test_seed_reproducibility()
+    test_monte_carlo_batch_update()
+    test_monte_carlo_legacy_model()
+    test_q_table_reads_do_not_insert()
+    test_q_learning_legacy_keys()
+    test_afterstate_agent()
+    test_league_results()
+    print("\n=== 所有测试完成 ===")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对局记录测试脚本
+验证对局日志的编码、追加写入、内存映射读取以及训练器的记录
+"""
+
+import os
+import tempfile
+import numpy as np
+from ai_trainer import AITrainer, MonteCarloAgent, QLearningAgent, evaluate_agent
+from game_records import (GameLogWriter, GameLogReader, encode_game, HEADER_SIZE, RECORD_SIZE,
+                          RESULT_X_WINS, RESULT_UNFINISHED)
+from offline_trainer import OfflineTrainer
+from random_streams import RandomStream
+
+
+def test_encode_decode():
+    """测试单局编码及追加写入后的读取"""
+    print("测试: 对局编码与读取")
+    assert encode_game([4, 0, 8], RESULT_X_WINS) == bytes([0x40, 0x8F, 0xFF, 0xFF, 0xF1])
+
+    games = [([4, 0, 8, 2, 6, 1, 3, 5, 7], 0), ([0, 3, 1, 4, 2], 1), ([4, 0], None), ([], -1)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "games.tttg")
+        with GameLogWriter(path, buffer_games=2) as log:
+            for cells, winner in games[:2]:
+                log.write(cells, winner)
+
+        # 再次打开时追加，并丢弃异常退出留下的半条记录
+        with open(path, 'ab') as f:
+            f.write(b'\x12\x34')
+        with GameLogWriter(path) as log:
+            for cells, winner in games[2:]:
+                log.write(cells, winner)
+
+        assert os.path.getsize(path) == HEADER_SIZE + RECORD_SIZE * len(games)
+        reader = GameLogReader(path)
+        assert len(reader) == len(games)
+        assert list(reader) == games
+
+        moves, results = reader.read(0, 4)
+        assert moves[1].tolist() == [0, 3, 1, 4, 2, -1, -1, -1, -1]
+        assert results[2] == RESULT_UNFINISHED
+        assert reader.result_counts() == {'x_wins': 1, 'o_wins': 1, 'draws': 1, 'unfinished': 1}
+
+        shuffled = [chunk[0] for chunk in reader.iter_chunks(chunk_size=3, order=np.array([3, 1, 0, 2]))]
+        assert [len(chunk) for chunk in shuffled] == [3, 1] and shuffled[0][1].tolist() == moves[1].tolist()
+
+
+def test_trainer_game_log():
+    """测试训练器把每局训练对局写入日志"""
+    print("测试: 训练对局记录")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "train.tttg")
+        with GameLogWriter(path) as log:
+            trainer = AITrainer(seed=5, game_log=log)
+            list(trainer.iter_train(200, save_interval=1000, progress_interval=200))
+
+        reader = GameLogReader(path)
+        counts = reader.result_counts()
+        print(f"记录 {len(reader)} 局: {counts}")
+        assert len(reader) == 200
+        assert counts['x_wins'] == trainer.agent1.win_count
+        assert counts['draws'] == trainer.agent1.draw_count
+        assert counts['unfinished'] == 0
+
+
+def test_offline_training():
+    """测试离线训练：蒙特卡洛回放与在线训练结果一致，Q学习能从日志中学到策略"""
+    print("测试: 离线训练")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "train.tttg")
+        with GameLogWriter(path) as log:
+            trainer = AITrainer(seed=3, game_log=log)
+            list(trainer.iter_train(1000, save_interval=10000, progress_interval=1000))
+
+        # 打乱顺序后回放，平均回报仍与在线逐局更新相同
+        mc_agent = MonteCarloAgent()
+        stats = OfflineTrainer(mc_agent, chunk_size=300, seed=1).train(path)
+        assert stats['games'] == 1000
+        assert np.array_equal(mc_agent.state_action_counts, trainer.agent2.state_action_counts)
+        assert np.allclose(mc_agent.state_action_values, trainer.agent2.state_action_values, atol=1e-6)
+
+        q_agent = QLearningAgent(rng=RandomStream(0))
+        before = evaluate_agent(q_agent, 1, 400, rng=RandomStream(1))['score']
+        OfflineTrainer(q_agent, side=1, seed=1).train(path, passes=5)
+        after = evaluate_agent(q_agent, 1, 400, rng=RandomStream(1))['score']
+        print(f"Q学习对随机对手得分: {before:.3f} -> {after:.3f}")
+        assert q_agent.q_table and after > before
+
+
+if __name__ == "__main__":
+    test_encode_decode()
+    test_trainer_game_log()
+    test_offline_training()
+    print("\n=== 所有测试完成 ===")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则内核测试脚本
+验证规则表与逐线检查一致，控制台游戏、训练环境和对局服务器的判定相同，
+以及 Zobrist 键在落子和悔棋后与从头计算的结果一致
+"""
+
+import game_rules
+from ai_trainer import TicTacToeGame
+from game_server import GameSession
+from random_streams import RandomStream
+from tic_tac_toe import TicTacToe
+from terminal_renderer import TerminalRenderer
+
+
+def test_rules_table():
+    """测试规则表与逐线检查的结果一致"""
+    print("测试: 规则表")
+    outcomes, lines, legal = game_rules.tables()
+    assert len(outcomes) == len(lines) == len(legal) == game_rules.NUM_STATES
+
+    for index in range(0, game_rules.NUM_STATES, 7):
+        digits = [(index // power) % 3 for power in game_rules.CELL_POWERS]
+        winners = [digits[a] for a, b, c in game_rules.WIN_LINES if digits[a] and digits[a] == digits[b] == digits[c]]
+        if winners:
+            assert game_rules.outcome(index) == winners[0]
+            assert digits[game_rules.winning_line(index)[0]] == winners[0]
+        else:
+            assert game_rules.winning_line(index) is None
+            assert game_rules.outcome(index) == (game_rules.DRAW if 0 not in digits else game_rules.ONGOING)
+        assert game_rules.legal_cells(index) == [cell for cell in range(9) if digits[cell] == 0]
+
+    np_outcomes, np_lines, np_legal = game_rules.numpy_tables()
+    assert np_outcomes.tolist() == outcomes and np_lines.tolist() == lines and np_legal.tolist() == legal
+
+    # 8种对称变换互不相同，且都是格子编号的排列
+    assert len(set(game_rules.SYMMETRIES)) == 8
+    assert all(sorted(perm) == list(range(9)) for perm in game_rules.SYMMETRIES)
+
+
+def test_frontends_agree():
+    """测试随机对局中各前端的胜负判定完全相同"""
+    print("测试: 各前端判定一致")
+    rng = RandomStream(3)
+    console = TicTacToe(TerminalRenderer(ansi=False))
+    game = TicTacToeGame()
+    results = {}
+
+    for _ in range(300):
+        game.reset()
+        session = GameSession(1, None, None)
+        moves = []
+        while not game.game_over:
+            row, col = rng.choice(game.get_valid_moves())
+            game.make_move(row, col)
+            assert session.play(row * 3 + col)
+            moves.append((row, col))
+
+        result, _, _ = console.adjudicate(moves)
+        expected = {1: 'X', -1: 'O', 0: 'draw'}[game.winner]
+        assert result == expected and session.winner == game.winner
+        results[result] = results.get(result, 0) + 1
+
+    print(f"结果分布: {results}")
+    assert set(results) == {'X', 'O', 'draw'}
+
+
+def test_zobrist_incremental():
+    """测试增量维护的 Zobrist 键与从头计算一致，悔棋能完整恢复局面"""
+    print("测试: Zobrist 哈希")
+    rng = RandomStream(1)
+    keys = {}
+    for _ in range(200):
+        game = TicTacToeGame()
+        snapshots = [(game.index, game.zobrist_key, game.current_player)]
+        while not game.game_over:
+            row, col = rng.choice(game.get_valid_moves())
+            game.make_move(row, col)
+            digits = [(game.index // power) % 3 for power in game_rules.CELL_POWERS]
+            assert game.get_board_hash() == game_rules.ZOBRIST.hash(digits)
+            # 相同局面（不同落子顺序）得到相同的键，不同局面的键不冲突
+            assert keys.setdefault(game.zobrist_key, game.index) == game.index
+            snapshots.append((game.index, game.zobrist_key, game.current_player))
+
+        snapshots.pop()
+        while game.undo_move() is not None:
+            assert (game.index, game.zobrist_key, game.current_player) == snapshots.pop()
+            assert not game.game_over and game.winner is None
+        assert game.zobrist_key == 0 and not game.board.any()
+
+    print(f"{len(keys)} 个不同局面，无冲突")
+
+
+if __name__ == "__main__":
+    test_rules_table()
+    test_frontends_agree()
+    test_zobrist_incremental()
+    print("\n=== 所有测试完成 ===")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对局服务器测试脚本
+在本进程中启动服务器（系统分配端口），通过TCP发送JSON请求验证对局流程，
+并用负载测试工具短时间驱动服务器
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import numpy as np
+from ai_trainer import NUM_STATES, FrozenAgent
+from game_server import GameServer, GameSession
+from load_test import closed_loop, Recorder
+from random_streams import RandomStream
+
+
+def make_models():
+    """构造测试用模型：随机模型和总是优先走中心的模型"""
+    center = np.zeros((NUM_STATES, 9), dtype=np.float32)
+    center[:, 4] = 1.0
+    return {'random': FrozenAgent('random', np.zeros((NUM_STATES, 9), dtype=np.float32)),
+            'center': FrozenAgent('center', center)}
+
+
+def test_session_rules():
+    """测试对局的落子、胜负判断和状态编号"""
+    print("测试: 对局规则")
+    session = GameSession(1, None, None)
+    for cell in (0, 3, 1, 4):
+        assert session.play(cell)
+    assert not session.play(0)
+    assert session.play(2)
+
+    assert session.winner == 1 and session.over
+    assert session.index == 1 + 3 + 9 + 2 * 27 + 2 * 81
+    assert not session.play(5)
+
+
+def test_server_protocol():
+    """测试人机对局、AI对AI对局、错误请求和空闲超时"""
+    print("测试: 服务器协议")
+
+    async def run():
+        server = GameServer(make_models(), idle_timeout=0.1)
+        await server.start('127.0.0.1', 0)
+        reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+
+        async def call(**request):
+            writer.write(json.dumps(request).encode() + b'\n')
+            await writer.drain()
+            return json.loads(await reader.readline())
+
+        # 人类执X，AI总是优先走中心
+        game = await call(cmd='new', x='human', o='center', id=7)
+        assert game['ok'] and game['id'] == 7 and game['current'] == 1
+        result = await call(cmd='move', session=game['session'], cell=0)
+        assert result['ai_moves'] == [4] and result['board'][4] == -1
+
+        illegal = await call(cmd='move', session=game['session'], cell=4)
+        assert not illegal['ok']
+
+        # AI对AI一次走完
+        battle = await call(cmd='new', x='random', o='random')
+        result = await call(cmd='play', session=battle['session'])
+        assert result['over'] and len(result['ai_moves']) >= 5
+
+        assert not (await call(cmd='new', o='missing'))['ok']
+        assert not (await call(cmd='unknown'))['ok']
+
+        # 空闲对局超时后被清理
+        await asyncio.sleep(0.3)
+        stats = await call(cmd='stats')
+        assert stats['active_sessions'] == 0 and stats['timed_out'] == 2
+        assert stats['finished'] == 1
+
+        writer.close()
+        await server.stop()
+
+    asyncio.run(run())
+
+
+def test_load_generator():
+    """测试闭环负载生成：所有对局都能走完且没有错误"""
+    print("测试: 负载生成")
+
+    async def run():
+        server = GameServer(make_models())
+        await server.start('127.0.0.1', 0)
+        args = argparse.Namespace(target='game', host='127.0.0.1', port=server.port,
+                                  concurrency=5, think_time=0.0, model='center')
+        recorder = Recorder()
+        await closed_loop(args, recorder, time.monotonic() + 0.3, RandomStream(0))
+        await server.stop()
+        return recorder.report(0.3, {})
+
+    report = asyncio.run(run())
+    print(f"对局数: {report['games']}, 请求数: {report['requests']}")
+    assert report['games'] > 0 and report['errors'] == 0
+    assert report['operations']['new']['requests'] == report['games']
+    assert set(report['latency_ms']) == {'p50', 'p95', 'p99', 'mean', 'max'}
+
+
+if __name__ == "__main__":
+    test_session_rules()
+    test_server_protocol()
+    test_load_generator()
+    print("\n=== 所有测试完成 ===")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+推理服务测试脚本
+验证对称规范化、微批处理、LRU缓存、与模型自身值行一致的落子以及HTTP接口
+"""
+
+import asyncio
+import json
+import numpy as np
+from ai_trainer import NUM_STATES, POWERS_OF_THREE
+from inference_service import (CANONICAL, SYMMETRIES, InferenceService, HTTPFrontend, LRUCache)
+
+
+def board_index(board):
+    """棋盘（9个格子）的状态编号"""
+    return int((np.array(board) % 3) @ POWERS_OF_THREE)
+
+
+def test_canonical_positions():
+    """测试同一对称类的局面得到相同的规范编号"""
+    print("测试: 对称规范化")
+    board = np.array([1, -1, 0, 0, 1, 0, 0, 0, -1])
+    canonical = {int(CANONICAL[board_index(board[perm])]) for perm in SYMMETRIES}
+
+    print(f"对称类数量: {len(np.unique(CANONICAL))}")
+    assert len(canonical) == 1
+    assert len(np.unique(CANONICAL)) == 2862
+
+
+def test_lru_cache():
+    """测试LRU淘汰顺序"""
+    print("测试: LRU缓存")
+    cache = LRUCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1 and len(cache) == 2
+
+
+def test_batched_inference():
+    """测试并发请求被合并成批、对称局面命中缓存并给出对称的落子"""
+    print("测试: 微批处理推理")
+    values = np.zeros((NUM_STATES, 9), dtype=np.float32)
+    values[0, 0] = 1.0  # 空棋盘上偏好角落
+    values[board_index([1, -1, 0, 0, 0, 0, 0, 0, 0]), 2] = 1.0
+    values[board_index([1, 0, 0, -1, 0, 0, 0, 0, 0]), 6] = 1.0  # 上一局面的转置，值行对称
+    values[board_index([0, 0, 1, 0, 0, 0, 0, 0, 0]), 4] = 0.5  # 与规范局面不对称的值行
+
+    async def run():
+        service = InferenceService({'corner': values}, max_batch=8, max_delay=0.01)
+        boards = [[0] * 9 for _ in range(4)] + [[1, 0, 0, 0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 0, 0, 0, 0, 1]]
+        results = await asyncio.gather(*[service.infer('corner', board) for board in boards])
+
+        # 同一批中的4个空棋盘和2个对称局面只执行一次批量查表
+        assert results[0]['move'] == 0 and results[0]['scores'][0] > results[0]['scores'][4]
+        assert service.counters['batches'] == 1
+
+        # 互为转置的两个局面：第二次请求命中缓存，落子也互为转置
+        hits = service.counters['cache_hits']
+        first = await service.infer('corner', [1, -1, 0, 0, 0, 0, 0, 0, 0])
+        second = await service.infer('corner', [1, 0, 0, -1, 0, 0, 0, 0, 0])
+        assert first['move'] == 2 and second['move'] == 6
+        assert service.counters['cache_hits'] == hits + 1
+
+        # 值行与规范局面不一致时按模型自身的值行落子，与 FrozenAgent 相同
+        result = await service.infer('corner', [0, 0, 1, 0, 0, 0, 0, 0, 0])
+        assert result['move'] == 4 and result['scores'][4] == 0.5
+        result = await service.infer('corner', [1, 0, 0, 0, 0, 0, 0, 0, 0])
+        assert result['scores'][4] == 0.0
+
+        for board in ([2] * 9, [1.0] + [0] * 8, [True] + [0] * 8):
+            try:
+                await service.infer('corner', board)
+                assert False, "应拒绝非法棋盘"
+            except ValueError:
+                pass
+
+    asyncio.run(run())
+
+
+def test_http_frontend():
+    """测试HTTP接口与指标"""
+    print("测试: HTTP接口")
+
+    async def run():
+        frontend = HTTPFrontend(InferenceService({'zero': np.zeros((NUM_STATES, 9), dtype=np.float32)}))
+        await frontend.start('127.0.0.1', 0)
+        reader, writer = await asyncio.open_connection('127.0.0.1', frontend.port)
+
+        async def request(method, path, payload=None, close=False):
+            body = json.dumps(payload).encode() if payload is not None else b''
+            head = f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+            head += "Connection: close\r\n\r\n" if close else "\r\n"
+            writer.write(head.encode() + body)
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while (line := await reader.readline()) != b'\r\n':
+                name, _, value = line.decode().partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            return status, json.loads(await reader.readexactly(length))
+
+        status, result = await request('POST', '/v1/move', {'model': 'zero', 'board': [1, 0, 0, 0, -1, 0, 0, 0, 0]})
+        assert status == 200 and result['move'] == 1 and result['scores'][0] is None
+
+        status, _ = await request('POST', '/v1/move', {'model': 'missing', 'board': [0] * 9})
+        assert status == 400
+
+        status, _ = await request('POST', '/v1/move', {'model': 'zero', 'board': [1.0] + [0] * 8})
+        assert status == 400
+
+        status, metrics = await request('GET', '/metrics', close=True)
+        assert status == 200 and metrics['requests'] == 3 and metrics['errors'] == 2
+        assert set(metrics['latency_ms']) == {'p50', 'p95', 'p99'}
+
+        writer.close()
+
+        # 非法 Content-Length 应返回 400 并关闭连接
+        for value in ('abc', '-1'):
+            reader, writer = await asyncio.open_connection('127.0.0.1', frontend.port)
+            writer.write(f"POST /v1/move HTTP/1.1\r\nContent-Length: {value}\r\n\r\n".encode())
+            await writer.drain()
+            response = await reader.read()
+            assert response.startswith(b"HTTP/1.1 400"), response
+            assert b"Connection: close" in response
+            assert 'error' in json.loads(response.split(b"\r\n\r\n", 1)[1])
+            writer.close()
+
+        await frontend.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    test_canonical_positions()
+    test_lru_cache()
+    test_batched_inference()
+    test_http_frontend()
+    print("\n=== 所有测试完成 ===")
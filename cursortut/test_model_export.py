@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型导出与加载测试脚本
+验证量化导出后的模型可以加载、在保留的状态上策略不变，以及内存映射模型文件的读写
+"""
+
+import io
+import os
+import contextlib
+import tempfile
+import numpy as np
+from ai_trainer import AITrainer, NUM_STATES
+from model_export import (best_moves, dequantize, export_model, load_exported, policy_agreement, quantize,
+                          reachable_states)
+from model_mmap import open_model, ensure_mmap, mmap_path_for, write_model, HEADER_SIZE
+
+
+def test_reachable_states():
+    """测试可到达状态只包含智能体一方需要决策的状态"""
+    print("测试: 贪心策略可到达状态")
+    values = np.zeros((NUM_STATES, 9), dtype=np.float32)
+    # 空棋盘上只走中心：X的第一步只有一种，可到达状态应明显减少
+    values[0, 4] = 1.0
+
+    x_states = reachable_states(values.tolist(), player=1)
+    o_states = reachable_states(values.tolist(), player=-1)
+
+    print(f"X方状态: {len(x_states)}, O方状态: {len(o_states)}")
+    assert 0 in x_states and 0 not in o_states
+    # X在中心、O在角上的状态可以到达；X不在中心的状态不可到达
+    assert 3 ** 4 + 2 in x_states and 1 + 2 * 3 ** 4 not in x_states
+    # 对手一方任意落子，所以O方的状态不受影响
+    assert 1 in o_states and 3 ** 4 in o_states
+    assert x_states.isdisjoint(o_states)
+
+
+def test_export_round_trip():
+    """测试 int8 / float16 导出后加载的智能体与原智能体选择相同的动作"""
+    print("测试: 量化导出与加载")
+    trainer = AITrainer(seed=7)
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer.train(2000, save_interval=10000)
+    values = trainer.agent1.to_q_array()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for dtype in ('int8', 'float16'):
+            path = os.path.join(tmp_dir, f"agent1_{dtype}.npz")
+            report = export_model(trainer.agent1, path, player=1, dtype=dtype, eval_games=200)
+            agent = load_exported(path)
+
+            print(f"{dtype}: 保留 {report['kept_states']} 个状态, 得分变化 {report['score_change']:+.3f}")
+            assert report['kept_states'] <= report['visited_states']
+            assert report['policy_agreement'] == 1.0
+            assert agent.export_report['dtype'] == dtype
+
+            # 每个状态的最佳合法动作集合（含并列）与原智能体完全相同
+            kept = [s for s in reachable_states(agent.values.tolist(), 1) if values[s].any()]
+            assert (best_moves(agent.values, kept) == best_moves(values, kept)).all()
+
+    # 量化把两个不同的最佳候选压成并列时，FrozenAgent 会随机选择，应计为不一致
+    values = np.zeros((NUM_STATES, 9), dtype=np.float32)
+    values[0, :3] = [0.502, 0.5, -1.0]
+    quantized, scale = quantize(values, 'int8')
+    deployed = dequantize(quantized, scale)
+    assert deployed[0, 0] == deployed[0, 1]
+    assert policy_agreement(values, deployed, [0]) == 0.0
+
+
+def test_mmap_model():
+    """测试内存映射模型：按需从 pickle 转换，只读打开后值表与原模型一致"""
+    print("测试: 内存映射模型")
+    trainer = AITrainer(seed=3)
+    with contextlib.redirect_stdout(io.StringIO()):
+        trainer.train(500, save_interval=10000)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        model_path = os.path.join(tmp_dir, "agent1.pkl")
+        trainer.agent1.save_model(model_path)
+
+        agent = open_model(model_path)
+        assert os.path.exists(mmap_path_for(model_path))
+        assert os.path.getsize(mmap_path_for(model_path)) == HEADER_SIZE + NUM_STATES * 9 * 4
+        assert isinstance(agent.values, np.memmap) and not agent.values.flags.writeable
+        assert (agent.values == trainer.agent1.to_q_array()).all()
+        del agent
+
+        # 已转换过的文件不会重复转换
+        mtime = os.path.getmtime(mmap_path_for(model_path))
+        ensure_mmap(model_path)
+        assert os.path.getmtime(mmap_path_for(model_path)) == mtime
+
+        bad_path = os.path.join(tmp_dir, "bad.tttm")
+        write_model(np.zeros((NUM_STATES, 9)), bad_path, name="零值模型", player=-1)
+        agent = open_model(bad_path)
+        assert agent.name == "零值模型" and agent.player == -1
+        del agent
+        with open(bad_path, 'r+b') as f:
+            f.write(b'XXXX')
+        try:
+            open_model(bad_path)
+            assert False, "应拒绝魔数错误的文件"
+        except ValueError as e:
+            print(f"已拒绝: {e}")
+
+
+if __name__ == "__main__":
+    test_reachable_states()
+    test_export_round_trip()
+    test_mmap_model()
+    print("\n=== 所有测试完成 ===")
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+状态图测试脚本
+验证井字棋状态图的局面数、终局结果、后继和对称规范编号，以及文件格式校验
+"""
+
+import os
+import tempfile
+import numpy as np
+import game_rules
+from inference_service import CANONICAL
+from state_graph import StateGraph, build_graph, load_graph
+
+
+def test_tic_tac_toe_graph():
+    """测试井字棋状态图与规则表、对称规范编号一致"""
+    print("测试: 井字棋状态图")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        graph = load_graph(path=os.path.join(tmp_dir, "graph.ttts"))
+        print(f"{len(graph)} 个局面, {graph.num_edges} 条边")
+        assert len(graph) == 5478
+        assert np.count_nonzero(graph.outcome != game_rules.ONGOING) == 958
+        assert len(np.unique(graph.canonical)) == 765
+
+        outcomes, _, legal = game_rules.tables()
+        for i in range(0, len(graph), 11):
+            index = int(graph.states[i])
+            assert graph.outcome[i] == outcomes[index]
+            successors = graph.successors[graph.offsets[i]:graph.offsets[i + 1]]
+            cells = graph.successor_cells[graph.offsets[i]:graph.offsets[i + 1]].tolist()
+            if outcomes[index] == game_rules.ONGOING:
+                assert cells == game_rules.legal_cells(index)
+                digit = game_rules.X if graph.depth[i] % 2 == 0 else game_rules.O
+                assert graph.states[successors].tolist() == [game_rules.place(index, cell, digit) for cell in cells]
+            else:
+                assert not cells
+            assert graph.states[graph.canonical[i]] == CANONICAL[index]
+
+        assert graph.index_of([0])[0] == 0 and graph.depth[0] == 0
+
+
+def test_rectangular_board():
+    """测试长方形棋盘的枚举与文件校验"""
+    print("测试: 3x4 棋盘与文件校验")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = build_graph(3, 4, 3, os.path.join(tmp_dir, "graph.ttts"))
+        graph = StateGraph(path)
+        assert (graph.rows, graph.cols, graph.k) == (3, 4, 3)
+        assert graph.successor_cells.max() == 11
+        # 每个后继比父局面多一子
+        owner, successors, _ = graph.successors_of(np.arange(len(graph)))
+        assert np.array_equal(graph.depth[successors], graph.depth[owner] + 1)
+
+        with open(path, 'r+b') as f:
+            f.write(b'XXXX')
+        try:
+            StateGraph(path)
+            assert False, "应当拒绝魔数错误的文件"
+        except ValueError:
+            pass
+
+
+if __name__ == "__main__":
+    test_tic_tac_toe_graph()
+    test_rectangular_board()
+    print("\n=== 所有测试完成 ===")
@@ -5,7 +5,10 @@
 用于验证游戏逻辑而不需要用户交互
 """
 
-from tic_tac_toe import TicTacToe
+import io
+import json
+from tic_tac_toe import TicTacToe, parse_position, run_batch
+from terminal_renderer import TerminalRenderer, CLEAR_SCREEN
 
 def test_game_logic():
     """测试游戏逻辑"""
@@ -70,5 +73,69 @@ def test_game_logic():
     
     print("\n=== 所有测试完成 ===")
 
+def test_terminal_renderer():
+    """测试终端渲染器只重绘变化的部分"""
+    print("=== 终端渲染器测试 ===\n")
+    
+    # 模拟支持ANSI的终端
+    stream = io.StringIO()
+    game = TicTacToe(TerminalRenderer(stream, ansi=True))
+    game.display_board()
+    first_frame = stream.getvalue()
+    assert first_frame.startswith(CLEAR_SCREEN)
+    
+    # 落子后只改写该格所在行和当前玩家行，不再清屏
+    stream.truncate(0)
+    stream.seek(0)
+    game.make_move(1, 1)
+    game.switch_player()
+    game.display_board()
+    second_frame = stream.getvalue()
+    print(f"首帧 {len(first_frame)} 字符，增量帧 {len(second_frame)} 字符")
+    assert CLEAR_SCREEN not in second_frame
+    assert "X | 6 |" in second_frame and "1 | 2 | 3" not in second_frame
+    assert len(second_frame) < len(first_frame) // 4
+    
+    # 非终端时直接输出整帧文本，不含控制序列
+    stream = io.StringIO()
+    game = TicTacToe(TerminalRenderer(stream, ansi=False))
+    game.display_board()
+    assert "\x1b" not in stream.getvalue() and "7 | 8 | 9" in stream.getvalue()
+
+def test_batch_mode():
+    """测试批处理模式判定对局记录"""
+    print("=== 批处理模式测试 ===\n")
+    
+    assert parse_position("5") == (1, 1)
+    assert parse_position(" 2,0 ") == (2, 0)
+    for text in ("0", "10", "1,2,3", "a"):
+        try:
+            parse_position(text)
+            assert False, f"应拒绝 {text!r}"
+        except ValueError:
+            pass
+    
+    records = io.StringIO("""# 注释行
+1 4 2 5 3
+0,0 1,1 0,1 0,2 2,0 1,0 1,2 2,1 2,2
+
+5 5
+1 4 2 5 3 6
+1 2
+bad
+""")
+    output = io.StringIO()
+    counts = run_batch(records, output)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    for result in results:
+        print(result)
+    
+    assert [(r['line'], r['result']) for r in results] == [
+        (2, 'X'), (3, 'draw'), (5, 'invalid'), (6, 'invalid'), (7, 'unfinished'), (8, 'invalid')]
+    assert results[0]['moves'] == 5 and results[3]['moves'] == 5
+    assert counts == {'X': 1, 'draw': 1, 'invalid': 3, 'unfinished': 1}
+
 if __name__ == "__main__":
     test_game_logic()
+    test_terminal_renderer()
+    test_batch_mode()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+精确求解测试脚本
+验证值迭代与优先级扫描结果一致、已知局面的Q值，以及求得的策略对随机对手不败
+"""
+
+import os
+import tempfile
+import numpy as np
+from ai_trainer import QLearningAgent, evaluate_agent, state_index
+from random_streams import RandomStream
+from state_graph import load_graph
+from value_iteration import solve, train_agent
+
+
+def temp_graph(tmp_dir):
+    """在临时目录中生成状态图，不写入 ai_models/"""
+    return load_graph(path=os.path.join(tmp_dir, "graph.ttts"))
+
+
+def test_solvers_agree():
+    """测试两种求解方法得到相同的Q表"""
+    print("测试: 值迭代与优先级扫描一致")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        graph = temp_graph(tmp_dir)
+        for player in (1, -1):
+            for opponent in ('minimax', 'uniform'):
+                q_sweep, stats = solve(player, opponent, method='value_iteration', graph=graph)
+                q_priority, _ = solve(player, opponent, method='prioritized', graph=graph)
+                print(f"执{'X' if player == 1 else 'O'} 对手 {opponent}: {stats['states']} 个局面, "
+                      f"{stats['iterations']} 次扫描")
+                assert np.allclose(q_sweep, q_priority, atol=1e-6)
+
+
+def test_known_values():
+    """测试已知局面的Q值：对最优对手开局必和，能一步获胜的动作Q值为1"""
+    print("测试: 已知局面的Q值")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        q_array, _ = solve(1, 'minimax', discount_factor=0.9, graph=temp_graph(tmp_dir))
+    assert np.allclose(q_array[0], 0.0)
+
+    # X 占 0、1，O 占 3、4：走 2 直接获胜；走别处会被 O 走 5 获胜
+    board = np.array([[1, 1, 0], [-1, -1, 0], [0, 0, 0]])
+    row = q_array[state_index(board)]
+    assert row[2] == 1.0
+    assert all(row[cell] == -1.0 for cell in (6, 7, 8))
+
+
+def test_trained_agent():
+    """测试写入 QLearningAgent 后的策略对随机对手不败"""
+    print("测试: 求解后的智能体")
+    agent = QLearningAgent(epsilon=0.0, rng=RandomStream(0))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        train_agent(agent, player=1, opponent='minimax', graph=temp_graph(tmp_dir))
+    result = evaluate_agent(agent, 1, 300, rng=RandomStream(1))
+    print(f"对随机对手: {result}")
+    assert result['losses'] == 0 and result['score'] > 0.9
+
+
+if __name__ == "__main__":
+    test_solvers_agree()
+    test_known_values()
+    test_trained_agent()
+    print("\n=== 所有测试完成 ===")
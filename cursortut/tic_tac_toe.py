@@ -6,41 +6,62 @@
 增强版：更精细的游戏画面和视觉效果
 """
 
-import os
 import sys
+import json
+import argparse
+import game_rules
+from terminal_renderer import TerminalRenderer
+
+
+def parse_position(text):
+    """解析位置：位置编号 (1-9) 或坐标 (行,列)，返回 (行, 列)；格式错误时抛出 ValueError"""
+    text = text.strip()
+    
+    # 处理位置编号输入 (1-9)
+    if text.isdigit() and 1 <= int(text) <= 9:
+        pos = int(text) - 1
+        return pos // 3, pos % 3
+    # 处理坐标输入 (行,列)
+    elif ',' in text:
+        parts = text.split(',')
+        if len(parts) == 2:
+            return int(parts[0].strip()), int(parts[1].strip())
+        else:
+            raise ValueError("坐标格式错误")
+    else:
+        raise ValueError("输入格式错误")
+
 
 class TicTacToe:
-    def __init__(self):
+    def __init__(self, renderer=None):
         """初始化游戏"""
         self.board = [[' ' for _ in range(3)] for _ in range(3)]
         self.current_player = 'X'
         self.game_over = False
         self.winner = None
+        self.renderer = renderer if renderer is not None else TerminalRenderer()
         
     def clear_screen(self):
         """清屏"""
-        os.system('cls' if os.name == 'nt' else 'clear')
+        self.renderer.clear()
+    
+    def header_lines(self):
+        """游戏标题的各行"""
+        return ["=" * 50, "井字棋游戏 (Tic-Tac-Toe)".center(50), "=" * 50, ""]
     
     def display_header(self):
         """显示游戏标题"""
-        print("=" * 50)
-        print("井字棋游戏 (Tic-Tac-Toe)".center(50))
-        print("=" * 50)
-        print()
+        print("\n".join(self.header_lines()))
     
-    def display_board(self):
-        """显示精美的游戏板"""
-        self.clear_screen()
-        self.display_header()
-        
+    def board_lines(self):
+        """当前玩家、游戏板和游戏状态的各行"""
         # 显示当前玩家
         player_symbol = "X" if self.current_player == 'X' else "O"
-        print(f"当前玩家: {player_symbol} ({self.current_player})".center(50))
-        print()
+        lines = [f"当前玩家: {player_symbol} ({self.current_player})".center(50), ""]
         
         # 绘制游戏板
-        print("    0   1   2")
-        print("  +---+---+---+")
+        lines.append("    0   1   2")
+        lines.append("  +---+---+---+")
         
         for i in range(3):
             row_display = f"{i} |"
@@ -52,24 +73,29 @@ class TicTacToe:
                     row_display += " O |"
                 else:
                     row_display += f" {i*3+j+1} |"  # 显示位置编号
-            print(row_display)
+            lines.append(row_display)
             
             if i < 2:
-                print("  +---+---+---+")
+                lines.append("  +---+---+---+")
         
-        print("  +---+---+---+")
-        print()
+        lines.append("  +---+---+---+")
+        lines.append("")
         
         # 显示游戏状态
         if self.game_over:
             if self.winner:
                 winner_symbol = "X" if self.winner == 'X' else "O"
-                print(f"恭喜！玩家 {winner_symbol} ({self.winner}) 获胜！".center(50))
+                lines.append(f"恭喜！玩家 {winner_symbol} ({self.winner}) 获胜！".center(50))
             else:
-                print("平局！游戏结束。".center(50))
+                lines.append("平局！游戏结束。".center(50))
         else:
-            print("提示：输入位置编号 (1-9) 或坐标 (行,列)".center(50))
-        print()
+            lines.append("提示：输入位置编号 (1-9) 或坐标 (行,列)".center(50))
+        lines.append("")
+        return lines
+    
+    def display_board(self):
+        """显示精美的游戏板（终端中只重绘与上一帧不同的部分）"""
+        self.renderer.render(self.header_lines() + self.board_lines())
     
     def is_valid_move(self, row, col):
         """检查移动是否有效"""
@@ -84,33 +110,18 @@ class TicTacToe:
             return True
         return False
     
+    def board_index(self):
+        """游戏板的状态编号（见 game_rules）"""
+        return game_rules.encode([cell for row in self.board for cell in row], 'X', 'O')
+    
     def check_winner(self):
-        """检查是否有获胜者"""
-        # 检查行
-        for row in self.board:
-            if row[0] == row[1] == row[2] != ' ':
-                return row[0]
-        
-        # 检查列
-        for col in range(3):
-            if self.board[0][col] == self.board[1][col] == self.board[2][col] != ' ':
-                return self.board[0][col]
-        
-        # 检查对角线
-        if self.board[0][0] == self.board[1][1] == self.board[2][2] != ' ':
-            return self.board[0][0]
-        if self.board[0][2] == self.board[1][1] == self.board[2][0] != ' ':
-            return self.board[0][2]
-        
-        return None
+        """检查是否有获胜者（查规则表）"""
+        outcome = game_rules.outcome(self.board_index())
+        return {game_rules.X_WINS: 'X', game_rules.O_WINS: 'O'}.get(outcome)
     
     def is_board_full(self):
         """检查游戏板是否已满"""
-        for row in self.board:
-            for cell in row:
-                if cell == ' ':
-                    return False
-        return True
+        return game_rules.legal_mask(self.board_index()) == 0
     
     def switch_player(self):
         """切换玩家"""
@@ -127,20 +138,7 @@ class TicTacToe:
                 print("  2. 坐标格式 (行,列) 如: 0,1")
                 
                 user_input = input("\n请输入: ").strip()
-                
-                # 处理位置编号输入 (1-9)
-                if user_input.isdigit() and 1 <= int(user_input) <= 9:
-                    pos = int(user_input) - 1
-                    row, col = pos // 3, pos % 3
-                # 处理坐标输入 (行,列)
-                elif ',' in user_input:
-                    parts = user_input.split(',')
-                    if len(parts) == 2:
-                        row, col = int(parts[0].strip()), int(parts[1].strip())
-                    else:
-                        raise ValueError("坐标格式错误")
-                else:
-                    raise ValueError("输入格式错误")
+                row, col = parse_position(user_input)
                 
                 if self.is_valid_move(row, col):
                     return row, col
@@ -201,10 +199,90 @@ class TicTacToe:
         self.current_player = 'X'
         self.game_over = False
         self.winner = None
+    
+    def adjudicate(self, moves):
+        """从空棋盘开始按顺序执行一局的落子，按与交互模式相同的规则判定结果
+        
+        返回 (结果, 有效步数, 错误说明)；结果为 'X'、'O'、'draw'、'unfinished' 或 'invalid'
+        """
+        self.reset_game()
+        for count, (row, col) in enumerate(moves):
+            if self.game_over:
+                return 'invalid', count, f"第 {count + 1} 步: 游戏已经结束"
+            if not self.make_move(row, col):
+                return 'invalid', count, f"第 {count + 1} 步: 位置 ({row},{col}) 已被占用或超出范围"
+            
+            winner = self.check_winner()
+            if winner:
+                self.game_over = True
+                self.winner = winner
+            elif self.is_board_full():
+                self.game_over = True
+            else:
+                self.switch_player()
+        
+        if not self.game_over:
+            return 'unfinished', len(moves), None
+        return (self.winner or 'draw'), len(moves), None
+
+
+def read_games(stream):
+    """逐行读取对局记录，跳过空行和 # 开头的注释行，生成 (行号, 文本)"""
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line_number, line
+
+
+def parse_games(lines):
+    """把每行以空白分隔的落子解析为坐标列表，生成 (行号, 落子列表, 错误说明)"""
+    for line_number, line in lines:
+        try:
+            yield line_number, [parse_position(token) for token in line.split()], None
+        except ValueError as e:
+            yield line_number, None, f"无法解析: {e}"
+
+
+def adjudicate_games(parsed, game=None):
+    """逐局判定结果，生成结果字典；整个流水线只保存当前一局，内存占用恒定"""
+    game = game if game is not None else TicTacToe(TerminalRenderer(ansi=False))
+    for line_number, moves, error in parsed:
+        if error:
+            yield {'line': line_number, 'result': 'invalid', 'moves': 0, 'error': error}
+            continue
+        result, count, error = game.adjudicate(moves)
+        record = {'line': line_number, 'result': result, 'moves': count}
+        if error:
+            record['error'] = error
+        yield record
+
+
+def run_batch(source, output=sys.stdout):
+    """批处理模式：判定 source 中的所有对局，逐条输出JSON结果，返回各结果的计数"""
+    counts = {}
+    for record in adjudicate_games(parse_games(read_games(source))):
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        counts[record['result']] = counts.get(record['result'], 0) + 1
+    return counts
 
 
 def main():
     """主函数"""
+    parser = argparse.ArgumentParser(description="井字棋游戏")
+    parser.add_argument('--batch', nargs='?', const='-', metavar='FILE',
+                        help="批处理模式：判定文件（省略或为 - 时读取标准输入）中的对局记录，每行一局")
+    args = parser.parse_args()
+    
+    if args.batch:
+        if args.batch == '-':
+            counts = run_batch(sys.stdin)
+        else:
+            with open(args.batch, 'r', encoding='utf-8') as f:
+                counts = run_batch(f)
+        summary = ", ".join(f"{result}: {count}" for result, count in sorted(counts.items()))
+        print(f"共 {sum(counts.values())} 局 ({summary})", file=sys.stderr)
+        return
+    
     game = TicTacToe()
     
     while True:
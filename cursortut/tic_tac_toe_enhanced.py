@@ -11,13 +11,17 @@ import tkinter.font as tkFont
 from PIL import Image, ImageTk, ImageDraw, ImageFilter
 import os
 import sys
+import game_rules
 import threading
 import time
 
 class EnhancedTicTacToeGUI:
-    def __init__(self):
-        """初始化增强版GUI应用程序"""
-        self.root = tk.Tk()
+    def __init__(self, master=None):
+        """初始化增强版GUI应用程序
+
+        传入 master 时作为该窗口的 Toplevel 子窗口在同一进程中打开
+        """
+        self.root = tk.Toplevel(master) if master is not None else tk.Tk()
         self.root.title("井字棋游戏 - Enhanced Tic-Tac-Toe")
         self.root.geometry("700x800")
         self.root.resizable(False, False)
@@ -235,7 +239,7 @@ class EnhancedTicTacToeGUI:
         # 退出按钮
         quit_btn = ttk.Button(control_frame,
                              text="❌ 退出游戏",
-                             command=self.root.quit,
+                             command=self.root.destroy,
                              style='Enhanced.TButton')
         quit_btn.pack(side='left', padx=15)
         
@@ -331,33 +335,17 @@ class EnhancedTicTacToeGUI:
         
         threading.Thread(target=animate, daemon=True).start()
     
+    def board_index(self):
+        """游戏板的状态编号（见 game_rules）"""
+        return game_rules.encode([cell for row in self.board for cell in row], 'X', 'O')
+    
     def check_winner(self):
-        """检查是否有获胜者"""
-        # 检查行
-        for row in self.board:
-            if row[0] == row[1] == row[2] != '':
-                return True
-        
-        # 检查列
-        for col in range(3):
-            if self.board[0][col] == self.board[1][col] == self.board[2][col] != '':
-                return True
-        
-        # 检查对角线
-        if self.board[0][0] == self.board[1][1] == self.board[2][2] != '':
-            return True
-        if self.board[0][2] == self.board[1][1] == self.board[2][0] != '':
-            return True
-        
-        return False
+        """检查是否有获胜者（查规则表）"""
+        return game_rules.outcome(self.board_index()) in (game_rules.X_WINS, game_rules.O_WINS)
     
     def is_board_full(self):
         """检查游戏板是否已满"""
-        for row in self.board:
-            for cell in row:
-                if cell == '':
-                    return False
-        return True
+        return game_rules.legal_mask(self.board_index()) == 0
     
     def show_winner(self):
         """显示获胜者"""
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+独立进程训练
+在专用子进程中运行 AITrainer.train，进度计数器写入共享内存块，
+界面进程只需定期读取，不再与训练循环争抢GIL
+"""
+
+import multiprocessing
+import os
+
+# 工作目录（模型等路径均相对于此目录）
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 共享计数器各字段的位置
+EPISODE, TOTAL_EPISODES, AGENT1_WINS, AGENT2_WINS, DRAWS, STATE, ELAPSED_MS, CONVERGED_AT = range(8)
+NUM_COUNTERS = 8
+
+# 训练状态
+STATE_STARTING = 0
+STATE_RUNNING = 1
+STATE_DONE = 2
+STATE_CANCELLED = 3
+STATE_ERROR = 4
+
+
+def _write_counters(counters, snapshot, state):
+    """把进度快照写入共享计数器"""
+    with counters.get_lock():
+        counters[EPISODE] = snapshot['episode']
+        counters[AGENT1_WINS] = snapshot['agent1_wins']
+        counters[AGENT2_WINS] = snapshot['agent2_wins']
+        counters[DRAWS] = snapshot['draws']
+        counters[ELAPSED_MS] = int(snapshot['elapsed'] * 1000)
+        counters[STATE] = state
+
+
+def _training_main(counters, stop_event, episodes, save_interval, progress_interval, convergence):
+    """子进程入口：运行训练并持续更新共享计数器"""
+    os.chdir(BASE_DIR)
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+
+    from ai_trainer import AITrainer, CancellationToken
+    from convergence import ConvergenceMonitor
+
+    try:
+        trainer = AITrainer()
+        token = CancellationToken(stop_event)
+        monitor = ConvergenceMonitor(**convergence) if convergence is not None else None
+
+        with counters.get_lock():
+            counters[STATE] = STATE_RUNNING
+
+        completed = trainer.train(episodes, save_interval,
+                                  cancel_token=token,
+                                  progress_callback=lambda s: _write_counters(counters, s, STATE_RUNNING),
+                                  progress_interval=progress_interval,
+                                  monitor=monitor)
+        if completed:
+            trainer.save_models()
+
+        # 最后一个进度快照已由回调写入，这里只更新最终状态
+        with counters.get_lock():
+            if monitor is not None and monitor.converged_at is not None:
+                counters[CONVERGED_AT] = monitor.converged_at
+            counters[STATE] = STATE_DONE if completed else STATE_CANCELLED
+
+    except Exception as e:
+        print(f"训练进程出错: {e}")
+        with counters.get_lock():
+            counters[STATE] = STATE_ERROR
+
+
+class TrainingProcess:
+    """在独立进程中运行的训练任务
+
+    convergence: 传入 ConvergenceMonitor 的参数字典（如 window、policy_tolerance、patience），
+        为 None 时不做收敛检测
+    """
+
+    def __init__(self, episodes, save_interval, progress_interval=100, convergence=None):
+        context = multiprocessing.get_context('spawn')
+        self.episodes = episodes
+        self.counters = context.Array('q', NUM_COUNTERS)
+        self.counters[TOTAL_EPISODES] = episodes
+        self.stop_event = context.Event()
+        self.process = context.Process(
+            target=_training_main,
+            args=(self.counters, self.stop_event, episodes, save_interval, progress_interval, convergence),
+            daemon=True
+        )
+
+    def start(self):
+        """启动训练进程"""
+        self.process.start()
+
+    def stop(self):
+        """请求停止训练，训练进程会在当前回合结束后保存检查点并退出"""
+        self.stop_event.set()
+
+    def poll(self):
+        """读取当前训练进度"""
+        # 先确认进程是否已退出，再读取计数器：子进程可能在两次读取之间写入最终状态并退出，
+        # 只有在读取前就已退出、却仍停留在启动/运行状态时才是异常退出
+        exited = self.process.exitcode is not None
+        with self.counters.get_lock():
+            values = list(self.counters)
+
+        state = values[STATE]
+        if exited and state in (STATE_STARTING, STATE_RUNNING):
+            state = STATE_ERROR
+
+        return {
+            'episode': values[EPISODE],
+            'total_episodes': values[TOTAL_EPISODES],
+            'agent1_wins': values[AGENT1_WINS],
+            'agent2_wins': values[AGENT2_WINS],
+            'draws': values[DRAWS],
+            'elapsed': values[ELAPSED_MS] / 1000,
+            'converged_at': values[CONVERGED_AT] or None,
+            'state': state,
+            'finished': state in (STATE_DONE, STATE_CANCELLED, STATE_ERROR),
+        }
+
+    def join(self, timeout=None):
+        """等待训练进程结束，超时后强制终止"""
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于模型的精确求解
+井字棋只有几千个可达局面，不必靠大量自我对弈采样：从状态图缓存（state_graph）中取出
+智能体需要决策的所有局面，建立显式的转移图（智能体落子 -> 对手应对 -> 下一个决策局面），
+用值迭代或优先级扫描直接算出精确的Q表，并以 QLearningAgent 的格式保存。
+
+奖励：智能体获胜 +1，对手获胜 -1，平局 0；每经过一个智能体回合折扣一次（discount_factor）。
+对手模型：minimax（对手总是选择对智能体最不利的应对）或 uniform（对手随机落子）
+"""
+
+import argparse
+import heapq
+import os
+import time
+import numpy as np
+import game_rules
+from ai_trainer import NUM_STATES, QLearningAgent, evaluate_agent
+from random_streams import RandomStream
+from state_graph import load_graph
+
+OPPONENTS = ('minimax', 'uniform')
+METHODS = ('value_iteration', 'prioritized')
+SIDES = {'x': 1, 'o': -1}
+
+
+class TransitionGraph:
+    """智能体视角的显式转移图
+
+    states: 所有智能体需要决策的局面编号
+    pairs: 每个 (局面, 动作) 对的 (局面序号, 格子)；动作直接结束对局时 pair_reward 为终局奖励，
+        pair_terminal 为 True，否则其后果由若干条对手应对描述
+    replies: 每条对手应对所属的动作对序号、终局奖励，以及下一个决策局面的序号（终局为-1）
+    """
+
+    def __init__(self, player=1, graph=None):
+        self.player = player
+        graph = graph if graph is not None else load_graph()
+        win = game_rules.X_WINS if player == 1 else game_rules.O_WINS
+        loss = game_rules.O_WINS if player == 1 else game_rules.X_WINS
+
+        # 轮到智能体落子（X 在偶数步落子）且未结束的局面
+        outcome = np.asarray(graph.outcome)
+        to_move = np.asarray(graph.depth) % 2 == (0 if player == 1 else 1)
+        decision = np.flatnonzero(to_move & (outcome == game_rules.ONGOING))
+
+        # 动作对：决策局面的每条出边
+        pair_state, after, pair_cell = graph.successors_of(decision)
+        after_outcome = outcome[after]
+        pair_terminal = after_outcome != game_rules.ONGOING
+
+        # 对手应对：未结束的动作对的每条出边
+        ongoing_pairs = np.flatnonzero(~pair_terminal)
+        owner, next_ids, _ = graph.successors_of(after[ongoing_pairs])
+        next_outcome = outcome[next_ids]
+        next_terminal = next_outcome != game_rules.ONGOING
+
+        self.states = np.asarray(graph.states)[decision]
+        self.pair_state = pair_state
+        self.pair_cell = pair_cell.astype(np.int64)
+        self.pair_reward = (after_outcome == win).astype(np.float64)
+        self.pair_terminal = pair_terminal
+        self.reply_pair = ongoing_pairs[owner]
+        self.reply_reward = np.where(next_outcome == loss, -1.0, 0.0)
+        self.reply_next = np.where(next_terminal, -1, np.searchsorted(decision, next_ids))
+        self.reply_counts = np.bincount(self.reply_pair, minlength=len(pair_state))
+
+    def backup(self, state_values, opponent, discount_factor):
+        """对所有动作对做一次Bellman备份，返回各动作对的Q值"""
+        values = np.where(self.reply_next >= 0, discount_factor * state_values[self.reply_next], self.reply_reward)
+        q = self.pair_reward.copy()
+        if opponent == 'minimax':
+            worst = np.full(len(q), np.inf)
+            np.minimum.at(worst, self.reply_pair, values)
+            q[~self.pair_terminal] = worst[~self.pair_terminal]
+        else:
+            sums = np.bincount(self.reply_pair, weights=values, minlength=len(q))
+            q[~self.pair_terminal] = sums[~self.pair_terminal] / self.reply_counts[~self.pair_terminal]
+        return q
+
+    def state_values(self, q):
+        """各决策局面的最大Q值"""
+        values = np.full(len(self.states), -np.inf)
+        np.maximum.at(values, self.pair_state, q)
+        return values
+
+    def to_q_array(self, q):
+        """展开为 (NUM_STATES, 9) 的稠密Q值数组"""
+        q_array = np.zeros((NUM_STATES, 9), dtype=np.float32)
+        q_array[self.states[self.pair_state], self.pair_cell] = q
+        return q_array
+
+
+def value_iteration(graph, opponent='minimax', discount_factor=0.9, tolerance=1e-9, max_sweeps=1000):
+    """同步值迭代，返回 (各动作对的Q值, 扫描次数)"""
+    q = np.zeros(len(graph.pair_state))
+    for sweep in range(1, max_sweeps + 1):
+        new_q = graph.backup(graph.state_values(q), opponent, discount_factor)
+        delta = float(np.abs(new_q - q).max()) if len(q) else 0.0
+        q = new_q
+        if delta <= tolerance:
+            return q, sweep
+    return q, max_sweeps
+
+
+def prioritized_sweeping(graph, opponent='minimax', discount_factor=0.9, tolerance=1e-9, max_backups=10 ** 7):
+    """优先级扫描：总是先备份Bellman误差最大的局面，局面值变化后把其前驱局面按变化量加入队列
+
+    只有值真正发生变化的局面才会被重新计算，大棋盘上远比整表扫描省时。返回 (各动作对的Q值, 备份次数)
+    """
+    num_states = len(graph.states)
+    # 每个局面的动作对范围（动作对按局面顺序生成）
+    pair_start = np.searchsorted(graph.pair_state, np.arange(num_states + 1)).tolist()
+    # 每个动作对的对手应对范围（应对按动作对顺序生成）
+    reply_start = np.searchsorted(graph.reply_pair, np.arange(len(graph.pair_state) + 1)).tolist()
+    pair_state = graph.pair_state.tolist()
+    pair_reward = graph.pair_reward.tolist()
+    pair_terminal = graph.pair_terminal.tolist()
+    reply_pair = graph.reply_pair.tolist()
+    reply_reward = graph.reply_reward.tolist()
+    reply_next = graph.reply_next.tolist()
+
+    predecessors = [set() for _ in range(num_states)]
+    for pair, next_state in zip(reply_pair, reply_next):
+        if next_state >= 0:
+            predecessors[next_state].add(pair_state[pair])
+
+    q = [0.0] * len(pair_state)
+    values = [0.0] * num_states
+
+    def backup_state(state):
+        """重新计算局面 state 的各动作Q值，返回新的局面值"""
+        best = -np.inf
+        for pair in range(pair_start[state], pair_start[state + 1]):
+            if pair_terminal[pair]:
+                value = pair_reward[pair]
+            else:
+                outcomes = [discount_factor * values[reply_next[reply]] if reply_next[reply] >= 0 else reply_reward[reply]
+                            for reply in range(reply_start[pair], reply_start[pair + 1])]
+                value = min(outcomes) if opponent == 'minimax' else sum(outcomes) / len(outcomes)
+            q[pair] = value
+            best = max(best, value)
+        return best
+
+    # 初始优先级为各局面在全零值下的Bellman误差（只有能直接分出胜负的局面非零）；
+    # 堆中保存 (-优先级, 局面)
+    queue = []
+    for state in range(num_states):
+        error = abs(backup_state(state))
+        if error > tolerance:
+            queue.append((-error, state))
+    heapq.heapify(queue)
+    queued = {state for _, state in queue}
+    backups = num_states
+
+    while queue and backups < max_backups:
+        _, state = heapq.heappop(queue)
+        queued.discard(state)
+        new_value = backup_state(state)
+        backups += 1
+        change = abs(new_value - values[state])
+        values[state] = new_value
+        if change <= tolerance:
+            continue
+        for predecessor in predecessors[state]:
+            if predecessor not in queued:
+                queued.add(predecessor)
+                heapq.heappush(queue, (-change * discount_factor, predecessor))
+
+    return np.array(q), backups
+
+
+def solve(player=1, opponent='minimax', discount_factor=0.9, method='value_iteration', tolerance=1e-9,
+          graph=None):
+    """求解井字棋的精确Q表，返回 ((NUM_STATES, 9) Q值数组, 统计信息)
+
+    graph 为 state_graph.StateGraph，默认打开（必要时生成）ai_models/ 下的缓存
+    """
+    start_time = time.perf_counter()
+    graph = TransitionGraph(player, graph)
+    graph_time = time.perf_counter() - start_time
+
+    solver = value_iteration if method == 'value_iteration' else prioritized_sweeping
+    q, iterations = solver(graph, opponent, discount_factor, tolerance)
+    stats = {
+        'method': method,
+        'opponent': opponent,
+        'states': len(graph.states),
+        'pairs': len(graph.pair_state),
+        'iterations': iterations,
+        'graph_time': graph_time,
+        'elapsed': time.perf_counter() - start_time,
+    }
+    return graph.to_q_array(q), stats
+
+
+def train_agent(agent, player=1, opponent='minimax', method='value_iteration', tolerance=1e-9, graph=None):
+    """按智能体的 discount_factor 求解并写入其Q表，返回统计信息"""
+    q_array, stats = solve(player, opponent, agent.discount_factor, method, tolerance, graph)
+    agent.load_q_array(q_array)
+    return stats
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="值迭代/优先级扫描求解精确Q表")
+    parser.add_argument('--side', choices=sorted(SIDES), default='x', help="智能体执棋方")
+    parser.add_argument('--opponent', choices=OPPONENTS, default='minimax', help="对手模型")
+    parser.add_argument('--method', choices=METHODS, default='value_iteration', help="求解方法")
+    parser.add_argument('--discount', type=float, default=0.9, help="折扣因子")
+    parser.add_argument('--tolerance', type=float, default=1e-9, help="收敛阈值")
+    parser.add_argument('--eval-games', type=int, default=1000, help="求解后对随机对手的评估局数")
+    parser.add_argument('--output', default=None, help="模型保存路径")
+    args = parser.parse_args()
+
+    player = SIDES[args.side]
+    agent = QLearningAgent(f"ValueIteration_{args.side.upper()}", discount_factor=args.discount, epsilon=0.0)
+    stats = train_agent(agent, player, args.opponent, args.method, args.tolerance)
+    print(f"{stats['method']}（对手: {stats['opponent']}）: {stats['states']} 个决策局面, {stats['pairs']} 个动作, "
+          f"{stats['iterations']} 次{'扫描' if args.method == 'value_iteration' else '备份'}, "
+          f"建图 {stats['graph_time'] * 1000:.1f} 毫秒, 总耗时 {stats['elapsed'] * 1000:.1f} 毫秒")
+
+    if args.eval_games:
+        result = evaluate_agent(agent, player, args.eval_games, rng=RandomStream(0))
+        print(f"对随机对手: 胜 {result['wins']} / 负 {result['losses']} / 平 {result['draws']}"
+              f"  得分 {result['score']:.3f}")
+
+    output = args.output or os.path.join("ai_models", f"value_iteration_{args.side}_agent.pkl")
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    agent.save_model(output)
+    print(f"模型已保存到 {output}")
+
+
+if __name__ == "__main__":
+    main()
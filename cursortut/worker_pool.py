@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常驻工作进程池
+启动器通过预先启动并完成模块导入的工作进程执行训练、测试等任务，
+避免每次都冷启动新的Python解释器并重新导入NumPy、matplotlib
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# 工作进程的工作目录（模型等路径均相对于此目录）
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 进程池单例
+_executor = None
+
+
+def _warm_up():
+    """工作进程初始化：切换目录并预先导入训练模块"""
+    os.chdir(BASE_DIR)
+    # 工作进程没有自己的窗口，图表只保存为文件
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+
+    import ai_trainer  # noqa: F401
+    import quick_train  # noqa: F401
+
+
+def _noop():
+    """空任务，用于触发工作进程启动"""
+    return os.getpid()
+
+
+def get_executor():
+    """获取（必要时创建）常驻进程池"""
+    global _executor
+    if _executor is None:
+        # 使用spawn方式，避免在Tk进程中fork带来的问题
+        context = multiprocessing.get_context('spawn')
+        _executor = ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=_warm_up)
+    return _executor
+
+
+def prewarm():
+    """预先启动工作进程，使第一次任务也不必等待解释器启动和模块导入"""
+    return get_executor().submit(_noop)
+
+
+def submit(fn, *args, **kwargs):
+    """在常驻工作进程中执行任务，返回Future"""
+    return get_executor().submit(fn, *args, **kwargs)
+
+
+def shutdown():
+    """关闭进程池"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def run_quick_train():
+    """快速训练任务：训练并测试AI，返回结果摘要"""
+    import quick_train
+
+    trainer = quick_train.quick_train()
+    quick_train.test_ai_performance(trainer)
+
+    return {
+        'agent1_wins': trainer.agent1.win_count,
+        'agent2_wins': trainer.agent2.win_count,
+        'draws': trainer.agent1.draw_count,
+    }
+
+
+def run_ai_test(prefix="models"):
+    """AI测试任务：加载模型，返回是否成功"""
+    from ai_trainer import AITrainer
+
+    trainer = AITrainer()
+    return trainer.load_models(prefix)